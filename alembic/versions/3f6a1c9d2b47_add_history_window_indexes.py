@@ -0,0 +1,55 @@
+"""add partial indexes for history window
+
+Revision ID: 3f6a1c9d2b47
+Revises: 596ec4cadac0
+Create Date: 2026-10-18 10:12:31.418206
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f6a1c9d2b47"
+down_revision: str | Sequence[str] | None = "596ec4cadac0"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # System prompt - самое старое сообщение диалога; без частичного индекса
+    # его поиск сканирует всю историю от новых сообщений к старым
+    op.create_index(
+        "idx_messages_system",
+        "messages",
+        ["chat_id", "user_id", "created_at"],
+        unique=False,
+        postgresql_where=sa.text("role = 'system' AND deleted_at IS NULL"),
+    )
+    # Окно последних сообщений: ORDER BY created_at DESC, id DESC LIMIT N
+    # читается обратным проходом по индексу без сортировки всего диалога
+    op.create_index(
+        "idx_messages_active",
+        "messages",
+        ["chat_id", "user_id", "created_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "idx_messages_active",
+        table_name="messages",
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.drop_index(
+        "idx_messages_system",
+        table_name="messages",
+        postgresql_where=sa.text("role = 'system' AND deleted_at IS NULL"),
+    )
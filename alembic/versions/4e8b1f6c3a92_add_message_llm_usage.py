@@ -0,0 +1,36 @@
+"""add LLM usage and latency columns to messages
+
+Revision ID: 4e8b1f6c3a92
+Revises: d2c7a9e4f158
+Create Date: 2026-10-18 21:27:45.902117
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4e8b1f6c3a92"
+down_revision: str | Sequence[str] | None = "d2c7a9e4f158"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable колонки без default: ALTER TABLE не переписывает таблицу
+    op.add_column("messages", sa.Column("model", sa.String(length=255), nullable=True))
+    op.add_column("messages", sa.Column("prompt_tokens", sa.Integer(), nullable=True))
+    op.add_column("messages", sa.Column("completion_tokens", sa.Integer(), nullable=True))
+    op.add_column("messages", sa.Column("latency_ms", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("messages", "latency_ms")
+    op.drop_column("messages", "completion_tokens")
+    op.drop_column("messages", "prompt_tokens")
+    op.drop_column("messages", "model")
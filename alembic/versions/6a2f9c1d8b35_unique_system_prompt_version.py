@@ -0,0 +1,27 @@
+"""unique version number of system prompts
+
+Revision ID: 6a2f9c1d8b35
+Revises: 4e8b1f6c3a92
+Create Date: 2026-10-18 23:40:12.518304
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6a2f9c1d8b35"
+down_revision: str | Sequence[str] | None = "4e8b1f6c3a92"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_unique_constraint("system_prompts_version_key", "system_prompts", ["version"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("system_prompts_version_key", "system_prompts", type_="unique")
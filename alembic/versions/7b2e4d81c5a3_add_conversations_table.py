@@ -0,0 +1,42 @@
+"""add conversations table with history clear marker
+
+Revision ID: 7b2e4d81c5a3
+Revises: 3f6a1c9d2b47
+Create Date: 2026-10-18 12:40:05.102934
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7b2e4d81c5a3"
+down_revision: str | Sequence[str] | None = "3f6a1c9d2b47"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "conversations",
+        sa.Column("chat_id", sa.BigInteger(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("cleared_message_id", sa.BigInteger(), nullable=True),
+        sa.Column("cleared_message_created_at", sa.DateTime(), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("chat_id", "user_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("conversations")
@@ -0,0 +1,52 @@
+"""add token_count to messages
+
+Revision ID: a6d3e0b94c12
+Revises: f5a8c2d7e931
+Create Date: 2026-10-18 16:48:51.207316
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a6d3e0b94c12"
+down_revision: str | Sequence[str] | None = "f5a8c2d7e931"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Количество сообщений (диапазон id), обновляемых одной транзакцией
+BATCH_SIZE = 10000
+
+# Та же оценка, что и src/token_estimator.estimate_tokens
+BACKFILL_BATCH = sa.text("""
+    UPDATE messages
+    SET token_count = CEIL(OCTET_LENGTH(content) / 4.0)
+    WHERE id > :first_id AND id <= :last_id
+""")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "messages",
+        sa.Column("token_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+    )
+
+    connection = op.get_bind()
+    max_id = connection.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM messages")).scalar_one()
+
+    # Каждый батч фиксируется отдельно, чтобы не держать одну длинную транзакцию
+    with op.get_context().autocommit_block():
+        for first_id in range(0, max_id, BATCH_SIZE):
+            connection.execute(
+                BACKFILL_BATCH, {"first_id": first_id, "last_id": first_id + BATCH_SIZE}
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("messages", "token_count")
@@ -0,0 +1,37 @@
+"""add rolling summary to conversations
+
+Revision ID: b83f5e1a7d26
+Revises: a6d3e0b94c12
+Create Date: 2026-10-18 18:03:37.640192
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b83f5e1a7d26"
+down_revision: str | Sequence[str] | None = "a6d3e0b94c12"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("conversations", sa.Column("summary", sa.Text(), nullable=True))
+    op.add_column(
+        "conversations", sa.Column("summarized_message_id", sa.BigInteger(), nullable=True)
+    )
+    op.add_column(
+        "conversations", sa.Column("summarized_message_created_at", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("conversations", "summarized_message_created_at")
+    op.drop_column("conversations", "summarized_message_id")
+    op.drop_column("conversations", "summary")
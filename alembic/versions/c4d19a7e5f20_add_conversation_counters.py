@@ -0,0 +1,45 @@
+"""add message counters to conversations
+
+Revision ID: c4d19a7e5f20
+Revises: 7b2e4d81c5a3
+Create Date: 2026-10-18 14:05:47.331208
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4d19a7e5f20"
+down_revision: str | Sequence[str] | None = "7b2e4d81c5a3"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "conversations",
+        sa.Column("message_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+    )
+    op.add_column(
+        "conversations",
+        sa.Column(
+            "total_content_length", sa.BigInteger(), server_default=sa.text("0"), nullable=False
+        ),
+    )
+    op.add_column("conversations", sa.Column("last_message_at", sa.DateTime(), nullable=True))
+    op.add_column("conversations", sa.Column("system_message_id", sa.BigInteger(), nullable=True))
+    op.create_index("idx_conversations_user", "conversations", ["user_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_conversations_user", table_name="conversations")
+    op.drop_column("conversations", "system_message_id")
+    op.drop_column("conversations", "last_message_at")
+    op.drop_column("conversations", "total_content_length")
+    op.drop_column("conversations", "message_count")
@@ -0,0 +1,40 @@
+"""add llm_responses table for persistent LLM response cache
+
+Revision ID: d2c7a9e4f158
+Revises: b83f5e1a7d26
+Create Date: 2026-10-18 20:41:12.318406
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d2c7a9e4f158"
+down_revision: str | Sequence[str] | None = "b83f5e1a7d26"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "llm_responses",
+        sa.Column("key_hash", sa.String(length=64), nullable=False),
+        sa.Column("response", sa.Text(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False
+        ),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key_hash"),
+    )
+    op.create_index("idx_llm_responses_expires", "llm_responses", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_llm_responses_expires", table_name="llm_responses")
+    op.drop_table("llm_responses")
@@ -0,0 +1,99 @@
+"""backfill conversation counters from messages
+
+Revision ID: e91f3b6a8d14
+Revises: c4d19a7e5f20
+Create Date: 2026-10-18 14:06:12.904517
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e91f3b6a8d14"
+down_revision: str | Sequence[str] | None = "c4d19a7e5f20"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Количество диалогов, пересчитываемых одной транзакцией
+BATCH_SIZE = 1000
+
+SELECT_KEYS_BATCH = sa.text("""
+    SELECT DISTINCT chat_id, user_id
+    FROM messages
+    WHERE (chat_id, user_id) > (:chat_id, :user_id)
+    ORDER BY chat_id, user_id
+    LIMIT :batch_size
+""")
+
+# Считаются только видимые сообщения: не удаленные и позже границы очистки диалога
+BACKFILL_BATCH = sa.text("""
+    INSERT INTO conversations (
+        chat_id, user_id, message_count, total_content_length,
+        last_message_at, system_message_id
+    )
+    SELECT
+        m.chat_id,
+        m.user_id,
+        COUNT(*),
+        SUM(m.content_length),
+        MAX(m.created_at),
+        (ARRAY_AGG(m.id ORDER BY m.created_at, m.id) FILTER (WHERE m.role = 'system'))[1]
+    FROM messages m
+    LEFT JOIN conversations c ON c.chat_id = m.chat_id AND c.user_id = m.user_id
+    WHERE (m.chat_id, m.user_id) > (:first_chat_id, :first_user_id)
+        AND (m.chat_id, m.user_id) <= (:last_chat_id, :last_user_id)
+        AND m.deleted_at IS NULL
+        AND (
+            c.cleared_message_id IS NULL
+            OR (m.created_at, m.id) > (c.cleared_message_created_at, c.cleared_message_id)
+        )
+    GROUP BY m.chat_id, m.user_id
+    ON CONFLICT (chat_id, user_id) DO UPDATE SET
+        message_count = EXCLUDED.message_count,
+        total_content_length = EXCLUDED.total_content_length,
+        last_message_at = EXCLUDED.last_message_at,
+        system_message_id = EXCLUDED.system_message_id
+""")
+
+
+def upgrade() -> None:
+    """Fill conversations counters from existing messages in batches."""
+    connection = op.get_bind()
+    # Нижняя граница keyset-пагинации: меньше любого реального (chat_id, user_id)
+    last_key = (-(2**63), -(2**63))
+
+    # Каждый батч фиксируется отдельно, чтобы не держать одну длинную транзакцию
+    with op.get_context().autocommit_block():
+        while True:
+            keys = connection.execute(
+                SELECT_KEYS_BATCH,
+                {"chat_id": last_key[0], "user_id": last_key[1], "batch_size": BATCH_SIZE},
+            ).all()
+            if not keys:
+                break
+
+            connection.execute(
+                BACKFILL_BATCH,
+                {
+                    "first_chat_id": last_key[0],
+                    "first_user_id": last_key[1],
+                    "last_chat_id": keys[-1].chat_id,
+                    "last_user_id": keys[-1].user_id,
+                },
+            )
+            last_key = (keys[-1].chat_id, keys[-1].user_id)
+
+
+def downgrade() -> None:
+    """Reset counters filled by the backfill."""
+    op.execute("""
+        UPDATE conversations
+        SET message_count = 0,
+            total_content_length = 0,
+            last_message_at = NULL,
+            system_message_id = NULL
+    """)
@@ -0,0 +1,105 @@
+"""add system_prompts table referenced from conversations
+
+Revision ID: f5a8c2d7e931
+Revises: e91f3b6a8d14
+Create Date: 2026-10-18 15:32:20.518774
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f5a8c2d7e931"
+down_revision: str | Sequence[str] | None = "e91f3b6a8d14"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Тот же SHA-256 (hex), что и compute_content_hash в приложении
+CONTENT_HASH_SQL = "encode(sha256(convert_to(m.content, 'UTF8')), 'hex')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "system_prompts",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("content_hash"),
+    )
+    op.add_column("conversations", sa.Column("system_prompt_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "conversations_system_prompt_id_fkey",
+        "conversations",
+        "system_prompts",
+        ["system_prompt_id"],
+        ["id"],
+    )
+
+    # Уникальные тексты system prompt существующих диалогов становятся версиями
+    # в порядке первого появления
+    op.execute(f"""
+        INSERT INTO system_prompts (content_hash, version, content)
+        SELECT content_hash, ROW_NUMBER() OVER (ORDER BY first_seen_at), content
+        FROM (
+            SELECT {CONTENT_HASH_SQL} AS content_hash,
+                   MIN(m.content) AS content,
+                   MIN(m.created_at) AS first_seen_at
+            FROM conversations c
+            JOIN messages m ON m.id = c.system_message_id
+            GROUP BY 1
+        ) prompts
+    """)
+    op.execute(f"""
+        UPDATE conversations c
+        SET system_prompt_id = p.id
+        FROM messages m, system_prompts p
+        WHERE m.id = c.system_message_id
+            AND p.content_hash = {CONTENT_HASH_SQL}
+    """)
+
+    op.drop_column("conversations", "system_message_id")
+    # Новые system-строки в messages больше не пишутся
+    op.drop_index(
+        "idx_messages_system",
+        table_name="messages",
+        postgresql_where=sa.text("role = 'system' AND deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        "idx_messages_system",
+        "messages",
+        ["chat_id", "user_id", "created_at"],
+        unique=False,
+        postgresql_where=sa.text("role = 'system' AND deleted_at IS NULL"),
+    )
+    # Ссылка на system-строку восстанавливается только для диалогов, где она есть в messages
+    op.add_column("conversations", sa.Column("system_message_id", sa.BigInteger(), nullable=True))
+    op.execute("""
+        UPDATE conversations c
+        SET system_message_id = (
+            SELECT m.id
+            FROM messages m
+            WHERE m.chat_id = c.chat_id
+                AND m.user_id = c.user_id
+                AND m.role = 'system'
+                AND m.deleted_at IS NULL
+            ORDER BY m.created_at, m.id
+            LIMIT 1
+        )
+    """)
+    op.drop_constraint("conversations_system_prompt_id_fkey", "conversations", type_="foreignkey")
+    op.drop_column("conversations", "system_prompt_id")
+    op.drop_table("system_prompts")
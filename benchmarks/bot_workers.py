@@ -0,0 +1,106 @@
+"""
+Бенчмарк масштабирования BotSupervisor: пропускная способность обработки
+обновлений в зависимости от числа процессов-обработчиков.
+
+Процессы-обработчики заменены CPU-нагрузкой, типичной для обработки
+обновления (разбор в модели aiogram, сериализация ответа в JSON), без БД и
+LLM - так измеряется именно масштабирование по ядрам. Каждый процесс
+проверяет, что обновления одного чата пришли по порядку.
+
+Запуск:
+    uv run python -m benchmarks.bot_workers
+"""
+
+import asyncio
+import os
+import signal
+import time
+from multiprocessing.queues import Queue
+from typing import Any
+
+from aiogram.types import Update
+
+from src.bot_supervisor import BotSupervisor
+from src.config import Config
+
+WORKER_COUNTS = [1, 2, 4]
+UPDATES = 10_000
+CHATS = 1_000
+# Повторов разбора на обновление: грубо соответствует CPU-стоимости хода бота
+PARSE_ROUNDS = 5
+
+
+def make_update(update_id: int) -> dict[str, Any]:
+    """Обновление с текстовым сообщением, как из getUpdates"""
+    chat_id = update_id % CHATS + 1
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1_700_000_000 + update_id,
+            "chat": {"id": chat_id, "type": "private", "first_name": "Bench"},
+            "from": {
+                "id": chat_id,
+                "is_bot": False,
+                "first_name": "Bench",
+                "username": f"bench_{chat_id}",
+                "language_code": "ru",
+            },
+            "text": f"Сообщение {update_id} для бенчмарка процессов-обработчиков",
+        },
+    }
+
+
+def bench_worker(
+    index: int, updates: "Queue[dict[str, Any] | None]", ready: "Queue[tuple[int, bool]]"
+) -> None:
+    """Процесс-обработчик бенчмарка: CPU-нагрузка и проверка порядка внутри чата"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ready.put((index, True))
+    last_seen: dict[int, int] = {}
+    processed = 0
+    out_of_order = 0
+    while (update := updates.get()) is not None:
+        for _ in range(PARSE_ROUNDS):
+            Update.model_validate(update).model_dump_json(exclude_none=True)
+        chat_id, update_id = update["message"]["chat"]["id"], update["update_id"]
+        if update_id < last_seen.get(chat_id, update_id):
+            out_of_order += 1
+        last_seen[chat_id] = update_id
+        processed += 1
+    if out_of_order:
+        print(f"worker {index}: {out_of_order} of {processed} updates out of order")
+
+
+async def measure(workers: int) -> float:
+    """Время обработки UPDATES обновлений (секунды) при заданном числе процессов"""
+    config = Config(bot_workers=workers)  # type: ignore[call-arg]
+    supervisor = BotSupervisor(config, worker=bench_worker)
+    assert await supervisor.start()
+
+    # Прогрев: процессы импортируют aiogram и забирают первое обновление
+    for chat_id in range(workers):
+        await supervisor.put(make_update(-CHATS + chat_id))
+    while not all(updates.empty() for updates in supervisor._queues):
+        await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    for update_id in range(UPDATES):
+        await supervisor.put(make_update(update_id))
+    await supervisor.stop()
+    return time.perf_counter() - started
+
+
+async def main() -> None:
+    print(f"CPU cores: {os.cpu_count()}, updates: {UPDATES}, chats: {CHATS}")
+    print(f"{'workers':>8} {'updates/s':>12} {'speedup':>8}")
+    baseline = 0.0
+    for workers in WORKER_COUNTS:
+        elapsed = await measure(workers)
+        throughput = UPDATES / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>12.0f} {throughput / baseline:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Бенчмарк чтения истории диалога: латентность MessageRepository.get_history
+в зависимости от длины диалога.
+
+Запуск (нужна БД с примененными миграциями):
+    uv run python -m benchmarks.history_query
+"""
+
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, text
+
+from src.config import Config
+from src.database import Database
+from src.db_models import Message
+from src.models import ConversationKey
+from src.repository import MessageRepository
+
+CONVERSATION_SIZES = [100, 1_000, 10_000, 50_000]
+HISTORY_LIMIT = 20
+ITERATIONS = 50
+BENCH_CHAT_ID_BASE = -900_000_000  # отрицательные chat_id не пересекаются с Telegram
+
+
+async def seed_conversation(database: Database, key: ConversationKey, size: int) -> None:
+    """Заполнить диалог size сообщениями с разным created_at"""
+    started_at = datetime.now() - timedelta(seconds=size)
+    rows = [
+        {
+            "chat_id": key.chat_id,
+            "user_id": key.user_id,
+            "role": "user" if i % 2 else "assistant",
+            "content": f"Benchmark message {i}",
+            "content_length": len(f"Benchmark message {i}"),
+            "created_at": started_at + timedelta(seconds=i),
+        }
+        for i in range(size)
+    ]
+    async for session in database.get_session():
+        await session.execute(insert(Message), rows)
+        await session.commit()
+        # Статистика планировщика как на "живой" таблице, а не сразу после массовой вставки
+        await session.execute(text("ANALYZE messages"))
+
+
+async def measure(database: Database, key: ConversationKey) -> list[float]:
+    """Измерить латентность get_history в миллисекундах"""
+    timings = []
+    async for session in database.get_session():
+        repo = MessageRepository(session)
+        await repo.get_history(key, limit=HISTORY_LIMIT)  # прогрев
+        for _ in range(ITERATIONS):
+            started = time.perf_counter()
+            await repo.get_history(key, limit=HISTORY_LIMIT)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main() -> None:
+    config = Config()  # type: ignore[call-arg]
+    database = Database(config.database_url)
+    keys = [
+        ConversationKey(chat_id=BENCH_CHAT_ID_BASE - i, user_id=BENCH_CHAT_ID_BASE - i)
+        for i in range(len(CONVERSATION_SIZES))
+    ]
+
+    try:
+        print(f"{'messages':>10} {'p50, ms':>10} {'p95, ms':>10}")
+        for key, size in zip(keys, CONVERSATION_SIZES, strict=True):
+            await seed_conversation(database, key, size)
+            timings = await measure(database, key)
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            print(f"{size:>10} {statistics.median(timings):>10.2f} {p95:>10.2f}")
+    finally:
+        async for session in database.get_session():
+            await session.execute(
+                delete(Message).where(Message.chat_id.in_([key.chat_id for key in keys]))
+            )
+            await session.commit()
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
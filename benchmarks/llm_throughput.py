@@ -0,0 +1,88 @@
+"""
+Бенчмарк пропускной способности LLMClient против фейкового LLM сервера.
+
+Сервер (src.fake_llm) поднимается в том же процессе на локальном порту,
+LLMClient ходит к нему по HTTP через OPENROUTER_BASE_URL - квота не тратится.
+Поведение сервера задается переменными FAKE_LLM_* (задержки, скорость, ошибки),
+поведение клиента - обычной конфигурацией (LLM_MAX_CONCURRENT_REQUESTS и т.д.).
+
+Запуск:
+    uv run python -m benchmarks.llm_throughput
+"""
+
+import asyncio
+import statistics
+import time
+
+import uvicorn
+
+from src.config import Config
+from src.fake_llm.app import create_app
+from src.fake_llm.config import FakeLLMConfig
+from src.llm_client import LLMClient
+from src.models import ChatMessage
+
+CONCURRENCY_LEVELS = [1, 8, 32, 128]
+REQUESTS_PER_LEVEL = 256
+BENCH_PORT = 18090
+
+
+async def measure(client: LLMClient, concurrency: int) -> tuple[list[float], int, float]:
+    """Выполнить REQUESTS_PER_LEVEL запросов с заданным параллелизмом"""
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: list[float] = []
+    errors = 0
+
+    async def request(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await client.get_response([ChatMessage(role="user", content=f"Вопрос {i}")])
+            except Exception:
+                errors += 1
+                return
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(REQUESTS_PER_LEVEL)))
+    return timings, errors, time.perf_counter() - started
+
+
+async def main() -> None:
+    fake_config = FakeLLMConfig(host="127.0.0.1", port=BENCH_PORT)
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(fake_config),
+            host=fake_config.host,
+            port=fake_config.port,
+            log_level="warning",
+        )
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    config = Config(  # type: ignore[call-arg]
+        openrouter_base_url=f"http://{fake_config.host}:{fake_config.port}/v1"
+    )
+    client = LLMClient(config)
+
+    try:
+        print(f"{'concurrency':>12} {'req/s':>10} {'p50, ms':>10} {'p95, ms':>10} {'errors':>8}")
+        for concurrency in CONCURRENCY_LEVELS:
+            timings, errors, elapsed = await measure(client, concurrency)
+            p50 = statistics.median(timings) if timings else 0.0
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else p50
+            print(
+                f"{concurrency:>12} {len(timings) / elapsed:>10.1f} "
+                f"{p50:>10.1f} {p95:>10.1f} {errors:>8}"
+            )
+        print(f"LLM rate limiter: {client.rate_limiter.stats()}")
+    finally:
+        server.should_exit = True
+        await server_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
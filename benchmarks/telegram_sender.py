@@ -0,0 +1,85 @@
+"""
+Бенчмарк TelegramSender: устойчивая скорость отправки при всплеске ответов.
+
+Bot API заменен фейковым ботом без сети: он принимает не больше
+FAKE_GLOBAL_LIMIT сообщений за скользящую секунду, сверх лимита отвечает
+RetryAfter (429), как Telegram. Всплеск - REPLIES ответов в CHATS чатов,
+каждый LONG_REPLY_EVERY-й длиннее 4096 символов. Сравниваются лимиты из
+конфигурации по умолчанию и отправка без ограничения скорости.
+
+Запуск:
+    uv run python -m benchmarks.telegram_sender
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from src.config import Config
+from src.telegram_sender import TelegramSender
+
+REPLIES = 300
+CHATS = 100
+LONG_REPLY_EVERY = 10
+FAKE_GLOBAL_LIMIT = 30
+FAKE_RETRY_AFTER = 1
+
+
+class FakeBot:
+    """Bot API с глобальным flood control: FAKE_GLOBAL_LIMIT сообщений в секунду"""
+
+    def __init__(self) -> None:
+        self._window: deque[float] = deque()
+        self.delivered: int = 0
+        self.flood_errors: int = 0
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        now = time.monotonic()
+        while self._window and now - self._window[0] >= 1.0:
+            self._window.popleft()
+        if len(self._window) >= FAKE_GLOBAL_LIMIT:
+            self.flood_errors += 1
+            raise TelegramRetryAfter(
+                SendMessage(chat_id=chat_id, text=text), "Too Many Requests", FAKE_RETRY_AFTER
+            )
+        self._window.append(now)
+        self.delivered += 1
+
+
+async def measure(global_rate: float) -> None:
+    """Отправить всплеск ответов и вывести скорость отправки"""
+    config = Config(  # type: ignore[call-arg]
+        telegram_global_messages_per_second=global_rate,
+        telegram_send_max_retries=100,
+    )
+    bot = FakeBot()
+    sender = TelegramSender(bot, config)  # type: ignore[arg-type]
+
+    started = time.perf_counter()
+    for i in range(REPLIES):
+        text = "x" * 5000 if i % LONG_REPLY_EVERY == 0 else f"Ответ {i}"
+        await sender.send(i % CHATS, text)
+    enqueued = time.perf_counter() - started
+    await sender.stop()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{global_rate:>12.0f} {enqueued * 1000:>12.1f} {elapsed:>10.1f} "
+        f"{bot.delivered / elapsed:>10.1f} {bot.flood_errors:>8}"
+    )
+
+
+async def main() -> None:
+    logging.getLogger("src.telegram_sender").setLevel(logging.ERROR)
+    print(f"replies: {REPLIES}, chats: {CHATS}, fake API limit: {FAKE_GLOBAL_LIMIT}/s")
+    print(f"{'limit, msg/s':>12} {'enqueue, ms':>12} {'total, s':>10} {'sent/s':>10} {'429':>8}")
+    await measure(Config.model_fields["telegram_global_messages_per_second"].default)
+    await measure(10_000)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,6 +11,15 @@ export interface TopUser {
   message_count: number
 }
 
+export interface LLMUsageByDate {
+  date: string // ISO date format: "2025-10-17"
+  replies: number
+  prompt_tokens: number
+  completion_tokens: number
+  p50_latency_ms: number
+  p95_latency_ms: number
+}
+
 export interface StatisticsResponse {
   total_users: number
   active_users: number
@@ -18,4 +27,7 @@ export interface StatisticsResponse {
   avg_messages_per_user: number
   messages_by_date: MessageByDate[]
   top_users: TopUser[]
+  total_prompt_tokens: number
+  total_completion_tokens: number
+  llm_usage_by_date: LLMUsageByDate[]
 }
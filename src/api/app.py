@@ -1,10 +1,16 @@
 """FastAPI приложение для веб-интерфейса."""
 
+import asyncio
+import json
+import logging
+from collections.abc import AsyncIterator, Awaitable, Mapping
+from contextlib import aclosing, asynccontextmanager
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, TypeVar
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 from src.api.chat_handler import WebChatHandler
 from src.api.models import (
@@ -19,16 +25,38 @@ from src.api.models import (
 from src.api.real_stat_collector import RealStatCollector
 from src.api.stat_collector import StatCollectorProtocol
 from src.api.text2sql_handler import Text2SQLHandler
+from src.circuit_breaker import CLOSED
 from src.config import Config
 from src.conversation import ConversationManager
 from src.database import Database
+from src.history_cache import HistoryCache
+from src.history_summarizer import HistorySummarizer
 from src.llm_client import LLMClient
+from src.llm_errors import LLMUnavailableError
+from src.llm_response_cache import LLMResponseCache
+from src.message_write_queue import MessageWriteQueue
+from src.turn_errors import TurnCancelledError
+from src.turn_tracker import TurnTracker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Остановка фоновых компонентов при завершении приложения."""
+    yield
+    if message_write_queue is not None:
+        await message_write_queue.stop()
+
 
 # Создание FastAPI приложения
 app = FastAPI(
     title="AIDD API",
     description="API для дашборда и веб-чата AIDD бота",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Настройка CORS для frontend
@@ -56,6 +84,7 @@ config = Config()  # type: ignore[call-arg]
 database: Database | None = None
 stat_collector: StatCollectorProtocol | None = None
 chat_handler: WebChatHandler | None = None
+message_write_queue: MessageWriteQueue | None = None
 try:
     database = Database(config.database_url)
 
@@ -65,15 +94,55 @@ try:
         active_users_days=30,  # Период для активных пользователей
     )
 
-    llm_client = LLMClient(config)
+    response_cache = (
+        LLMResponseCache(
+            config,
+            session_factory=(
+                database.get_session if config.llm_response_cache_persistent else None
+            ),
+        )
+        if config.llm_response_cache_enabled
+        else None
+    )
+    llm_client = LLMClient(config, response_cache=response_cache)
+    history_cache = (
+        HistoryCache(
+            max_entries=config.history_cache_max_entries,
+            max_bytes=config.history_cache_max_bytes,
+            ttl_seconds=config.history_cache_ttl_seconds,
+        )
+        if config.history_cache_enabled
+        else None
+    )
+    history_summarizer = (
+        HistorySummarizer(
+            session_factory=database.get_session,
+            llm_client=llm_client,
+            config=config,
+            history_cache=history_cache,
+        )
+        if config.history_summary_enabled
+        else None
+    )
+    if config.message_write_queue_enabled:
+        message_write_queue = MessageWriteQueue(
+            session_factory=database.get_session, config=config
+        )
+    turn_tracker = TurnTracker(config)
     conversation_manager = ConversationManager(
         session_factory=database.get_session,
         max_history_messages=config.max_history_messages,
+        history_cache=history_cache,
+        history_token_budget=config.history_token_budget or None,
+        history_summarizer=history_summarizer,
+        message_write_queue=message_write_queue,
+        turn_tracker=turn_tracker,
     )
     chat_handler = WebChatHandler(
         llm_client=llm_client,
         conversation_manager=conversation_manager,
         system_prompt=config.system_prompt,
+        turn_tracker=turn_tracker,
     )
 except Exception as e:
     import logging
@@ -129,25 +198,135 @@ async def get_statistics(
     return await stat_collector.get_statistics(start_date=start_date, end_date=end_date)
 
 
+LLM_UNAVAILABLE_DETAIL = "LLM temporarily unavailable"
+TURN_CANCELLED_DETAIL = "Chat history was cleared"
+TURN_DEADLINE_DETAIL = "Response deadline exceeded"
+# Период проверки отключения клиента во время обычного (не потокового) запроса
+DISCONNECT_POLL_SECONDS = 0.5
+
+
 @app.post("/api/v1/chat/message", response_model=ChatMessageResponse)
-async def send_chat_message(request: ChatMessageRequest) -> ChatMessageResponse:
+async def send_chat_message(
+    request: ChatMessageRequest, http_request: Request
+) -> ChatMessageResponse:
     """
     Отправить сообщение в чат и получить ответ от бота.
 
+    Если клиент отключился до ответа, ход отменяется: запрос к LLM
+    прерывается, ответ не сохраняется.
+
     Args:
         request: ChatMessageRequest с user_id и сообщением
+        http_request: HTTP запрос (для проверки отключения клиента)
 
     Returns:
         ChatMessageResponse с ответом бота и message_id
+
+    Raises:
+        HTTPException: 503, если LLM временно недоступна; 409, если история
+            очищена во время генерации; 504 по дедлайну хода
     """
     if chat_handler is None:
         raise RuntimeError("Chat handler not initialized")
-    response, message_id = await chat_handler.send_message(
-        user_id=request.user_id, message=request.message
-    )
+    try:
+        response, message_id = await _cancel_on_disconnect(
+            http_request,
+            chat_handler.send_message(user_id=request.user_id, message=request.message),
+        )
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=LLM_UNAVAILABLE_DETAIL) from e
+    except TurnCancelledError as e:
+        raise HTTPException(status_code=409, detail=TURN_CANCELLED_DETAIL) from e
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=TURN_DEADLINE_DETAIL) from e
     return ChatMessageResponse(response=response, message_id=message_id)
 
 
+async def _cancel_on_disconnect(http_request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Выполнить обработку запроса, отменяя ее при отключении клиента.
+
+    Raises:
+        HTTPException: 499, если клиент отключился до ответа
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling chat request")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def _sse_event(data: dict[str, str], event: str | None = None) -> str:
+    """Сформировать событие Server-Sent Events."""
+    prefix = f"event: {event}\n" if event is not None else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/v1/chat/stream")
+async def stream_chat_message(
+    request: ChatMessageRequest, http_request: Request
+) -> StreamingResponse:
+    """
+    Отправить сообщение в чат и получать ответ потоком (Server-Sent Events).
+
+    События: `data: {"delta": ...}` на каждый фрагмент ответа, затем
+    `event: done` или `event: error` (в том числе при очистке истории во
+    время генерации и по дедлайну хода). При отключении клиента запрос к LLM
+    отменяется, частичный ответ не сохраняется.
+
+    Args:
+        request: ChatMessageRequest с user_id и сообщением
+        http_request: HTTP запрос (для проверки отключения клиента)
+
+    Returns:
+        StreamingResponse с типом text/event-stream
+    """
+    if chat_handler is None:
+        raise RuntimeError("Chat handler not initialized")
+    handler = chat_handler
+
+    async def events() -> AsyncIterator[str]:
+        stream = handler.stream_message(user_id=request.user_id, message=request.message)
+        try:
+            # aclosing закрывает поток ответа (и запрос к LLM) при любом выходе
+            async with aclosing(stream) as deltas:
+                async for delta in deltas:
+                    if await http_request.is_disconnected():
+                        logger.info(f"Client disconnected from chat stream: {request.user_id}")
+                        return
+                    yield _sse_event({"delta": delta})
+        except LLMUnavailableError:
+            yield _sse_event({"detail": LLM_UNAVAILABLE_DETAIL}, event="error")
+            return
+        except TurnCancelledError:
+            yield _sse_event({"detail": TURN_CANCELLED_DETAIL}, event="error")
+            return
+        except TimeoutError:
+            yield _sse_event({"detail": TURN_DEADLINE_DETAIL}, event="error")
+            return
+        except Exception:
+            logger.exception("Chat stream failed")
+            yield _sse_event({"detail": "Failed to generate response"}, event="error")
+            return
+        yield _sse_event({}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/api/v1/chat/history/{user_id}", response_model=ChatHistoryResponse)
 async def get_chat_history(user_id: str) -> ChatHistoryResponse:
     """
@@ -201,7 +380,49 @@ async def execute_admin_query(request: Text2SQLRequest) -> Text2SQLResponse:
         raise HTTPException(status_code=400, detail=str(e)) from e
 
 
+@app.get("/api/v1/metrics")
+async def get_metrics() -> dict[str, Mapping[str, float]]:
+    """
+    Метрики компонентов веб-чата для мониторинга.
+
+    Returns:
+        Счетчики по компонентам: попытки LLM, очередь LLM, справедливая очередь
+        по пользователям, кэш ответов LLM, circuit breaker, ходы диалога (в работе,
+        отмененные, по дедлайну), кэш истории, очередь записи сообщений (только включенные компоненты)
+    """
+    if chat_handler is None:
+        raise RuntimeError("Chat handler not initialized")
+    metrics: dict[str, Mapping[str, float]] = {
+        "llm": chat_handler.llm_client.metrics.stats(),
+        "llm_rate_limiter": chat_handler.llm_client.rate_limiter.stats(),
+    }
+    if chat_handler.llm_client.scheduler is not None:
+        metrics["llm_fair_scheduler"] = chat_handler.llm_client.scheduler.stats()
+    if chat_handler.llm_client.response_cache is not None:
+        metrics["llm_response_cache"] = chat_handler.llm_client.response_cache.stats()
+    if chat_handler.llm_client.breaker is not None:
+        metrics["llm_circuit_breaker"] = chat_handler.llm_client.breaker.stats()
+    if chat_handler.turn_tracker is not None:
+        metrics["turns"] = chat_handler.turn_tracker.stats()
+    manager = chat_handler.conversation_manager
+    if manager.history_cache is not None:
+        metrics["history_cache"] = manager.history_cache.stats()
+    if manager.message_write_queue is not None:
+        metrics["message_write_queue"] = manager.message_write_queue.stats()
+    return metrics
+
+
 @app.get("/health")
-async def health() -> dict[str, str]:
-    """Health check endpoint."""
-    return {"status": "healthy"}
+async def health() -> dict[str, str | dict[str, str]]:
+    """
+    Health check endpoint.
+
+    status: healthy или degraded (цепь хотя бы одного маршрута LLM не замкнута);
+    llm_circuits: состояния цепей по маршрутам model@base_url (если включен
+    circuit breaker).
+    """
+    if chat_handler is None or chat_handler.llm_client.breaker is None:
+        return {"status": "healthy"}
+    circuits = chat_handler.llm_client.breaker.states()
+    degraded = any(state != CLOSED for state in circuits.values())
+    return {"status": "degraded" if degraded else "healthy", "llm_circuits": circuits}
@@ -1,12 +1,20 @@
+import asyncio
 import logging
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from datetime import datetime
 
 from src.api.models import ChatHistoryItem, ChatHistoryResponse
 from src.conversation import ConversationManager
 from src.llm_client import LLMClient
-from src.models import ChatMessage
+from src.models import ChatMessage, ConversationKey, LLMUsage
+from src.turn_tracker import TurnTracker, tracked_turn
 
 logger = logging.getLogger(__name__)
 
+# Сколько фрагментов ответа генерация может опережать отправку клиенту
+STREAM_BUFFER_SIZE = 1
+
 
 def user_id_to_int(user_id: str) -> int:
     """Convert string user_id to integer for ConversationKey."""
@@ -14,17 +22,24 @@ def user_id_to_int(user_id: str) -> int:
 
 
 class WebChatHandler:
-    """Обработчик веб-чата (аналог Telegram handlers)."""
+    """
+    Обработчик веб-чата (аналог Telegram handlers).
+
+    С TurnTracker ход send_message и stream_message ограничен дедлайном и
+    отменяется при очистке истории или отмене задачи запроса (клиент отключился).
+    """
 
     def __init__(
         self,
         llm_client: LLMClient,
         conversation_manager: ConversationManager,
         system_prompt: str,
+        turn_tracker: TurnTracker | None = None,
     ) -> None:
         self.llm_client: LLMClient = llm_client
         self.conversation_manager: ConversationManager = conversation_manager
         self.system_prompt: str = system_prompt
+        self.turn_tracker: TurnTracker | None = turn_tracker
 
     async def send_message(self, user_id: str, message: str) -> tuple[str, int]:
         """
@@ -36,6 +51,12 @@ class WebChatHandler:
 
         Returns:
             Кортеж (ответ от бота, ID сохраненного сообщения)
+
+        Raises:
+            LLMUnavailableError: LLM временно недоступна (сообщение не сохраняется,
+                если цепи всех моделей разомкнуты)
+            TurnCancelledError: История очищена во время генерации ответа
+            TimeoutError: Истек дедлайн хода
         """
         # Преобразование user_id в int
         user_id_int = user_id_to_int(user_id)
@@ -44,19 +65,28 @@ class WebChatHandler:
         )
 
         try:
-            # Добавляем сообщение пользователя в историю
-            user_message = ChatMessage(role="user", content=message)
-            await self.conversation_manager.add_message(key, user_message)
+            # Быстрый отказ до записи в БД, если цепи всех моделей разомкнуты
+            self.llm_client.check_available()
 
-            # Получаем историю с system prompt
-            history = await self.conversation_manager.get_history(key, self.system_prompt)
+            async with tracked_turn(self.turn_tracker, key):
+                # Сохраняем сообщение пользователя и получаем историю с system prompt
+                turn = await self.conversation_manager.start_turn(
+                    key, ChatMessage(role="user", content=message), self.system_prompt
+                )
 
-            # Получение ответа от LLM
-            response = await self.llm_client.get_response(history)
+                # Получение ответа от LLM (расход токенов сохраняется вместе с ответом)
+                usage: list[LLMUsage] = []
+                response = await self.llm_client.get_response(
+                    turn.history, user_id=turn.key.user_id, on_usage=usage.append
+                )
 
-            # Добавляем ответ ассистента в историю
-            assistant_message = ChatMessage(role="assistant", content=response)
-            await self.conversation_manager.add_message(key, assistant_message)
+                # Добавляем ответ ассистента в историю
+                await self.conversation_manager.finish_turn(
+                    turn,
+                    ChatMessage(
+                        role="assistant", content=response, usage=usage[-1] if usage else None
+                    ),
+                )
 
             logger.debug(f"Chat message processed for user {user_id}")
 
@@ -69,6 +99,89 @@ class WebChatHandler:
             logger.error(f"Error processing chat message for user {user_id}: {e}")
             raise
 
+    async def stream_message(self, user_id: str, message: str) -> AsyncGenerator[str, None]:
+        """
+        Отправить сообщение и получать ответ по мере генерации.
+
+        Ответ ассистента сохраняется один раз, после окончания потока.
+        Если потребитель прекращает чтение (клиент отключился), генератор
+        закрывается, upstream-запрос к LLM закрывается вместе с ним,
+        а частичный ответ не сохраняется. Генерация идет в отдельной задаче
+        и опережает потребителя не больше чем на STREAM_BUFFER_SIZE фрагментов.
+
+        Args:
+            user_id: ID веб-пользователя (строка)
+            message: Текст сообщения пользователя
+
+        Yields:
+            Фрагменты ответа бота
+
+        Raises:
+            LLMUnavailableError: LLM временно недоступна
+            TurnCancelledError: История очищена во время генерации ответа
+            TimeoutError: Истек дедлайн хода
+        """
+        user_id_int = user_id_to_int(user_id)
+        key = self.conversation_manager.get_conversation_key(
+            chat_id=user_id_int, user_id=user_id_int
+        )
+
+        try:
+            self.llm_client.check_available()
+
+            # Ход (дедлайн, отмена через TurnTracker) выполняется в отдельной задаче:
+            # пока генератор стоит на yield, отмена попадает в нее, а не в потребителя
+            deltas: asyncio.Queue[str | None] = asyncio.Queue(maxsize=STREAM_BUFFER_SIZE)
+            producer = asyncio.create_task(self._produce_stream(key, message, deltas))
+            try:
+                while (delta := await deltas.get()) is not None:
+                    yield delta
+                await producer
+            finally:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+            logger.debug(f"Chat stream processed for user {user_id}")
+
+        except Exception as e:
+            logger.error(f"Error streaming chat message for user {user_id}: {e}")
+            raise
+
+    async def _produce_stream(
+        self, key: ConversationKey, message: str, deltas: "asyncio.Queue[str | None]"
+    ) -> None:
+        """Ход stream_message: фрагменты ответа в deltas, None - конец потока или ошибка"""
+        try:
+            async with tracked_turn(self.turn_tracker, key):
+                turn = await self.conversation_manager.start_turn(
+                    key, ChatMessage(role="user", content=message), self.system_prompt
+                )
+
+                parts: list[str] = []
+                usage: list[LLMUsage] = []
+                async with aclosing(
+                    self.llm_client.stream_response(
+                        turn.history, user_id=turn.key.user_id, on_usage=usage.append
+                    )
+                ) as stream:
+                    async for delta in stream:
+                        parts.append(delta)
+                        await deltas.put(delta)
+
+                await self.conversation_manager.finish_turn(
+                    turn,
+                    ChatMessage(
+                        role="assistant",
+                        content="".join(parts),
+                        usage=usage[-1] if usage else None,
+                    ),
+                )
+        except Exception:
+            # Отмена задачи извне (потребитель закрыл поток) сюда не попадает:
+            # конец потока тогда ждать некому
+            await deltas.put(None)
+            raise
+        await deltas.put(None)
+
     async def get_history(self, user_id: str) -> ChatHistoryResponse:
         """
         Получить историю чата.
@@ -93,9 +206,7 @@ class WebChatHandler:
                 ChatHistoryItem(
                     role=msg.role,
                     content=msg.content,
-                    created_at=msg.created_at
-                    if hasattr(msg, "created_at")
-                    else __import__("datetime").datetime.now(),
+                    created_at=msg.created_at or datetime.now(),
                 )
                 for msg in history
                 if msg.role != "system"
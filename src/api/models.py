@@ -20,6 +20,17 @@ class TopUser(BaseModel):
     message_count: int = Field(ge=0, description="Количество сообщений пользователя")
 
 
+class LLMUsageByDate(BaseModel):
+    """Расход LLM по дате."""
+
+    date: datetime = Field(description="Дата (без времени)")
+    replies: int = Field(ge=0, description="Количество ответов LLM за день")
+    prompt_tokens: int = Field(ge=0, description="Токены промптов за день")
+    completion_tokens: int = Field(ge=0, description="Токены ответов за день")
+    p50_latency_ms: float = Field(ge=0, description="Медиана задержки ответа LLM, мс")
+    p95_latency_ms: float = Field(ge=0, description="95-й перцентиль задержки ответа LLM, мс")
+
+
 class StatisticsResponse(BaseModel):
     """Ответ с полной статистикой для дашборда."""
 
@@ -33,6 +44,13 @@ class StatisticsResponse(BaseModel):
     top_users: list[TopUser] = Field(
         default_factory=list, description="Топ-10 активных пользователей"
     )
+    total_prompt_tokens: int = Field(default=0, ge=0, description="Токены промптов за период")
+    total_completion_tokens: int = Field(
+        default=0, ge=0, description="Токены ответов LLM за период"
+    )
+    llm_usage_by_date: list[LLMUsageByDate] = Field(
+        default_factory=list, description="Расход токенов и задержки LLM по датам"
+    )
 
 
 class ChatMessageRequest(BaseModel):
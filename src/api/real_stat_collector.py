@@ -6,7 +6,7 @@ from datetime import datetime, timedelta
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.models import MessageByDate, StatisticsResponse, TopUser
+from src.api.models import LLMUsageByDate, MessageByDate, StatisticsResponse, TopUser
 from src.db_models import Message, User
 
 
@@ -69,7 +69,9 @@ class RealStatCollector:
         start_date = _to_naive_datetime(start_date)
         end_date = _to_naive_datetime(end_date)
 
-        async for session in self.session_factory():
+        session_gen = self.session_factory()
+        session = await session_gen.__anext__()
+        try:
             # Total users
             total_users = await self._get_total_users(session)
 
@@ -90,6 +92,9 @@ class RealStatCollector:
             # Top users
             top_users = await self._get_top_users(session, start_date, end_date)
 
+            # LLM usage and latency by date
+            llm_usage_by_date = await self._get_llm_usage_by_date(session, start_date, end_date)
+
             return StatisticsResponse(
                 total_users=total_users,
                 active_users=active_users,
@@ -97,10 +102,12 @@ class RealStatCollector:
                 avg_messages_per_user=avg_messages_per_user,
                 messages_by_date=messages_by_date,
                 top_users=top_users,
+                total_prompt_tokens=sum(day.prompt_tokens for day in llm_usage_by_date),
+                total_completion_tokens=sum(day.completion_tokens for day in llm_usage_by_date),
+                llm_usage_by_date=llm_usage_by_date,
             )
-
-        # Этот код никогда не должен выполняться, но нужен для mypy
-        raise RuntimeError("Session factory didn't yield a session")
+        finally:
+            await session_gen.aclose()
 
     async def _get_total_users(self, session: AsyncSession) -> int:
         """Получить общее количество пользователей."""
@@ -180,6 +187,54 @@ class RealStatCollector:
             for row in rows
         ]
 
+    async def _get_llm_usage_by_date(
+        self,
+        session: AsyncSession,
+        start_date: datetime | None,
+        end_date: datetime | None,
+    ) -> list[LLMUsageByDate]:
+        """
+        Получить расход токенов и перцентили задержки ответов LLM по датам.
+
+        Учитываются ответы ассистента с записанным расходом (latency_ms),
+        включая удаленные из истории: токены за них уже потрачены.
+        """
+        date_column = func.date(Message.created_at)
+
+        query = (
+            select(
+                date_column.label("date"),
+                func.count(Message.id).label("replies"),
+                func.coalesce(func.sum(Message.prompt_tokens), 0).label("prompt_tokens"),
+                func.coalesce(func.sum(Message.completion_tokens), 0).label("completion_tokens"),
+                func.percentile_cont(0.5).within_group(Message.latency_ms).label("p50"),
+                func.percentile_cont(0.95).within_group(Message.latency_ms).label("p95"),
+            )
+            .where(Message.latency_ms.is_not(None))
+            .group_by(date_column)
+            .order_by(date_column)
+        )
+
+        if start_date is not None:
+            query = query.where(Message.created_at >= start_date)
+        if end_date is not None:
+            query = query.where(Message.created_at <= end_date)
+
+        result = await session.execute(query)
+        rows = result.all()
+
+        return [
+            LLMUsageByDate(
+                date=datetime.combine(row.date, datetime.min.time()),
+                replies=row.replies,
+                prompt_tokens=row.prompt_tokens,
+                completion_tokens=row.completion_tokens,
+                p50_latency_ms=row.p50,
+                p95_latency_ms=row.p95,
+            )
+            for row in rows
+        ]
+
     async def _get_top_users(
         self,
         session: AsyncSession,
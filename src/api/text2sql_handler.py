@@ -114,8 +114,8 @@ class Text2SQLHandler:
                 ChatMessage(role="user", content=user_query),
             ]
 
-            # Get SQL from LLM
-            llm_response = await self.llm_client.get_response(history)
+            # Get SQL from LLM (repeated questions are served from the response cache)
+            llm_response = await self.llm_client.get_response(history, cache=True)
             logger.debug(f"LLM response: {llm_response}")
 
             # Extract SQL from response
@@ -128,12 +128,14 @@ class Text2SQLHandler:
             # Clean up SQL - remove any remaining markdown artifacts
             sql_query = re.sub(r"```\s*(?:sql)?\s*", "", sql_query).strip()
 
-            # Validate SQL
-            if not self.validate_sql(sql_query):
-                raise ValueError(f"Invalid or unsafe SQL query: {sql_query}")
-
-            # Execute SQL
-            result = await self.execute_sql(sql_query)
+            # Validate and execute SQL; an unusable answer must not stay cached
+            try:
+                if not self.validate_sql(sql_query):
+                    raise ValueError(f"Invalid or unsafe SQL query: {sql_query}")
+                result = await self.execute_sql(sql_query)
+            except Exception:
+                await self.llm_client.forget_cached_response(history)
+                raise
 
             # Return response with SQL, result, and interpretation
             return Text2SQLResponse(
@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import logging
+from collections.abc import Mapping
+from typing import Any
+
+from .bot import TelegramBot
+from .chat_sequencer import ChatSequencer, Job
+from .config import Config, load_system_prompt_with_fallback
+from .conversation import ConversationManager
+from .database import Database
+from .handler_limiter import HandlerConcurrencyLimiter
+from .handlers import router
+from .history_cache import HistoryCache
+from .history_compactor import HistoryCompactor
+from .history_summarizer import HistorySummarizer
+from .llm_client import LLMClient
+from .message_write_queue import MessageWriteQueue
+from .telegram_sender import TelegramSender
+from .turn_tracker import TurnTracker
+from .update_routing import is_priority_update, update_chat_id
+from .user_profile_cache import UserProfileCache
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(log_level: str) -> None:
+    logging.basicConfig(
+        level=getattr(logging, log_level.upper()),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+
+class BotRuntime:
+    """
+    Компоненты бота в одном процессе: БД, LLMClient, ConversationManager,
+    фоновые задачи и Dispatcher с зависимостями для handlers.
+
+    Используется в обычном режиме (polling или webhook в одном процессе) и в
+    каждом процессе-обработчике BotSupervisor: у процесса свой пул соединений
+    БД и свой LLMClient. Обновления из webhook (feed) обрабатываются через
+    ChatSequencer: по порядку внутри чата, параллельно между чатами.
+    HandlerConcurrencyLimiter ограничивает число сообщений в обработке и
+    отвечает "занято" при перегрузке; метрики компонентов - stats().
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config: Config = config
+        self.database = Database(config.database_url)
+        self.bot = TelegramBot(config)
+        self.sequencer = ChatSequencer(max_pending=config.bot_worker_queue_size)
+        self.turn_tracker = TurnTracker(config)
+        self.history_compactor: HistoryCompactor | None = None
+        self.history_summarizer: HistorySummarizer | None = None
+        self.message_write_queue: MessageWriteQueue | None = None
+        self.user_profile_cache: UserProfileCache | None = None
+        self.telegram_sender: TelegramSender | None = (
+            TelegramSender(self.bot.bot, config) if config.telegram_sender_enabled else None
+        )
+        self.handler_limiter: HandlerConcurrencyLimiter | None = (
+            HandlerConcurrencyLimiter(config) if config.bot_max_concurrent_handlers > 0 else None
+        )
+        self.llm_client: LLMClient | None = None
+        self._metrics_task: asyncio.Task[None] | None = None
+
+    async def start(self) -> bool:
+        """
+        Проверить БД, создать компоненты и зарегистрировать handlers.
+
+        Returns:
+            False, если БД недоступна (бот не запускается)
+        """
+        config = self.config
+        if not await self.database.check_connection():
+            logger.error("Failed to connect to database")
+            return False
+
+        # Загрузка системного промпта из файла (с fallback на дефолт)
+        system_prompt = load_system_prompt_with_fallback(config.system_prompt_file)
+        logger.info(f"System prompt loaded from {config.system_prompt_file}")
+
+        llm_client = LLMClient(config)
+        self.llm_client = llm_client
+        history_cache = (
+            HistoryCache(
+                max_entries=config.history_cache_max_entries,
+                max_bytes=config.history_cache_max_bytes,
+                ttl_seconds=config.history_cache_ttl_seconds,
+            )
+            if config.history_cache_enabled
+            else None
+        )
+        if config.history_summary_enabled:
+            self.history_summarizer = HistorySummarizer(
+                session_factory=self.database.get_session,
+                llm_client=llm_client,
+                config=config,
+                history_cache=history_cache,
+            )
+        if config.user_profile_cache_enabled:
+            self.user_profile_cache = UserProfileCache(
+                max_entries=config.user_profile_cache_max_entries,
+                ttl_seconds=config.user_profile_cache_ttl_seconds,
+            )
+        if config.message_write_queue_enabled:
+            self.message_write_queue = MessageWriteQueue(
+                session_factory=self.database.get_session, config=config
+            )
+        conversation_manager = ConversationManager(
+            session_factory=self.database.get_session,
+            max_history_messages=config.max_history_messages,
+            history_cache=history_cache,
+            history_token_budget=config.history_token_budget or None,
+            history_summarizer=self.history_summarizer,
+            message_write_queue=self.message_write_queue,
+            turn_tracker=self.turn_tracker,
+            user_profile_cache=self.user_profile_cache,
+        )
+        if config.history_compaction_enabled:
+            self.history_compactor = HistoryCompactor(
+                session_factory=self.database.get_session,
+                interval_seconds=config.history_compaction_interval_seconds,
+                batch_size=config.history_compaction_batch_size,
+            )
+
+        # Регистрация handlers и зависимостей (dependency injection aiogram)
+        dp = self.bot.dp
+        if self.handler_limiter is not None:
+            dp.message.outer_middleware(self.handler_limiter)
+        dp.include_router(router)
+        dp["llm_client"] = llm_client
+        dp["conversation_manager"] = conversation_manager
+        dp["system_prompt"] = system_prompt
+        dp["turn_tracker"] = self.turn_tracker
+        dp["telegram_sender"] = self.telegram_sender
+        dp["stream_edit_interval"] = (
+            config.telegram_stream_edit_interval_seconds
+            if config.telegram_streaming_enabled
+            else None
+        )
+
+        if self.history_compactor is not None:
+            self.history_compactor.start()
+        if config.bot_metrics_log_interval_seconds > 0:
+            self._metrics_task = asyncio.create_task(
+                self._log_metrics(config.bot_metrics_log_interval_seconds)
+            )
+        return True
+
+    def feed_nowait(self, update: dict[str, Any]) -> bool:
+        """Принять обновление из webhook; False, если очередь обработки переполнена"""
+        return self.sequencer.put_nowait(*self._job(update))
+
+    async def feed(self, update: dict[str, Any]) -> None:
+        """Принять обновление, дождавшись места в очереди обработки"""
+        await self.sequencer.put(*self._job(update))
+
+    async def run_polling(self) -> None:
+        """Получать обновления long polling (в одном процессе, как раньше)"""
+        await self.bot.dp.start_polling(self.bot.bot)
+
+    async def stop(self) -> None:
+        """Дообработать принятые обновления и остановить фоновые задачи"""
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._metrics_task
+        await self.sequencer.join()
+        if self.telegram_sender is not None:
+            await self.telegram_sender.stop()
+        if self.history_compactor is not None:
+            await self.history_compactor.stop()
+        if self.history_summarizer is not None:
+            await self.history_summarizer.stop()
+        if self.message_write_queue is not None:
+            await self.message_write_queue.stop()
+        logger.info(f"Bot metrics: {self.stats()}")
+        await self.bot.stop()
+        await self.database.disconnect()
+
+    def stats(self) -> dict[str, Mapping[str, float]]:
+        """Метрики компонентов бота (как /metrics в API)"""
+        metrics: dict[str, Mapping[str, float]] = {
+            "updates": self.sequencer.stats(),
+            "turns": self.turn_tracker.stats(),
+        }
+        if self.handler_limiter is not None:
+            metrics["handlers"] = self.handler_limiter.stats()
+        if self.telegram_sender is not None:
+            metrics["telegram_sender"] = self.telegram_sender.stats()
+        if self.user_profile_cache is not None:
+            metrics["user_profile_cache"] = self.user_profile_cache.stats()
+        if self.llm_client is not None:
+            metrics["llm"] = self.llm_client.metrics.stats()
+        return metrics
+
+    async def _log_metrics(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            logger.info(f"Bot metrics: {self.stats()}")
+
+    def _job(self, update: dict[str, Any]) -> tuple[int | None, Job]:
+        """
+        Ключ очереди и задача обработки обновления.
+
+        /clear выполняется вне очереди чата, чтобы прервать текущий ход (TurnTracker).
+        """
+        key = None if is_priority_update(update) else update_chat_id(update)
+
+        async def process() -> None:
+            await self.bot.dp.feed_raw_update(self.bot.bot, update)
+
+        return key, process
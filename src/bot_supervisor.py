@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import time
+from collections.abc import Callable
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from typing import Any
+
+from .bot_worker import run_worker
+from .config import Config
+from .update_routing import update_shard
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждать, пока процессы-обработчики сообщат о запуске
+WORKER_START_TIMEOUT_SECONDS = 60.0
+# Сколько ждать завершения процесса-обработчика при остановке
+WORKER_STOP_TIMEOUT_SECONDS = 30.0
+# Упавший процесс перезапускается не чаще раза в этот интервал
+WORKER_RESTART_DELAY_SECONDS = 5.0
+# Период проверки процесса, пока put ждет места в его очереди
+WORKER_POLL_SECONDS = 1.0
+
+# Точка входа процесса-обработчика: (номер процесса, очередь обновлений,
+# очередь сообщений о запуске (номер, успех))
+WorkerTarget = Callable[[int, "Queue[dict[str, Any] | None]", "Queue[tuple[int, bool]]"], None]
+
+
+class BotSupervisor:
+    """
+    Процессы-обработчики обновлений Telegram с распределением по чатам.
+
+    Запускает bot_workers процессов (BotRuntime в каждом: свой event loop,
+    пул БД и LLMClient) и передает им обновления через локальные очереди
+    multiprocessing. Обновления одного чата всегда попадают в один процесс
+    (update_shard), где ChatSequencer обрабатывает их по порядку.
+    Очередь процесса ограничена bot_worker_queue_size: при переполнении
+    route отказывает, и webhook просит Telegram повторить доставку, а put
+    (long polling) ждет места в очереди.
+
+    start дожидается, пока каждый процесс сообщит о запуске. Упавший позже
+    процесс перезапускается при следующем обновлении его чатов (не чаще
+    раза в WORKER_RESTART_DELAY_SECONDS) и дообрабатывает его очередь.
+    """
+
+    def __init__(self, config: Config, worker: WorkerTarget = run_worker) -> None:
+        self.workers: int = config.bot_workers
+        self._worker = worker
+        self._context = multiprocessing.get_context("spawn")
+        self._queues: list[Queue[dict[str, Any] | None]] = [
+            self._context.Queue(maxsize=config.bot_worker_queue_size) for _ in range(self.workers)
+        ]
+        self._ready: Queue[tuple[int, bool]] = self._context.Queue()
+        self._processes: list[BaseProcess] = []
+        self._restarted_at: list[float] = [float("-inf")] * self.workers
+        self.routed: list[int] = [0] * self.workers
+        self.rejected: int = 0
+        self.restarts: int = 0
+
+    async def start(self) -> bool:
+        """
+        Запустить процессы-обработчики и дождаться их готовности.
+
+        Returns:
+            False, если какой-то процесс не запустился (процессы остановлены)
+        """
+        self._processes = [self._spawn(index) for index in range(self.workers)]
+        if await asyncio.to_thread(self._wait_ready):
+            logger.info(f"Started {self.workers} bot worker processes")
+            return True
+
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+            await asyncio.to_thread(process.join, WORKER_STOP_TIMEOUT_SECONDS)
+        return False
+
+    def route(self, update: dict[str, Any]) -> bool:
+        """Передать обновление процессу его чата; False, если очередь процесса полна"""
+        shard = update_shard(update, self.workers)
+        self._restart_if_dead(shard)
+        try:
+            self._queues[shard].put_nowait(update)
+        except queue.Full:
+            self.rejected += 1
+            return False
+        self.routed[shard] += 1
+        return True
+
+    async def put(self, update: dict[str, Any]) -> None:
+        """Передать обновление процессу его чата, дождавшись места в очереди"""
+        shard = update_shard(update, self.workers)
+        self._restart_if_dead(shard)
+        updates = self._queues[shard]
+        try:
+            updates.put_nowait(update)
+        except queue.Full:
+            # Очередь разбирает процесс: пока ждем места, проверяем, что он жив
+            while True:
+                try:
+                    await asyncio.to_thread(updates.put, update, True, WORKER_POLL_SECONDS)
+                except queue.Full:
+                    self._restart_if_dead(shard)
+                    continue
+                break
+        self.routed[shard] += 1
+
+    async def stop(self) -> None:
+        """Остановить процессы: они дообрабатывают принятые обновления"""
+        for index, process in enumerate(self._processes):
+            if not process.is_alive():
+                continue
+            try:
+                await asyncio.to_thread(
+                    self._queues[index].put, None, True, WORKER_STOP_TIMEOUT_SECONDS
+                )
+            except queue.Full:
+                logger.warning(f"{process.name} queue is still full, terminating")
+                process.terminate()
+        for process in self._processes:
+            await asyncio.to_thread(process.join, WORKER_STOP_TIMEOUT_SECONDS)
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in time, terminating")
+                process.terminate()
+        logger.info(f"Bot workers stopped: {self.stats()}")
+
+    def stats(self) -> dict[str, int]:
+        """Обновления, переданные каждому процессу, отклоненные и перезапуски процессов"""
+        result = {f"routed.{index}": count for index, count in enumerate(self.routed)}
+        result["rejected"] = self.rejected
+        result["restarts"] = self.restarts
+        return result
+
+    def _spawn(self, index: int) -> BaseProcess:
+        process = self._context.Process(
+            target=self._worker,
+            args=(index, self._queues[index], self._ready),
+            name=f"bot-worker-{index}",
+        )
+        process.start()
+        return process
+
+    def _wait_ready(self) -> bool:
+        """Дождаться сообщений о запуске всех процессов (выполняется в потоке)"""
+        deadline = time.monotonic() + WORKER_START_TIMEOUT_SECONDS
+        pending = set(range(self.workers))
+        while pending:
+            try:
+                index, started = self._ready.get(timeout=WORKER_POLL_SECONDS)
+            except queue.Empty:
+                dead = [i for i in pending if not self._processes[i].is_alive()]
+                if dead:
+                    logger.error(f"Bot workers {dead} exited during startup")
+                    return False
+                if time.monotonic() > deadline:
+                    logger.error(f"Bot workers {sorted(pending)} did not start in time")
+                    return False
+                continue
+            if not started:
+                logger.error(f"Bot worker {index} failed to start")
+                return False
+            pending.discard(index)
+        return True
+
+    def _restart_if_dead(self, shard: int) -> None:
+        # До start процессов нет: очередь просто накапливает обновления
+        if not self._processes or self._processes[shard].is_alive():
+            return
+        now = time.monotonic()
+        if now - self._restarted_at[shard] < WORKER_RESTART_DELAY_SECONDS:
+            return
+
+        process = self._processes[shard]
+        logger.error(f"{process.name} exited with code {process.exitcode}, restarting")
+        # Сообщения о запуске после start никто не ждет: не даем им копиться
+        while True:
+            try:
+                self._ready.get_nowait()
+            except queue.Empty:
+                break
+        self._restarted_at[shard] = now
+        self.restarts += 1
+        self._processes[shard] = self._spawn(shard)
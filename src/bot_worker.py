@@ -0,0 +1,50 @@
+"""Процесс-обработчик обновлений Telegram (запускается BotSupervisor)."""
+
+import asyncio
+import logging
+import signal
+from multiprocessing.queues import Queue
+from typing import Any
+
+from .bot_runtime import BotRuntime, setup_logging
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(
+    index: int, updates: "Queue[dict[str, Any] | None]", ready: "Queue[tuple[int, bool]]"
+) -> None:
+    """
+    Точка входа процесса-обработчика: свой event loop, пул БД и LLMClient.
+
+    Результат запуска (index, успех) отправляется супервизору в ready.
+    Обновления приходят из очереди супервизора (None - остановка). SIGINT
+    игнорируется: остановкой процессов управляет супервизор.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve(index, updates, ready))
+
+
+async def _serve(
+    index: int, updates: "Queue[dict[str, Any] | None]", ready: "Queue[tuple[int, bool]]"
+) -> None:
+    config = Config()  # type: ignore[call-arg]
+    setup_logging(config.log_level)
+
+    runtime = BotRuntime(config)
+    started = await runtime.start()
+    ready.put((index, started))
+    if not started:
+        return
+    logger.info(f"Bot worker {index} started")
+
+    try:
+        while True:
+            update = await asyncio.to_thread(updates.get)
+            if update is None:
+                break
+            await runtime.feed(update)
+    finally:
+        await runtime.stop()
+        logger.info(f"Bot worker {index} stopped")
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable, Coroutine
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[object]]
+
+
+class ChatSequencer:
+    """
+    Обработка обновлений Telegram по порядку внутри чата.
+
+    Задачи одного чата выполняются строго последовательно (FIFO), разные
+    чаты обрабатываются параллельно: на каждый чат с задачами в очереди
+    работает одна задача asyncio. Задачи без ключа (key=None) запускаются
+    сразу, вне очереди чата. Не больше max_pending задач принято в работу:
+    put ждет освобождения места, put_nowait отказывает (backpressure).
+    """
+
+    def __init__(self, max_pending: int = 1000) -> None:
+        self.max_pending: int = max_pending
+        self._queues: dict[int, deque[Job]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._pending: int = 0
+        self._space_freed = asyncio.Event()
+        self.processed: int = 0
+        self.failed: int = 0
+        self.rejected: int = 0
+
+    def put_nowait(self, key: int | None, job: Job) -> bool:
+        """Принять задачу в работу, если есть место; вернуть False при переполнении"""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            return False
+        self._accept(key, job)
+        return True
+
+    async def put(self, key: int | None, job: Job) -> None:
+        """Принять задачу в работу, дождавшись свободного места"""
+        while self._pending >= self.max_pending:
+            self._space_freed.clear()
+            await self._space_freed.wait()
+        self._accept(key, job)
+
+    async def join(self) -> None:
+        """Дождаться выполнения всех принятых задач"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, int]:
+        """Задачи в работе, чаты с очередью, выполненные, с ошибкой и отклоненные"""
+        return {
+            "pending": self._pending,
+            "active_chats": len(self._queues),
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def _accept(self, key: int | None, job: Job) -> None:
+        self._pending += 1
+        if key is None:
+            self._spawn(self._run_one(job))
+            return
+
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(job)
+        else:
+            self._queues[key] = deque([job])
+            self._spawn(self._drain(key))
+
+    def _spawn(self, coro: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key: int) -> None:
+        """Выполнить задачи чата по очереди, пока они поступают"""
+        queue = self._queues[key]
+        try:
+            while queue:
+                await self._run_one(queue.popleft())
+        finally:
+            del self._queues[key]
+
+    async def _run_one(self, job: Job) -> None:
+        try:
+            await job()
+            self.processed += 1
+        except Exception:
+            self.failed += 1
+            logger.exception("Update processing failed")
+        finally:
+            self._pending -= 1
+            self._space_freed.set()
@@ -0,0 +1,149 @@
+import logging
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Исходы попыток, говорящие о недоступности upstream (ошибки запроса сюда не входят)
+FAILURE_OUTCOMES = frozenset({"timeout", "server_error", "connection_error"})
+
+
+@dataclass
+class _RouteCircuit:
+    outcomes: deque[bool]
+    state: str = CLOSED
+    opened_at: float = 0.0
+    probe_in_flight: bool = False
+    times_opened: int = 0
+    rejected: int = 0
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker запросов к LLM по маршрутам.
+
+    Цепь своя у каждого маршрута (LLMRoute.name): одна модель у разных
+    провайдеров размыкается независимо.
+
+    closed: попытки проходят, исходы последних llm_breaker_window_size попыток
+    хранятся в скользящем окне. Если попыток не меньше llm_breaker_min_requests
+    и доля отказов (таймауты, 5xx, ошибки соединения) не меньше
+    llm_breaker_failure_rate, цепь размыкается.
+    open: попытки отклоняются сразу, без ожидания таймаута upstream.
+    half_open: через llm_breaker_open_seconds пропускается одна пробная попытка;
+    успех замыкает цепь, отказ снова размыкает.
+    """
+
+    def __init__(self, config: Config, clock: Callable[[], float] = time.monotonic) -> None:
+        self.window_size: int = config.llm_breaker_window_size
+        self.min_requests: int = config.llm_breaker_min_requests
+        self.failure_rate: float = config.llm_breaker_failure_rate
+        self.open_seconds: float = config.llm_breaker_open_seconds
+        self._clock = clock
+        self._circuits: dict[str, _RouteCircuit] = {}
+
+    def allow(self, route: str) -> bool:
+        """
+        Можно ли отправить попытку по маршруту.
+
+        В состоянии half_open разрешает только одну пробную попытку: вызывающий
+        обязан сообщить ее исход через record.
+        """
+        circuit = self._circuit(route)
+        if circuit.state == OPEN and self._clock() - circuit.opened_at >= self.open_seconds:
+            circuit.state = HALF_OPEN
+            logger.info(f"Circuit for {route} is half-open: sending a probe request")
+        if circuit.state == CLOSED:
+            return True
+        if circuit.state == HALF_OPEN and not circuit.probe_in_flight:
+            circuit.probe_in_flight = True
+            return True
+        circuit.rejected += 1
+        return False
+
+    def is_available(self, route: str) -> bool:
+        """Пропустит ли цепь попытку сейчас (без занятия пробной попытки)"""
+        circuit = self._circuit(route)
+        if circuit.state == CLOSED:
+            return True
+        if circuit.state == OPEN:
+            return self._clock() - circuit.opened_at >= self.open_seconds
+        return not circuit.probe_in_flight
+
+    def record(self, route: str, outcome: str | None) -> None:
+        """
+        Учесть исход попытки, пропущенной allow.
+
+        outcome=None - попытка не дошла до upstream (отменена, отклонена очередью):
+        исход не учитывается, пробная попытка освобождается.
+        """
+        circuit = self._circuit(route)
+        probe = circuit.probe_in_flight
+        circuit.probe_in_flight = False
+        if outcome is None:
+            return
+
+        failed = outcome in FAILURE_OUTCOMES
+        if probe and circuit.state == HALF_OPEN:
+            if failed:
+                self._open(route, circuit)
+            else:
+                circuit.state = CLOSED
+                circuit.outcomes.clear()
+                logger.info(f"Circuit for {route} closed: probe request succeeded")
+            return
+        if circuit.state != CLOSED:
+            return
+
+        circuit.outcomes.append(failed)
+        failures = sum(circuit.outcomes)
+        if (
+            len(circuit.outcomes) >= self.min_requests
+            and failures / len(circuit.outcomes) >= self.failure_rate
+        ):
+            self._open(route, circuit)
+
+    def state(self, route: str) -> str:
+        """Состояние цепи маршрута: closed, open или half_open"""
+        circuit = self._circuit(route)
+        if circuit.state == OPEN and self._clock() - circuit.opened_at >= self.open_seconds:
+            return HALF_OPEN
+        return circuit.state
+
+    def states(self) -> dict[str, str]:
+        """Состояния цепей всех маршрутов, к которым были запросы"""
+        return {route: self.state(route) for route in sorted(self._circuits)}
+
+    def stats(self) -> dict[str, float]:
+        """Метрики по маршрутам: размыкания, отклоненные попытки, доля отказов в окне"""
+        result: dict[str, float] = {}
+        for route in sorted(self._circuits):
+            circuit = self._circuits[route]
+            result[f"opened.{route}"] = circuit.times_opened
+            result[f"rejected.{route}"] = circuit.rejected
+            result[f"failure_rate.{route}"] = (
+                sum(circuit.outcomes) / len(circuit.outcomes) if circuit.outcomes else 0.0
+            )
+        return result
+
+    def _open(self, route: str, circuit: _RouteCircuit) -> None:
+        circuit.state = OPEN
+        circuit.opened_at = self._clock()
+        circuit.times_opened += 1
+        circuit.outcomes.clear()
+        logger.warning(f"Circuit for {route} opened for {self.open_seconds:.0f}s")
+
+    def _circuit(self, route: str) -> _RouteCircuit:
+        circuit = self._circuits.get(route)
+        if circuit is None:
+            circuit = _RouteCircuit(outcomes=deque(maxlen=self.window_size))
+            self._circuits[route] = circuit
+        return circuit
@@ -1,4 +1,5 @@
 import logging
+from typing import Literal
 
 from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -32,8 +33,95 @@ class Config(BaseSettings):
     system_prompt_file: str = "prompts/system.txt"  # Путь к файлу с системным промптом
     system_prompt: str = ""  # Будет заполнено в model_validator
     max_history_messages: int = 20
+    # Бюджет токенов окна истории (оценка по messages.token_count), 0 - без ограничения
+    history_token_budget: int = 4000
     temperature: float = 0.7
+    # Повторы и запасные модели LLM: "model" или "model@base_url" через запятую
+    llm_fallback_models: str = ""
+    llm_max_retries: int = 2
+    llm_retry_base_delay_seconds: float = 0.5
+    llm_retry_max_delay_seconds: float = 8.0
+    llm_request_timeout_seconds: float = 30.0
+    llm_deadline_seconds: float = 60.0
+    # Хеджирование: дублировать запрос второму маршруту, если основной дольше перцентиля
+    # (без llm_fallback_models не применяется)
+    llm_hedging_enabled: bool = False
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    llm_hedge_initial_delay_seconds: float = 10.0
+    llm_latency_window_size: int = 200
+    # Общий лимит запросов к LLM (0 - без ограничения) и время ожидания в очереди
+    llm_max_concurrent_requests: int = 8
+    llm_requests_per_minute: int = 0
+    llm_tokens_per_minute: int = 0
+    llm_queue_timeout_seconds: float = 10.0
+    # Справедливая очередь по пользователям: не больше N запросов пользователя в работе
+    llm_fair_scheduling_enabled: bool = False
+    llm_per_user_max_in_flight: int = 2
+    # Кэш ответов LLM для вызовов с cache=True (Text2SQL); persistent - второй уровень в БД
+    llm_response_cache_enabled: bool = False
+    llm_response_cache_max_entries: int = 1000
+    llm_response_cache_ttl_seconds: float = 3600.0
+    llm_response_cache_persistent: bool = False
+    # Circuit breaker по моделям: размыкается при доле отказов в окне последних попыток
+    llm_circuit_breaker_enabled: bool = True
+    llm_breaker_window_size: int = 20
+    llm_breaker_min_requests: int = 10
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_open_seconds: float = 30.0
+    # Дедлайн хода диалога (БД + LLM + сохранение ответа), 0 - без дедлайна
+    turn_deadline_seconds: float = 90.0
     log_level: str = "INFO"
+    # In-process кэш истории диалогов (безопасен только при одном писателе в диалог)
+    history_cache_enabled: bool = False
+    history_cache_max_entries: int = 1000
+    history_cache_max_bytes: int = 10 * 1024 * 1024
+    history_cache_ttl_seconds: float = 300.0
+    # Кэш профилей пользователей: UPSERT в users только при изменении профиля или по TTL
+    user_profile_cache_enabled: bool = True
+    user_profile_cache_max_entries: int = 10_000
+    user_profile_cache_ttl_seconds: float = 3600.0
+    # Фоновое сворачивание старой части диалога в резюме (отдельный запрос к LLM)
+    history_summary_enabled: bool = False
+    history_summary_trigger_tokens: int = 3000
+    history_summary_keep_messages: int = 6
+    history_summary_max_input_messages: int = 50
+    # Фоновая компактация очищенной (/clear) истории
+    history_compaction_enabled: bool = True
+    history_compaction_interval_seconds: float = 60.0
+    history_compaction_batch_size: int = 1000
+    # Write-behind очередь записи сообщений: пачки по N строк или раз в интервал
+    message_write_queue_enabled: bool = False
+    message_write_queue_max_batch_size: int = 100
+    message_write_queue_flush_interval_ms: float = 5.0
+    message_write_queue_max_pending: int = 1000
+    # Потоковая доставка ответа в Telegram: заглушка редактируется не чаще интервала
+    telegram_streaming_enabled: bool = False
+    telegram_stream_edit_interval_seconds: float = 1.0
+    # Очередь исходящих сообщений с учетом лимитов Bot API (flood control);
+    # потоковые ответы (telegram_streaming_enabled) идут мимо очереди
+    telegram_sender_enabled: bool = True
+    # Лимит Bot API ~30, с запасом; на весь бот, делится между bot_workers процессами
+    telegram_global_messages_per_second: float = 25.0
+    telegram_chat_messages_per_second: float = 1.0
+    telegram_chat_burst: int = 3
+    telegram_send_max_retries: int = 3
+    telegram_send_queue_size: int = 10_000
+    # Доставка обновлений: polling (long polling) или webhook (aiohttp сервер)
+    telegram_delivery_mode: Literal["polling", "webhook"] = "polling"
+    telegram_webhook_url: str = ""  # Публичный https адрес бота, без пути
+    telegram_webhook_path: str = "/telegram/webhook"
+    telegram_webhook_secret: str = ""  # Обязателен в режиме webhook
+    telegram_webhook_host: str = "0.0.0.0"
+    telegram_webhook_port: int = 8080
+    telegram_webhook_max_connections: int = 40
+    # Процессы-обработчики обновлений: обновления распределяются по chat_id
+    bot_workers: int = 1
+    bot_worker_queue_size: int = 1000
+    # Параллельная обработка сообщений в процессе: сверх лимита и очереди - ответ "занято"
+    bot_max_concurrent_handlers: int = 50  # 0 - без ограничения
+    bot_handler_queue_size: int = 200
+    bot_metrics_log_interval_seconds: float = 60.0  # 0 - метрики только при остановке
     _skip_prompt_loading: bool = False  # Флаг для пропуска загрузки промпта из файла
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
@@ -54,3 +142,16 @@ class Config(BaseSettings):
             if not self.system_prompt:
                 self.system_prompt = DEFAULT_SYSTEM_PROMPT
         return self
+
+    @model_validator(mode="after")
+    def check_webhook_settings(self) -> "Config":
+        """Режим webhook требует публичный адрес и секрет (проверка X-Telegram-Bot-Api-Secret-Token)"""
+        if self.telegram_delivery_mode == "webhook" and not (
+            self.telegram_webhook_url and self.telegram_webhook_secret
+        ):
+            raise ValueError(
+                "TELEGRAM_WEBHOOK_URL and TELEGRAM_WEBHOOK_SECRET are required in webhook mode"
+            )
+        if self.bot_workers < 1:
+            raise ValueError("BOT_WORKERS must be at least 1")
+        return self
@@ -3,8 +3,16 @@ from collections.abc import AsyncGenerator, Callable
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .models import ChatMessage, ConversationKey
+from .conversation_repository import ConversationRepository
+from .history_cache import HistoryCache, trim_history
+from .history_summarizer import HistorySummarizer, summary_message
+from .message_write_queue import MessageWriteQueue
+from .models import ChatMessage, ConversationKey, ConversationTurn, UserData
 from .repository import MessageRepository
+from .system_prompt_registry import SystemPromptRegistry
+from .turn_tracker import TurnTracker
+from .user_profile_cache import UserProfileCache
+from .user_repository import UserRepository
 
 logger = logging.getLogger(__name__)
 
@@ -13,16 +21,44 @@ class ConversationManager:
     """
     Управление историей диалогов с использованием базы данных.
 
-    Использует MessageRepository для персистентного хранения.
+    Использует MessageRepository для персистентного хранения. Окно истории
+    ограничено max_history_messages и, если задан, history_token_budget.
+    System prompt не копируется в messages: диалог ссылается на версию
+    в system_prompts, текст версии держит SystemPromptRegistry.
     """
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
         max_history_messages: int = 20,
+        history_cache: HistoryCache | None = None,
+        history_token_budget: int | None = None,
+        history_summarizer: HistorySummarizer | None = None,
+        *,
+        message_write_queue: MessageWriteQueue | None = None,
+        turn_tracker: TurnTracker | None = None,
+        user_profile_cache: UserProfileCache | None = None,
     ) -> None:
+        """
+        Args:
+            session_factory: Генератор сессий БД
+            max_history_messages: Максимум сообщений в окне истории
+            history_cache: Write-through кэш окна истории ("теплый" диалог без чтения БД)
+            history_token_budget: Бюджет токенов окна (по сохраненной в БД оценке)
+            history_summarizer: Замена старой части диалога резюме
+            message_write_queue: Запись сообщений пачками вместе с другими диалогами
+            turn_tracker: Отмена ходов, ждущих ответа LLM, при очистке истории
+            user_profile_cache: Запись профиля пользователя в БД только при изменении
+        """
         self.session_factory = session_factory
         self.max_history_messages: int = max_history_messages
+        self.history_token_budget: int | None = history_token_budget
+        self.history_summarizer: HistorySummarizer | None = history_summarizer
+        self.history_cache: HistoryCache | None = history_cache
+        self.message_write_queue: MessageWriteQueue | None = message_write_queue
+        self.turn_tracker: TurnTracker | None = turn_tracker
+        self.user_profile_cache: UserProfileCache | None = user_profile_cache
+        self.system_prompts = SystemPromptRegistry(session_factory)
 
     def get_conversation_key(self, chat_id: int, user_id: int) -> ConversationKey:
         """Создать ключ диалога"""
@@ -30,62 +66,223 @@ class ConversationManager:
 
     async def add_message(self, key: ConversationKey, message: ChatMessage) -> None:
         """Добавить сообщение в историю (БД)"""
+        if self.message_write_queue is not None:
+            db_message = await self.message_write_queue.add(key, message)
+        else:
+            session_gen = self.session_factory()
+            session = await session_gen.__anext__()
+            try:
+                repo = MessageRepository(session)
+                db_message = await repo.add_message(key, message)
+            finally:
+                await session_gen.aclose()
+
+        # System-сообщения не входят в окно истории: prompt хранится в system_prompts
+        if self.history_cache is not None and message.role != "system":
+            stored = ChatMessage(
+                role=message.role,
+                content=message.content,
+                created_at=db_message.created_at,
+                token_count=db_message.token_count,
+            )
+            self.history_cache.append(
+                key, stored, self.max_history_messages, self.history_token_budget
+            )
+
+        logger.debug(f"Added message to conversation {key}")
+
+    async def get_history(self, key: ConversationKey, system_prompt: str) -> list[ChatMessage]:
+        """
+        Получить историю диалога с system prompt.
+
+        Если за диалогом не закреплена версия system prompt, закрепляется текущая.
+        System prompt всегда возвращается первым в списке.
+        """
+        if self.history_cache is not None:
+            cached = self.history_cache.get(key)
+            if cached is not None:
+                logger.debug(f"History cache hit for conversation {key}")
+                return cached
+
         session_gen = self.session_factory()
         session = await session_gen.__anext__()
         try:
-            repo = MessageRepository(session)
-            await repo.add_message(key, message)
+            history = await self._load_history(session, key, system_prompt)
+            await session.commit()
         finally:
             await session_gen.aclose()
 
-        logger.debug(f"Added message to conversation {key}")
+        if self.history_cache is not None:
+            self.history_cache.put(key, history)
 
-    async def get_history(self, key: ConversationKey, system_prompt: str) -> list[ChatMessage]:
+        return history
+
+    async def start_turn(
+        self,
+        key: ConversationKey,
+        user_message: ChatMessage,
+        system_prompt: str,
+        user_data: UserData | None = None,
+    ) -> ConversationTurn:
         """
-        Получить историю диалога с system prompt.
+        Подготовить ход диалога до запроса к LLM.
 
-        Если system prompt отсутствует в истории, он будет добавлен.
-        System prompt всегда возвращается первым в списке.
+        Сохранение пользователя, сообщения пользователя, чтение истории и
+        (при необходимости) закрепление system prompt выполняются в одной сессии
+        и одной транзакции вместо отдельной сессии на каждый шаг.
+        С MessageWriteQueue сообщение пользователя пишется пачкой заранее
+        (чтение истории начинается после подтверждения записи).
         """
+        cached = self.history_cache.get(key) if self.history_cache is not None else None
+
+        if user_data is not None and self._is_profile_saved(user_data):
+            user_data = None
+
+        queued_message = None
+        if self.message_write_queue is not None:
+            queued_message = await self.message_write_queue.add(key, user_message)
+
+        saved_user = None
         session_gen = self.session_factory()
         session = await session_gen.__anext__()
         try:
-            repo = MessageRepository(session)
-            history = await repo.get_history(key, limit=self.max_history_messages)
+            if user_data is not None and await self._save_user(session, user_data):
+                saved_user = user_data
+
+            if queued_message is not None:
+                db_message = queued_message
+            else:
+                repo = MessageRepository(session)
+                db_message = await repo.add_message(key, user_message, commit=False)
+            stored = ChatMessage(
+                role=user_message.role,
+                content=user_message.content,
+                created_at=db_message.created_at,
+                token_count=db_message.token_count,
+            )
+
+            if cached is None:
+                history = await self._load_history(session, key, system_prompt)
+            else:
+                history = trim_history(
+                    cached + [stored], self.max_history_messages, self.history_token_budget
+                )
+
+            await session.commit()
         finally:
             await session_gen.aclose()
 
-        # Проверяем наличие system prompt
-        system_msgs = [m for m in history if m.role == "system"]
+        if saved_user is not None and self.user_profile_cache is not None:
+            self.user_profile_cache.remember(saved_user)
+        if self.history_cache is not None:
+            if cached is None:
+                self.history_cache.put(key, history)
+            else:
+                self.history_cache.append(
+                    key, stored, self.max_history_messages, self.history_token_budget
+                )
 
-        if not system_msgs:
-            # Добавляем system prompt, если его нет
-            system_msg = ChatMessage(role="system", content=system_prompt)
-            # Сохраняем в БД
-            session_gen2 = self.session_factory()
-            session2 = await session_gen2.__anext__()
-            try:
-                repo2 = MessageRepository(session2)
-                await repo2.add_message(key, system_msg)
-            finally:
-                await session_gen2.aclose()
+        logger.debug(f"Started turn for conversation {key}")
+        return ConversationTurn(key=key, history=history)
 
-            logger.debug(f"Added system prompt to conversation {key}")
-        else:
-            system_msg = system_msgs[0]
+    async def finish_turn(self, turn: ConversationTurn, assistant_message: ChatMessage) -> None:
+        """
+        Сохранить ответ ассистента одной записью после ответа LLM.
+
+        Если история хода превысила порог, сворачивание в резюме запускается
+        в фоне и не задерживает ответ пользователю.
+        """
+        await self.add_message(turn.key, assistant_message)
 
-        # Убираем system сообщения из истории и добавляем system_msg в начало
-        non_system_history = [m for m in history if m.role != "system"]
-        return [system_msg] + non_system_history
+        if self.history_summarizer is not None:
+            self.history_summarizer.maybe_schedule(turn.key, turn.history + [assistant_message])
 
     async def clear_history(self, key: ConversationKey) -> None:
-        """Очистить историю диалога (soft delete)"""
+        """
+        Очистить историю диалога.
+
+        Сдвигает границу очистки в conversations (одна строка); сообщения
+        помечает удаленными фоновый HistoryCompactor. Ходы диалога в работе
+        отменяются до очистки: их ответы не попадут в новую историю.
+        """
+        if self.turn_tracker is not None:
+            self.turn_tracker.cancel(key)
+
         session_gen = self.session_factory()
         session = await session_gen.__anext__()
         try:
-            repo = MessageRepository(session)
-            deleted_count = await repo.soft_delete_history(key)
+            repo = ConversationRepository(session)
+            await repo.mark_cleared(key)
         finally:
             await session_gen.aclose()
 
-        logger.info(f"Cleared conversation history for {key}, deleted {deleted_count} messages")
+        if self.history_cache is not None:
+            self.history_cache.invalidate(key)
+
+        logger.info(f"Cleared conversation history for {key}")
+
+    async def _load_history(
+        self, session: AsyncSession, key: ConversationKey, system_prompt: str
+    ) -> list[ChatMessage]:
+        """
+        Прочитать окно истории из БД с system prompt диалога (и резюме) в начале.
+
+        Закрепление версии prompt пишется в текущую транзакцию, фиксирует ее
+        вызывающий код.
+        """
+        conversation_repo = ConversationRepository(session)
+        conversation = await conversation_repo.get_conversation(key)
+
+        if conversation is not None and conversation.system_prompt_id is not None:
+            content = await self.system_prompts.get_content(conversation.system_prompt_id)
+        else:
+            prompt_id = await self.system_prompts.resolve_id(system_prompt)
+            await conversation_repo.set_system_prompt(key, prompt_id)
+            content = system_prompt
+            logger.debug(f"Pinned system prompt {prompt_id} to conversation {key}")
+        header = [ChatMessage(role="system", content=content)]
+
+        # Сообщения, свернутые в резюме, в окно не попадают
+        after = None
+        if (
+            conversation is not None
+            and conversation.summary is not None
+            and conversation.summarized_message_created_at is not None
+            and conversation.summarized_message_id is not None
+        ):
+            header.append(summary_message(conversation.summary))
+            after = (conversation.summarized_message_created_at, conversation.summarized_message_id)
+
+        recent = await MessageRepository(session).get_history(
+            key, limit=self.max_history_messages, after=after
+        )
+        return header + trim_history(recent, self.max_history_messages, self.history_token_budget)
+
+    def _is_profile_saved(self, user_data: UserData) -> bool:
+        """Профиль уже сохранен в БД и не изменился: UPSERT не нужен"""
+        return self.user_profile_cache is not None and self.user_profile_cache.is_saved(user_data)
+
+    async def _save_user(self, session: AsyncSession, user_data: UserData) -> bool:
+        """
+        Сохранить данные пользователя внутри транзакции хода.
+
+        SAVEPOINT сохраняет graceful degradation: ошибка UPSERT не ломает ход диалога.
+
+        Returns:
+            False, если UPSERT не удался
+        """
+        try:
+            async with session.begin_nested():
+                user_repo = UserRepository(session)
+                await user_repo.upsert_user(
+                    user_id=user_data.user_id,
+                    username=user_data.username,
+                    first_name=user_data.first_name,
+                    last_name=user_data.last_name,
+                    commit=False,
+                )
+            logger.debug(f"User data saved for user_id={user_data.user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save user data: {e}")
+            return False
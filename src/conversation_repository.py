@@ -0,0 +1,194 @@
+"""Репозиторий для работы с диалогами в базе данных"""
+
+import logging
+from typing import Any
+
+from sqlalchemy import BigInteger, desc, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import CursorResult
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db_models import Conversation, Message
+from .models import ConversationKey
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationRepository:
+    """Репозиторий для работы с диалогами в базе данных"""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def record_messages(self, messages: list[Message]) -> None:
+        """
+        Учесть новые сообщения в счетчиках диалогов.
+
+        Выполняется в транзакции вставки сообщений (после flush, когда известны
+        id и created_at); фиксирует транзакцию вызывающий код. Сообщения
+        агрегируются по диалогу, пачка пишется одним многострочным UPSERT.
+        """
+        totals: dict[tuple[int, int], dict[str, Any]] = {}
+        for message in messages:
+            row = totals.setdefault(
+                (message.chat_id, message.user_id),
+                {
+                    "chat_id": message.chat_id,
+                    "user_id": message.user_id,
+                    "message_count": 0,
+                    "total_content_length": 0,
+                    "last_message_at": message.created_at,
+                },
+            )
+            row["message_count"] += 1
+            row["total_content_length"] += message.content_length
+            row["last_message_at"] = max(row["last_message_at"], message.created_at)
+        if not totals:
+            return
+
+        # Сортировка по ключу - одинаковый порядок блокировок у параллельных пачек
+        stmt = insert(Conversation).values([totals[k] for k in sorted(totals)])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["chat_id", "user_id"],
+            set_={
+                "message_count": Conversation.message_count + stmt.excluded.message_count,
+                "total_content_length": (
+                    Conversation.total_content_length + stmt.excluded.total_content_length
+                ),
+                "last_message_at": func.greatest(
+                    Conversation.last_message_at, stmt.excluded.last_message_at
+                ),
+                "updated_at": func.now(),
+            },
+        )
+        await self.session.execute(stmt)
+
+    async def get_conversation(self, key: ConversationKey) -> Conversation | None:
+        """Получить диалог (счетчики, время последнего сообщения) по первичному ключу"""
+        return await self.session.get(
+            Conversation, (key.chat_id, key.user_id), populate_existing=True
+        )
+
+    async def set_system_prompt(self, key: ConversationKey, prompt_id: int) -> None:
+        """
+        Закрепить за диалогом версию system prompt.
+
+        Выполняется в текущую транзакцию, фиксирует ее вызывающий код.
+        """
+        stmt = insert(Conversation).values(
+            chat_id=key.chat_id, user_id=key.user_id, system_prompt_id=prompt_id
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["chat_id", "user_id"],
+            set_={"system_prompt_id": stmt.excluded.system_prompt_id, "updated_at": func.now()},
+        )
+        await self.session.execute(stmt)
+
+    async def save_summary(
+        self,
+        key: ConversationKey,
+        summary: str,
+        boundary: Message,
+        previous_boundary_id: int | None,
+        cleared_message_id: int | None,
+    ) -> bool:
+        """
+        Сохранить резюме истории до сообщения boundary.
+
+        Обновление условное: если за время вызова LLM диалог очистили или резюме
+        уже сдвинул другой процесс, результат отбрасывается.
+
+        Returns:
+            True, если резюме сохранено
+        """
+        stmt = (
+            update(Conversation)
+            .where(
+                Conversation.chat_id == key.chat_id,
+                Conversation.user_id == key.user_id,
+                Conversation.summarized_message_id.is_not_distinct_from(previous_boundary_id),
+                Conversation.cleared_message_id.is_not_distinct_from(cleared_message_id),
+            )
+            .values(
+                summary=summary,
+                summarized_message_id=boundary.id,
+                summarized_message_created_at=boundary.created_at,
+                updated_at=func.now(),
+            )
+        )
+        result: CursorResult[tuple[int]] = await self.session.execute(stmt)  # type: ignore
+        await self.session.commit()
+        return bool(result.rowcount)
+
+    async def reset_counters(self, key: ConversationKey) -> None:
+        """Обнулить счетчики диалога после удаления всех его сообщений"""
+        await self.session.execute(
+            update(Conversation)
+            .where(Conversation.chat_id == key.chat_id, Conversation.user_id == key.user_id)
+            .values(**self._empty_counters())
+        )
+
+    async def mark_cleared(self, key: ConversationKey, commit: bool = True) -> bool:
+        """
+        Отметить историю диалога очищенной до последнего сообщения.
+
+        Один INSERT ... ON CONFLICT DO UPDATE по строке диалога вместо UPDATE
+        всех сообщений: граница очистки - (created_at, id) последнего активного
+        сообщения, его находит обратный проход по idx_messages_active.
+
+        Returns:
+            True, если граница очистки сдвинута (в диалоге были сообщения)
+        """
+        last_message = (
+            select(
+                literal(key.chat_id, BigInteger),
+                literal(key.user_id, BigInteger),
+                Message.id,
+                Message.created_at,
+            )
+            .where(
+                Message.chat_id == key.chat_id,
+                Message.user_id == key.user_id,
+                Message.deleted_at.is_(None),
+            )
+            .order_by(desc(Message.created_at), desc(Message.id))
+            .limit(1)
+        )
+        stmt = insert(Conversation).from_select(
+            ["chat_id", "user_id", "cleared_message_id", "cleared_message_created_at"],
+            last_message,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["chat_id", "user_id"],
+            set_={
+                "cleared_message_id": stmt.excluded.cleared_message_id,
+                "cleared_message_created_at": stmt.excluded.cleared_message_created_at,
+                **self._empty_counters(),
+            },
+        )
+
+        result: CursorResult[tuple[int]] = await self.session.execute(stmt)  # type: ignore
+        if commit:
+            await self.session.commit()
+
+        cleared = bool(result.rowcount)
+        logger.info(
+            f"Marked history cleared for chat_id={key.chat_id}, user_id={key.user_id}: {cleared}"
+        )
+        return cleared
+
+    def _empty_counters(self) -> dict[str, Any]:
+        """
+        Значения счетчиков пустого диалога (last_message_at сохраняется).
+
+        Сброс system_prompt_id: очищенный диалог начнется с текущей версии prompt.
+        """
+        return {
+            "message_count": 0,
+            "total_content_length": 0,
+            "system_prompt_id": None,
+            "summary": None,
+            "summarized_message_id": None,
+            "summarized_message_created_at": None,
+            "updated_at": func.now(),
+        }
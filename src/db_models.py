@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Index, Integer, String, Text, text
+from sqlalchemy import BigInteger, ForeignKey, Index, Integer, String, Text, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -25,6 +25,13 @@ class Message(Base):
     role: Mapped[str] = mapped_column(String(20), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
     content_length: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Оценка токенов (token_estimator), считается один раз при вставке
+    token_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    # Расход LLM на ответ ассистента (для остальных сообщений NULL)
+    model: Mapped[str | None] = mapped_column(String(255), nullable=True, default=None)
+    prompt_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True, default=None)
+    completion_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True, default=None)
+    latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True, default=None)
     created_at: Mapped[datetime] = mapped_column(
         nullable=False, server_default=text("CURRENT_TIMESTAMP")
     )
@@ -42,6 +49,15 @@ class Message(Base):
         ),
         # Индекс для сортировки по дате создания
         Index("idx_messages_created", "created_at", postgresql_ops={"created_at": "DESC"}),
+        # Частичный индекс окна последних сообщений (обратный проход без сортировки)
+        Index(
+            "idx_messages_active",
+            "chat_id",
+            "user_id",
+            "created_at",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
     )
 
     def __repr__(self) -> str:
@@ -51,6 +67,78 @@ class Message(Base):
         )
 
 
+class SystemPrompt(Base):
+    """
+    Модель версии system prompt.
+
+    Текст хранится один раз на версию, дедупликация по content_hash (SHA-256).
+    Диалоги ссылаются на версию через conversations.system_prompt_id.
+    """
+
+    __tablename__ = "system_prompts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, unique=True)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        nullable=False, server_default=text("CURRENT_TIMESTAMP")
+    )
+
+    def __repr__(self) -> str:
+        return f"<SystemPrompt(id={self.id}, version={self.version})>"
+
+
+class Conversation(Base):
+    """
+    Модель диалога (chat_id + user_id).
+
+    Счетчики обновляются в транзакции MessageRepository.add_message, поэтому
+    количество сообщений и время последней активности читаются по первичному ключу.
+    system_prompt_id - версия system prompt, с которой начат диалог.
+    Хранит границу очистки истории: сообщения с (created_at, id) не позже
+    (cleared_message_created_at, cleared_message_id) считаются удаленными.
+    /clear меняет одну строку, физическую пометку сообщений выполняет HistoryCompactor.
+    summary - резюме сообщений до (summarized_message_created_at, summarized_message_id),
+    его ведет HistorySummarizer.
+    """
+
+    __tablename__ = "conversations"
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    total_content_length: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default=text("0")
+    )
+    last_message_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    system_prompt_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("system_prompts.id"), nullable=True
+    )
+    cleared_message_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    cleared_message_created_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    summary: Mapped[str | None] = mapped_column(Text, nullable=True)
+    summarized_message_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    summarized_message_created_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        nullable=False, server_default=text("CURRENT_TIMESTAMP")
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        nullable=False, server_default=text("CURRENT_TIMESTAMP")
+    )
+
+    __table_args__ = (
+        # Индекс для подсчета сообщений пользователя по всем его диалогам
+        Index("idx_conversations_user", "user_id"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<Conversation(chat_id={self.chat_id}, user_id={self.user_id}, "
+            f"message_count={self.message_count})>"
+        )
+
+
 class User(Base):
     """
     Модель пользователя Telegram.
@@ -86,3 +174,29 @@ class User(Base):
             f"<User(user_id={self.user_id}, username={self.username}, "
             f"first_name={self.first_name})>"
         )
+
+
+class LLMResponse(Base):
+    """
+    Модель закэшированного ответа LLM (постоянный уровень LLMResponseCache).
+
+    key_hash - SHA-256 (hex) от (model, temperature, messages) запроса.
+    Строки с истекшим expires_at не используются и перезаписываются.
+    """
+
+    __tablename__ = "llm_responses"
+
+    key_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    response: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        nullable=False, server_default=text("CURRENT_TIMESTAMP")
+    )
+    expires_at: Mapped[datetime] = mapped_column(nullable=False)
+
+    __table_args__ = (
+        # Индекс для удаления истекших записей
+        Index("idx_llm_responses_expires", "expires_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<LLMResponse(key_hash={self.key_hash}, expires_at={self.expires_at})>"
@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from .config import Config
+from .llm_errors import LLMOverloadedError
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKED_USERS = 1000
+
+
+@dataclass
+class _Waiter:
+    user_id: int
+    start_tag: float
+    seq: int
+    future: asyncio.Future[None] = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+
+@dataclass
+class _UserWait:
+    requests: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+class FairScheduler:
+    """
+    Взвешенная справедливая очередь запросов к LLM по пользователям.
+
+    Start-time fair queueing: запрос получает тег start = max(virtual_time,
+    finish предыдущего запроса пользователя), finish = start + cost / weight
+    (cost - оценка токенов промпта). Свободный слот достается ожидающему
+    с наименьшим тегом, поэтому пользователь с потоком запросов не вытесняет
+    остальных: новый запрос "легкого" пользователя встает в начало очереди.
+    Дополнительно у пользователя не больше per_user_limit запросов в работе.
+    Ожидание ограничено llm_queue_timeout_seconds (LLMOverloadedError);
+    снятый из очереди запрос не идет в счет пользователя.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.max_concurrent: int = config.llm_max_concurrent_requests
+        self.per_user_limit: int = config.llm_per_user_max_in_flight
+        self.queue_timeout_seconds: float = config.llm_queue_timeout_seconds
+        self.virtual_time: float = 0.0
+        self._last_finish: dict[int, float] = {}
+        self._in_flight: dict[int, int] = {}
+        self._waiting: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._user_waits: OrderedDict[int, _UserWait] = OrderedDict()
+
+    @asynccontextmanager
+    async def slot(self, user_id: int, cost: int, weight: float = 1.0) -> AsyncIterator[None]:
+        """
+        Дождаться очереди пользователя и выполнить запрос.
+
+        Args:
+            user_id: Пользователь (ConversationKey.user_id)
+            cost: Стоимость запроса (оценка токенов промпта)
+            weight: Вес пользователя: больший вес - большая доля пропускной способности
+
+        Raises:
+            LLMOverloadedError: Если очередь не подошла за llm_queue_timeout_seconds
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        start_tag = max(self.virtual_time, self._last_finish.get(user_id, 0.0))
+        duration = max(cost, 1) / weight
+        self._last_finish[user_id] = start_tag + duration
+        waiter = _Waiter(user_id=user_id, start_tag=start_tag, seq=next(self._seq))
+        self._waiting.append(waiter)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout_seconds)
+        except BaseException as e:
+            # Запрос не выполнялся: не ставим его стоимость в счет пользователя
+            if user_id in self._last_finish:
+                self._last_finish[user_id] -= duration
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Слот выдан одновременно с отменой: возвращаем его
+                self._release(user_id)
+            else:
+                self._waiting.remove(waiter)
+                waiter.future.cancel()
+                self._dispatch()
+            if isinstance(e, TimeoutError):
+                logger.warning(f"LLM request of user {user_id} rejected: fair queue timeout")
+                raise LLMOverloadedError("LLM is overloaded, try again later") from e
+            raise
+
+        self._record_wait(user_id, loop.time() - started)
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    def user_stats(self, user_id: int) -> dict[str, float]:
+        """Ожидание в очереди для пользователя"""
+        wait = self._user_waits.get(user_id, _UserWait())
+        return {
+            "requests": wait.requests,
+            "in_flight": self._in_flight.get(user_id, 0),
+            "avg_wait_ms": wait.total_seconds / wait.requests * 1000 if wait.requests else 0.0,
+            "max_wait_ms": wait.max_seconds * 1000,
+        }
+
+    def stats(self) -> dict[str, float]:
+        """Метрики очереди: глубина, запросы в работе, ожидание по пользователям"""
+        result: dict[str, float] = {
+            "queue_depth": len(self._waiting),
+            "in_flight": sum(self._in_flight.values()),
+            "tracked_users": len(self._user_waits),
+        }
+        for user_id, wait in self._user_waits.items():
+            result[f"avg_wait_ms.{user_id}"] = wait.total_seconds / wait.requests * 1000
+            result[f"max_wait_ms.{user_id}"] = wait.max_seconds * 1000
+        return result
+
+    def _dispatch(self) -> None:
+        """Выдать свободные слоты ожидающим с наименьшим тегом"""
+        while self._waiting and (
+            self.max_concurrent <= 0 or sum(self._in_flight.values()) < self.max_concurrent
+        ):
+            eligible = [
+                w for w in self._waiting if self._in_flight.get(w.user_id, 0) < self.per_user_limit
+            ]
+            if not eligible:
+                break
+            waiter = min(eligible, key=lambda w: (w.start_tag, w.seq))
+            self._waiting.remove(waiter)
+            self.virtual_time = max(self.virtual_time, waiter.start_tag)
+            self._in_flight[waiter.user_id] = self._in_flight.get(waiter.user_id, 0) + 1
+            waiter.future.set_result(None)
+        self._forget_idle_users()
+
+    def _release(self, user_id: int) -> None:
+        in_flight = self._in_flight.get(user_id, 0) - 1
+        if in_flight > 0:
+            self._in_flight[user_id] = in_flight
+        else:
+            self._in_flight.pop(user_id, None)
+        self._dispatch()
+
+    def _forget_idle_users(self) -> None:
+        """Забыть теги пользователей без запросов, чей finish не впереди virtual_time"""
+        # Без запросов пользователь не копит ни кредит, ни долг
+        busy = set(self._in_flight) | {w.user_id for w in self._waiting}
+        if not busy and self._last_finish:
+            # Очередь опустела: виртуальное время догоняет выполненные запросы
+            self.virtual_time = max(self.virtual_time, *self._last_finish.values())
+        idle = [
+            user_id
+            for user_id, finish in self._last_finish.items()
+            if finish <= self.virtual_time and user_id not in busy
+        ]
+        for user_id in idle:
+            del self._last_finish[user_id]
+
+    def _record_wait(self, user_id: int, seconds: float) -> None:
+        wait = self._user_waits.pop(user_id, None) or _UserWait()
+        wait.requests += 1
+        wait.total_seconds += seconds
+        wait.max_seconds = max(wait.max_seconds, seconds)
+        self._user_waits[user_id] = wait
+        while len(self._user_waits) > MAX_TRACKED_USERS:
+            self._user_waits.popitem(last=False)
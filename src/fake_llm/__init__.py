@@ -0,0 +1 @@
+"""Фейковый OpenAI-совместимый LLM сервер для нагрузочного тестирования без реальной квоты."""
@@ -0,0 +1,140 @@
+"""FastAPI приложение фейкового OpenAI-совместимого LLM сервера."""
+
+import asyncio
+import json
+import time
+import uuid
+from collections.abc import AsyncIterator
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from src.token_estimator import estimate_tokens
+
+from .behavior import FakeLLMBehavior
+from .config import FakeLLMConfig
+from .models import ChatCompletionRequest
+
+HTTP_TOO_MANY_REQUESTS = 429
+_ERROR_TYPES = {
+    HTTP_TOO_MANY_REQUESTS: "rate_limit_exceeded",
+    500: "server_error",
+    503: "service_unavailable",
+}
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _sse(payload: dict[str, object]) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def _error_response(status: int, retry_after_seconds: float) -> JSONResponse:
+    """Ответ с ошибкой в формате OpenAI (429 - с Retry-After)"""
+    headers = (
+        {"Retry-After": f"{retry_after_seconds:g}"} if status == HTTP_TOO_MANY_REQUESTS else None
+    )
+    return JSONResponse(
+        status_code=status,
+        content={
+            "error": {
+                "message": f"Injected fake LLM error ({status})",
+                "type": _ERROR_TYPES.get(status, "api_error"),
+                "code": status,
+            }
+        },
+        headers=headers,
+    )
+
+
+def create_app(config: FakeLLMConfig | None = None) -> FastAPI:
+    """
+    Создать приложение фейкового LLM сервера.
+
+    LLMClient подключается через OPENROUTER_BASE_URL=http://<host>:<port>/v1.
+    """
+    config = config or FakeLLMConfig()
+    behavior = FakeLLMBehavior(config)
+    app = FastAPI(title="Fake LLM", description="OpenAI-совместимая заглушка LLM")
+
+    @app.post("/v1/chat/completions", response_model=None)
+    async def chat_completions(request: ChatCompletionRequest) -> Response:
+        """Chat Completions: обычный ответ или SSE поток (stream=true)"""
+        error_status = behavior.injected_error()
+        first_token_delay = behavior.first_token_delay()
+        if error_status is not None:
+            await asyncio.sleep(first_token_delay)
+            return _error_response(error_status, config.retry_after_seconds)
+
+        text = behavior.reply(request.messages)
+        prompt_tokens = behavior.count_tokens(request.messages)
+        completion_tokens = estimate_tokens(text)
+        completion_id = f"chatcmpl-fake-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if not request.stream:
+            await asyncio.sleep(first_token_delay + behavior.generation_delay(completion_tokens))
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": request.model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": text},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": _usage(prompt_tokens, completion_tokens),
+                }
+            )
+
+        include_usage = request.stream_options is not None and request.stream_options.include_usage
+
+        def chunk(delta: dict[str, str], finish_reason: str | None = None) -> str:
+            return _sse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": request.model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+            )
+
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(first_token_delay)
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in behavior.pieces(text):
+                await asyncio.sleep(behavior.generation_delay(estimate_tokens(piece)))
+                yield chunk({"content": piece})
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                yield _sse(
+                    {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": request.model,
+                        "choices": [],
+                        "usage": _usage(prompt_tokens, completion_tokens),
+                    }
+                )
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/health")
+    async def health() -> dict[str, str]:
+        """Проверка работоспособности"""
+        return {"status": "ok"}
+
+    return app
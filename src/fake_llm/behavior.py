@@ -0,0 +1,66 @@
+import math
+import random
+import re
+
+from src.token_estimator import estimate_tokens
+
+from .config import FakeLLMConfig
+from .models import FakeChatMessage
+
+# Фрагмент потока: слово вместе с последующими пробелами
+_PIECE_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+class FakeLLMBehavior:
+    """
+    Поведение фейковой LLM: задержки, скорость генерации, ошибки и текст ответа.
+
+    Все случайные величины берутся из одного генератора (seed из конфигурации),
+    поэтому прогон с тем же seed и тем же порядком запросов воспроизводим.
+    """
+
+    def __init__(self, config: FakeLLMConfig) -> None:
+        self.config: FakeLLMConfig = config
+        self.error_statuses: list[int] = [
+            int(status) for status in config.error_statuses.split(",") if status.strip()
+        ]
+        self._random = random.Random(config.seed)
+
+    def first_token_delay(self) -> float:
+        """Задержка до первого токена в секундах по выбранному распределению"""
+        base = self.config.latency_ms / 1000
+        spread = self.config.latency_spread
+        if self.config.latency_distribution == "uniform":
+            return max(0.0, self._random.uniform(base * (1 - spread), base * (1 + spread)))
+        if self.config.latency_distribution == "lognormal" and base > 0:
+            return self._random.lognormvariate(math.log(base), spread)
+        return base
+
+    def generation_delay(self, tokens: int) -> float:
+        """Время генерации tokens токенов в секундах"""
+        if self.config.tokens_per_second <= 0:
+            return 0.0
+        return tokens / self.config.tokens_per_second
+
+    def injected_error(self) -> int | None:
+        """HTTP статус внедренной ошибки или None, если запрос должен пройти"""
+        if not self.error_statuses or self._random.random() >= self.config.error_rate:
+            return None
+        return self._random.choice(self.error_statuses)
+
+    def reply(self, messages: list[FakeChatMessage]) -> str:
+        """Текст ответа: эхо последнего сообщения пользователя или заготовка"""
+        if self.config.response_mode == "canned":
+            return self.config.canned_response
+        question = next((m.content for m in reversed(messages) if m.role == "user"), "")
+        return f"Echo: {question}"
+
+    @staticmethod
+    def pieces(text: str) -> list[str]:
+        """Разбить ответ на фрагменты потока (по словам)"""
+        return _PIECE_PATTERN.findall(text) or [text]
+
+    @staticmethod
+    def count_tokens(messages: list[FakeChatMessage]) -> int:
+        """Оценка токенов промпта"""
+        return sum(estimate_tokens(m.content) for m in messages)
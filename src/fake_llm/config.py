@@ -0,0 +1,30 @@
+from typing import Literal
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class FakeLLMConfig(BaseSettings):
+    """Конфигурация фейкового LLM сервера (переменные окружения FAKE_LLM_*)"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="FAKE_LLM_", env_file=".env", env_file_encoding="utf-8", extra="ignore"
+    )
+
+    host: str = "0.0.0.0"
+    port: int = 8090
+    # Задержка до первого токена: fixed - ровно latency_ms, uniform - latency_ms ± spread,
+    # lognormal - медиана latency_ms и sigma = spread (длинный хвост, как у реальных API)
+    latency_distribution: Literal["fixed", "uniform", "lognormal"] = "lognormal"
+    latency_ms: float = 300.0
+    latency_spread: float = 0.5
+    # Скорость генерации ответа, 0 - весь ответ сразу
+    tokens_per_second: float = 50.0
+    # Доля запросов, завершающихся ошибкой со случайным статусом из error_statuses
+    error_rate: float = 0.0
+    error_statuses: str = "429,500,503"
+    retry_after_seconds: float = 1.0
+    # echo - повтор последнего сообщения пользователя, canned - фиксированный ответ
+    response_mode: Literal["echo", "canned"] = "echo"
+    canned_response: str = "Это ответ фейковой LLM для нагрузочного тестирования."
+    # Seed генератора случайных чисел (воспроизводимые прогоны), None - случайный
+    seed: int | None = None
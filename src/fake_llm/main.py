@@ -0,0 +1,37 @@
+"""Точка входа для запуска фейкового LLM сервера."""
+
+import logging
+
+import uvicorn
+
+from src.fake_llm.config import FakeLLMConfig
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """Запуск фейкового LLM сервера."""
+    config = FakeLLMConfig()
+    logger.info(
+        f"Starting fake LLM server on {config.host}:{config.port} "
+        f"(latency {config.latency_distribution} {config.latency_ms}ms, "
+        f"{config.tokens_per_second} tok/s, error rate {config.error_rate})"
+    )
+
+    uvicorn.run(
+        "src.fake_llm.app:create_app",
+        factory=True,
+        host=config.host,
+        port=config.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
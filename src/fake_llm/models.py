@@ -0,0 +1,26 @@
+"""Pydantic модели запроса фейкового LLM сервера (подмножество OpenAI Chat Completions)."""
+
+from pydantic import BaseModel, Field
+
+
+class FakeChatMessage(BaseModel):
+    """Сообщение запроса."""
+
+    role: str
+    content: str = ""
+
+
+class StreamOptions(BaseModel):
+    """Параметры потоковой выдачи."""
+
+    include_usage: bool = False
+
+
+class ChatCompletionRequest(BaseModel):
+    """Запрос POST /v1/chat/completions."""
+
+    model: str
+    messages: list[FakeChatMessage] = Field(min_length=1)
+    temperature: float | None = None
+    stream: bool = False
+    stream_options: StreamOptions | None = None
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+from .config import Config
+from .handlers import send_reply
+from .update_routing import is_priority_command
+
+logger = logging.getLogger(__name__)
+
+BUSY_TEXT = "Сейчас слишком много запросов, попробуйте чуть позже."
+
+
+class HandlerConcurrencyLimiter(BaseMiddleware):
+    """
+    Ограничение параллельной обработки сообщений (outer middleware Dispatcher).
+
+    Не больше bot_max_concurrent_handlers сообщений обрабатываются
+    одновременно, еще не больше bot_handler_queue_size ждут своей очереди.
+    Сообщение сверх этого сразу получает BUSY_TEXT и не обрабатывается
+    (load shedding): память и задержка остаются ограниченными при перегрузке.
+    Сообщения без текста и команды, прерывающие ход (/clear), не ограничиваются.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.max_in_flight: int = config.bot_max_concurrent_handlers
+        self.max_queued: int = config.bot_handler_queue_size
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight: int = 0
+        self.queued: int = 0
+        self.max_observed_queued: int = 0
+        self.admitted: int = 0
+        self.shed: int = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Message) or event.text is None or is_priority_command(event.text):
+            return await handler(event, data)
+
+        if self._semaphore.locked() and self.queued >= self.max_queued:
+            self.shed += 1
+            logger.warning(f"Handler queue is full, shedding message from chat {event.chat.id}")
+            await send_reply(event, BUSY_TEXT, data.get("telegram_sender"))
+            return None
+
+        self.queued += 1
+        self.max_observed_queued = max(self.max_observed_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict[str, int]:
+        """Сообщения в обработке, глубина очереди, принятые и отброшенные"""
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_observed_queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
@@ -1,48 +1,76 @@
 import logging
-from collections.abc import AsyncGenerator, Callable
 
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.types import Message
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from .conversation import ConversationManager
 from .llm_client import LLMClient
-from .models import ChatMessage, extract_user_data
-from .user_repository import UserRepository
+from .llm_errors import LLMUnavailableError
+from .message_chunker import split_message
+from .models import ChatMessage, LLMUsage, extract_user_data
+from .streaming_reply import StreamingReply
+from .telegram_sender import TelegramSender
+from .turn_errors import TurnCancelledError
+from .turn_tracker import TurnTracker, tracked_turn
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+UNAVAILABLE_TEXT = "Сервис временно недоступен, попробуйте позже."
+CANCELLED_TEXT = "Генерация ответа остановлена."
+
+
+async def send_reply(message: Message, text: str, telegram_sender: TelegramSender | None) -> None:
+    """
+    Ответить в чат сообщения.
+
+    С TelegramSender ответ ставится в очередь отправки и handler не ждет
+    Telegram; без него ответ отправляется сразу (длинный - частями).
+    """
+    if telegram_sender is not None:
+        await telegram_sender.send(message.chat.id, text)
+        return
+    for chunk in split_message(text):
+        await message.answer(chunk)
+
 
 @router.message(Command("start"))
-async def cmd_start(message: Message) -> None:
+async def cmd_start(message: Message, telegram_sender: TelegramSender | None = None) -> None:
     if message.from_user is None:
         return
     logger.info(f"User {message.from_user.id} started the bot")
-    await message.answer(
+    await send_reply(
+        message,
         "Привет! Я LLM-ассистент.\n"
         "Просто отправь мне сообщение, и я отвечу.\n"
-        "Используй /help для списка команд."
+        "Используй /help для списка команд.",
+        telegram_sender,
     )
 
 
 @router.message(Command("help"))
-async def cmd_help(message: Message) -> None:
+async def cmd_help(message: Message, telegram_sender: TelegramSender | None = None) -> None:
     if message.from_user is None:
         return
     logger.info(f"User {message.from_user.id} requested help")
-    await message.answer(
+    await send_reply(
+        message,
         "Доступные команды:\n"
         "/start - начать работу\n"
         "/help - показать справку\n"
         "/clear - очистить историю диалога\n"
-        "/role - показать роль ассистента"
+        "/role - показать роль ассистента",
+        telegram_sender,
     )
 
 
 @router.message(Command("clear"))
-async def cmd_clear(message: Message, conversation_manager: ConversationManager) -> None:
+async def cmd_clear(
+    message: Message,
+    conversation_manager: ConversationManager,
+    telegram_sender: TelegramSender | None = None,
+) -> None:
     if message.from_user is None:
         return
     logger.info(f"User {message.from_user.id} cleared conversation")
@@ -50,77 +78,114 @@ async def cmd_clear(message: Message, conversation_manager: ConversationManager)
         chat_id=message.chat.id, user_id=message.from_user.id
     )
     await conversation_manager.clear_history(key)
-    await message.answer("История диалога очищена")
+    await send_reply(message, "История диалога очищена", telegram_sender)
 
 
 @router.message(Command("role"))
-async def cmd_role(message: Message, system_prompt: str) -> None:
+async def cmd_role(
+    message: Message, system_prompt: str, telegram_sender: TelegramSender | None = None
+) -> None:
     """Обработчик команды /role"""
     if message.from_user is None:
         return
     logger.info(f"User {message.from_user.id} requested role")
-    await message.answer(f"Моя роль:\n\n{system_prompt}")
+    await send_reply(message, f"Моя роль:\n\n{system_prompt}", telegram_sender)
 
 
 @router.message(F.text)
-async def handle_message(
+async def handle_message(  # noqa: PLR0913
     message: Message,
     llm_client: LLMClient,
     conversation_manager: ConversationManager,
-    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
     system_prompt: str,
+    *,
+    stream_edit_interval: float | None = None,
+    turn_tracker: TurnTracker | None = None,
+    telegram_sender: TelegramSender | None = None,
 ) -> None:
-    """Обработка текстовых сообщений через LLM с историей"""
+    """
+    Обработка текстовых сообщений через LLM с историей.
+
+    Если задан stream_edit_interval, ответ показывается по мере генерации
+    (StreamingReply); в историю сохраняется только итоговый текст.
+    Пока цепи всех моделей разомкнуты (CircuitBreaker), пользователь сразу
+    получает UNAVAILABLE_TEXT без обращения к БД и LLM.
+    С TurnTracker ход ограничен дедлайном и отменяется при /clear: ответ
+    не сохраняется и не отправляется. С TelegramSender ответ ставится в
+    очередь отправки, handler не ждет доставки.
+    """
     if message.from_user is None or message.text is None:
         return
     logger.debug(f"User {message.from_user.id} sent: {message.text}")
 
-    # Сохранить/обновить данные пользователя (с graceful degradation)
-    try:
-        user_data = extract_user_data(message.from_user)
-        session_gen = session_factory()
-        session = await session_gen.__anext__()
-        try:
-            user_repo = UserRepository(session)
-            await user_repo.upsert_user(
-                user_id=user_data.user_id,
-                username=user_data.username,
-                first_name=user_data.first_name,
-                last_name=user_data.last_name,
-            )
-            logger.debug(f"User data saved for user_id={user_data.user_id}")
-        finally:
-            await session_gen.aclose()
-    except Exception as e:
-        logger.error(f"Failed to save user data: {e}")
-        # Продолжаем работу даже если сохранение не удалось
+    if not llm_client.is_available():
+        logger.warning(f"LLM unavailable, fast-failing message from {message.from_user.id}")
+        await send_reply(message, UNAVAILABLE_TEXT, telegram_sender)
+        return
 
+    reply: StreamingReply | None = None
     try:
         # Получаем ключ диалога
         key = conversation_manager.get_conversation_key(
             chat_id=message.chat.id, user_id=message.from_user.id
         )
 
-        # Добавляем сообщение пользователя в историю
-        user_message = ChatMessage(role="user", content=message.text)
-        await conversation_manager.add_message(key, user_message)
-
-        # Получаем историю с system prompt
-        history = await conversation_manager.get_history(key, system_prompt)
+        async with tracked_turn(turn_tracker, key):
+            # Сохраняем пользователя и его сообщение, получаем историю с system prompt
+            turn = await conversation_manager.start_turn(
+                key,
+                ChatMessage(role="user", content=message.text),
+                system_prompt,
+                user_data=extract_user_data(message.from_user),
+            )
 
-        # Получение ответа от LLM
-        response = await llm_client.get_response(history)
+            # Расход токенов и задержка ответа сохраняются вместе с ним
+            usage: list[LLMUsage] = []
+            if stream_edit_interval is not None:
+                # Потоковая доставка: ответ сохраняется после того, как показан целиком
+                reply = StreamingReply(message, stream_edit_interval)
+                response = await reply.deliver(
+                    llm_client.stream_response(
+                        turn.history, user_id=turn.key.user_id, on_usage=usage.append
+                    )
+                )
+                await conversation_manager.finish_turn(
+                    turn,
+                    ChatMessage(
+                        role="assistant", content=response, usage=usage[-1] if usage else None
+                    ),
+                )
+                return
+
+            # Получение ответа от LLM
+            response = await llm_client.get_response(
+                turn.history, user_id=turn.key.user_id, on_usage=usage.append
+            )
 
-        # Добавляем ответ ассистента в историю
-        assistant_message = ChatMessage(role="assistant", content=response)
-        await conversation_manager.add_message(key, assistant_message)
+            # Добавляем ответ ассистента в историю
+            await conversation_manager.finish_turn(
+                turn,
+                ChatMessage(role="assistant", content=response, usage=usage[-1] if usage else None),
+            )
 
         # Отправка ответа пользователю
-        await message.answer(response)
+        await send_reply(message, response, telegram_sender)
 
+    except TurnCancelledError:
+        logger.info(f"Turn cancelled for user {message.from_user.id}")
+        if reply is not None:
+            await reply.fail(CANCELLED_TEXT)
     except Exception as e:
         logger.error(f"Error processing message: {e}")
-        await message.answer("Произошла ошибка при обработке запроса. Попробуйте позже.")
+        error_text = (
+            UNAVAILABLE_TEXT
+            if isinstance(e, LLMUnavailableError)
+            else "Произошла ошибка при обработке запроса. Попробуйте позже."
+        )
+        if reply is not None:
+            await reply.fail(error_text)
+        else:
+            await send_reply(message, error_text, telegram_sender)
 
 
 @router.message()
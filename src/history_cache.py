@@ -0,0 +1,176 @@
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .models import ChatMessage, ConversationKey
+from .token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CacheEntry:
+    messages: list[ChatMessage]
+    size_bytes: int
+    expires_at: float
+
+
+def _messages_size(messages: list[ChatMessage]) -> int:
+    return sum(len(m.content.encode("utf-8")) for m in messages)
+
+
+def trim_history(
+    messages: list[ChatMessage], max_messages: int, token_budget: int | None = None
+) -> list[ChatMessage]:
+    """
+    Оставить system сообщения и последние не-system сообщения.
+
+    Не-system сообщений не больше max_messages, а их суммарная оценка токенов
+    не больше token_budget (если задан). Последнее сообщение остается всегда.
+    """
+    system_messages = [m for m in messages if m.role == "system"]
+    recent = [m for m in messages if m.role != "system"][-max_messages:]
+    if token_budget is None or not recent:
+        return system_messages + recent
+
+    # Идем от новых сообщений к старым, пока укладываемся в бюджет
+    start = len(recent) - 1
+    used_tokens = _message_tokens(recent[start])
+    while start > 0:
+        next_tokens = _message_tokens(recent[start - 1])
+        if used_tokens + next_tokens > token_budget:
+            break
+        used_tokens += next_tokens
+        start -= 1
+    return system_messages + recent[start:]
+
+
+def _message_tokens(message: ChatMessage) -> int:
+    # token_count приходит из БД; оценка нужна только для сообщений без него
+    if message.token_count is not None:
+        return message.token_count
+    return estimate_tokens(message.content)
+
+
+class HistoryCache:
+    """
+    In-process LRU/TTL кэш истории диалогов.
+
+    Хранит окно истории (system prompt + последние сообщения) по ConversationKey.
+    Ограничен числом записей и суммарным размером контента в байтах.
+    TTL ограничивает устаревание, если в ту же БД пишут другие процессы.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 10 * 1024 * 1024,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.ttl_seconds: float = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[ConversationKey, _CacheEntry] = OrderedDict()
+        self._total_bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, key: ConversationKey) -> list[ChatMessage] | None:
+        """Получить копию закэшированной истории или None"""
+        entry = self._get_live_entry(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return list(entry.messages)
+
+    def put(self, key: ConversationKey, messages: list[ChatMessage]) -> None:
+        """Сохранить окно истории диалога"""
+        self._remove(key)
+
+        size_bytes = _messages_size(messages)
+        if size_bytes > self.max_bytes:
+            logger.debug(f"History for {key} exceeds cache size limit, not cached")
+            return
+
+        self._entries[key] = _CacheEntry(
+            messages=list(messages),
+            size_bytes=size_bytes,
+            expires_at=self._clock() + self.ttl_seconds,
+        )
+        self._total_bytes += size_bytes
+        self._evict()
+
+    def append(
+        self,
+        key: ConversationKey,
+        message: ChatMessage,
+        max_messages: int,
+        token_budget: int | None = None,
+    ) -> None:
+        """
+        Дописать сообщение в закэшированное окно (write-through).
+
+        Если диалога нет в кэше, ничего не делает: неполную историю не кэшируем.
+        Окно обрезается так же, как в ConversationManager (см. trim_history).
+        """
+        entry = self._get_live_entry(key)
+        if entry is None:
+            return
+
+        entry.messages = trim_history(entry.messages + [message], max_messages, token_budget)
+
+        new_size = _messages_size(entry.messages)
+        self._total_bytes += new_size - entry.size_bytes
+        entry.size_bytes = new_size
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def invalidate(self, key: ConversationKey) -> None:
+        """Удалить диалог из кэша"""
+        self._remove(key)
+
+    def clear(self) -> None:
+        """Очистить кэш полностью"""
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Счетчики кэша для мониторинга"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+        }
+
+    def _get_live_entry(self, key: ConversationKey) -> _CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._clock():
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key: ConversationKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size_bytes
+
+    def _evict(self) -> None:
+        # Вытесняем самые давно использованные записи (начало OrderedDict)
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size_bytes
+            self.evictions += 1
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from collections.abc import AsyncGenerator, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .repository import MessageRepository
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryCompactor:
+    """
+    Фоновая компактация очищенной истории.
+
+    /clear только сдвигает границу в conversations; компактор периодически
+    помечает сообщения за границей как удаленные небольшими батчами, чтобы
+    частичные индексы и статистика не учитывали очищенные строки.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+        interval_seconds: float = 60.0,
+        batch_size: int = 1000,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval_seconds: float = interval_seconds
+        self.batch_size: int = batch_size
+        self._task: asyncio.Task[None] | None = None
+
+    async def run_once(self) -> int:
+        """Компактировать все очищенные сообщения батчами, вернуть их количество"""
+        total = 0
+        while True:
+            session_gen = self.session_factory()
+            session = await session_gen.__anext__()
+            try:
+                repo = MessageRepository(session)
+                compacted = await repo.compact_cleared_messages(self.batch_size)
+            finally:
+                await session_gen.aclose()
+
+            total += compacted
+            if compacted < self.batch_size:
+                break
+
+        if total:
+            logger.info(f"Compacted {total} cleared messages")
+        return total
+
+    def start(self) -> None:
+        """Запустить периодическую компактацию в фоне"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить фоновую задачу"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"History compaction failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
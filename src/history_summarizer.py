@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from collections.abc import AsyncGenerator, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import Config
+from .conversation_repository import ConversationRepository
+from .history_cache import HistoryCache
+from .llm_client import LLMClient
+from .models import ChatMessage, ConversationKey
+from .repository import MessageRepository
+from .token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTION = (
+    "Ты ведешь краткое резюме диалога пользователя с ассистентом. "
+    "Объедини предыдущее резюме и новые сообщения в одно резюме: сохрани факты "
+    "о пользователе, его цели, договоренности и незакрытые вопросы. "
+    "Пиши кратко, от третьего лица, без вступлений."
+)
+SUMMARY_PREFIX = "Краткое содержание предыдущей части диалога:\n"
+
+
+def summary_message(summary: str) -> ChatMessage:
+    """System-сообщение с резюме, которое идет в историю после system prompt"""
+    return ChatMessage(role="system", content=SUMMARY_PREFIX + summary)
+
+
+class HistorySummarizer:
+    """
+    Фоновое сворачивание старой части диалога в резюме.
+
+    Когда окно истории хода превышает trigger_tokens, старые сообщения (кроме
+    keep_messages последних) сворачиваются в резюме отдельным запросом к LLM
+    вне пути ответа пользователю. За один запрос сворачивается не больше
+    max_input_messages сообщений, по порядку от границы резюме. Резюме
+    хранится в conversations.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+        llm_client: LLMClient,
+        config: Config,
+        history_cache: HistoryCache | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.llm_client = llm_client
+        self.history_cache: HistoryCache | None = history_cache
+        self.trigger_tokens: int = config.history_summary_trigger_tokens
+        self.keep_messages: int = config.history_summary_keep_messages
+        self.max_input_messages: int = config.history_summary_max_input_messages
+        self._tasks: dict[ConversationKey, asyncio.Task[bool]] = {}
+
+    def maybe_schedule(self, key: ConversationKey, history: list[ChatMessage]) -> None:
+        """Запустить сворачивание в фоне, если история хода превысила порог"""
+        recent = [m for m in history if m.role != "system"]
+        if len(recent) <= self.keep_messages or key in self._tasks:
+            return
+
+        tokens = sum(
+            m.token_count if m.token_count is not None else estimate_tokens(m.content)
+            for m in recent
+        )
+        if tokens < self.trigger_tokens:
+            return
+
+        task = asyncio.create_task(self.summarize(key))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        logger.debug(f"Scheduled summarization for conversation {key} ({tokens} tokens)")
+
+    async def summarize(self, key: ConversationKey) -> bool:
+        """
+        Свернуть старые сообщения диалога в резюме.
+
+        Returns:
+            True, если резюме обновлено
+        """
+        try:
+            return await self._summarize(key)
+        except Exception as e:
+            logger.error(f"Summarization failed for conversation {key}: {e}")
+            return False
+
+    async def stop(self) -> None:
+        """Отменить незавершенные фоновые задачи"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _summarize(self, key: ConversationKey) -> bool:
+        session_gen = self.session_factory()
+        session = await session_gen.__anext__()
+        try:
+            conversation = await ConversationRepository(session).get_conversation(key)
+            if conversation is None:
+                return False
+            previous_summary = conversation.summary
+            previous_boundary_id = conversation.summarized_message_id
+            cleared_message_id = conversation.cleared_message_id
+            after = (
+                (conversation.summarized_message_created_at, conversation.summarized_message_id)
+                if conversation.summarized_message_created_at is not None
+                and conversation.summarized_message_id is not None
+                else None
+            )
+            messages = await MessageRepository(session).get_messages_after(
+                key, after, limit=self.max_input_messages + self.keep_messages
+            )
+        finally:
+            await session_gen.aclose()
+
+        # Сообщения читаются от границы: если их больше лимита, сворачивается
+        # самая старая часть, а остаток - при следующем превышении порога
+        to_fold = messages[: -self.keep_messages] if self.keep_messages else messages
+        if not to_fold:
+            return False
+
+        dialog = "\n".join(f"{m.role}: {m.content}" for m in to_fold)
+        request = f"Предыдущее резюме:\n{previous_summary or 'нет'}\n\nНовые сообщения:\n{dialog}"
+        summary = await self.llm_client.get_response(
+            [
+                ChatMessage(role="system", content=SUMMARY_INSTRUCTION),
+                ChatMessage(role="user", content=request),
+            ],
+            user_id=key.user_id,
+        )
+
+        session_gen = self.session_factory()
+        session = await session_gen.__anext__()
+        try:
+            saved = await ConversationRepository(session).save_summary(
+                key,
+                summary,
+                boundary=to_fold[-1],
+                previous_boundary_id=previous_boundary_id,
+                cleared_message_id=cleared_message_id,
+            )
+        finally:
+            await session_gen.aclose()
+
+        if saved and self.history_cache is not None:
+            self.history_cache.invalidate(key)
+
+        logger.info(
+            f"Summarized {len(to_fold)} messages for conversation {key}: "
+            f"{'saved' if saved else 'discarded'}"
+        )
+        return saved
@@ -1,56 +1,476 @@
+import asyncio
 import logging
+import random
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, AsyncExitStack, nullcontext
+from typing import TypeVar, cast
 
-from openai import AsyncOpenAI
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    AsyncStream,
+    RateLimitError,
+)
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletionChunk, ChatCompletionMessageParam
 
+from .circuit_breaker import CircuitBreaker
 from .config import Config
-from .models import ChatMessage
+from .fair_scheduler import FairScheduler
+from .llm_errors import CircuitOpenError, LLMOverloadedError
+from .llm_metrics import LLMMetrics
+from .llm_rate_limiter import LLMRateLimiter
+from .llm_response_cache import LLMResponseCache, response_cache_key
+from .llm_route import LLMRoute, llm_routes
+from .models import ChatMessage, LLMUsage
+from .token_estimator import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Исходы попыток, после которых имеет смысл повторить запрос к той же модели
+RETRYABLE_OUTCOMES = frozenset(
+    {"rate_limited", "server_error", "timeout", "connection_error", "empty_response"}
+)
+SERVER_ERROR_STATUS = 500
+
+
+def attempt_outcome(error: Exception) -> str:
+    """Классифицировать ошибку попытки запроса к LLM"""
+    if isinstance(error, TimeoutError | APITimeoutError):
+        return "timeout"
+    if isinstance(error, RateLimitError):
+        return "rate_limited"
+    if isinstance(error, APIStatusError) and error.status_code >= SERVER_ERROR_STATUS:
+        return "server_error"
+    if isinstance(error, APIConnectionError):
+        return "connection_error"
+    if isinstance(error, ValueError):
+        return "empty_response"
+    return "error"
+
 
 class LLMClient:
-    def __init__(self, config: Config) -> None:
+    """
+    Клиент OpenAI-совместимого LLM API.
+
+    Запрос проходит по цепочке маршрутов (основная модель и LLM_FALLBACK_MODELS).
+    На 429/5xx, таймаутах и пустых ответах попытка повторяется с экспоненциальной
+    задержкой со случайным разбросом (с учетом Retry-After), затем запрос уходит
+    следующей модели. Вся цепочка ограничена общим дедлайном llm_deadline_seconds.
+    Исход каждой попытки учитывается в LLMMetrics.
+    С llm_hedging_enabled медленный запрос дублируется второму маршруту (_call_hedged).
+    Каждая попытка проходит через общий LLMRateLimiter (очередь с ограниченным ожиданием).
+    С llm_fair_scheduling_enabled запросы с user_id проходят справедливую очередь
+    по пользователям (FairScheduler) до отправки.
+    Вызовы с cache=True читают и пополняют LLMResponseCache (если он передан).
+    С llm_circuit_breaker_enabled маршруты с разомкнутой цепью (CircuitBreaker)
+    пропускаются без ожидания; если разомкнуты все, запрос сразу завершается
+    CircuitOpenError.
+    """
+
+    def __init__(self, config: Config, response_cache: LLMResponseCache | None = None) -> None:
         self.config: Config = config
+        # Повторы выполняет сам LLMClient, встроенные повторы SDK отключены
         self.client: AsyncOpenAI = AsyncOpenAI(
             api_key=config.openrouter_api_key,
             base_url=config.openrouter_base_url,
-            timeout=30.0,
+            timeout=config.llm_request_timeout_seconds,
+            max_retries=0,
+        )
+        self.routes: list[LLMRoute] = llm_routes(config)
+        self.metrics: LLMMetrics = LLMMetrics(window_size=config.llm_latency_window_size)
+        self.rate_limiter: LLMRateLimiter = LLMRateLimiter(config)
+        self.scheduler: FairScheduler | None = (
+            FairScheduler(config) if config.llm_fair_scheduling_enabled else None
+        )
+        self.response_cache: LLMResponseCache | None = response_cache
+        self.breaker: CircuitBreaker | None = (
+            CircuitBreaker(config) if config.llm_circuit_breaker_enabled else None
         )
+        self._clients: dict[str, AsyncOpenAI] = {config.openrouter_base_url: self.client}
 
-    async def get_response(self, messages: list[ChatMessage]) -> str:
+    async def get_response(
+        self,
+        messages: list[ChatMessage],
+        user_id: int | None = None,
+        cache: bool = False,
+        on_usage: Callable[[LLMUsage], None] | None = None,
+    ) -> str:
         """
         Получить ответ от LLM
 
         Args:
             messages: История диалога (список ChatMessage)
+            user_id: Пользователь для справедливой очереди (None - вне очереди)
+            cache: Использовать кэш ответов (для повторяющихся детерминированных
+                запросов; ответы в диалоге не кэшируются)
+            on_usage: Получает LLMUsage ответившей попытки (не вызывается при ответе из кэша)
 
         Returns:
             Текст ответа от LLM
 
         Raises:
-            Exception: При ошибке запроса к API
+            LLMUnavailableError: Очередь переполнена или цепи всех моделей разомкнуты
+            Exception: Ошибка последней попытки, если ни одна модель не ответила
         """
         try:
+            cache_key = self._cache_key(messages) if cache else None
+            if cache_key is not None and self.response_cache is not None:
+                cached = await self.response_cache.get(cache_key)
+                if cached is not None:
+                    logger.debug("LLM response served from cache")
+                    return cached
+
             logger.debug(f"Sending {len(messages)} messages to LLM")
 
             # Конвертация в формат OpenAI API
-            api_messages = [msg.to_dict() for msg in messages]
-
-            # Запрос к LLM
-            response = await self.client.chat.completions.create(
-                model=self.config.model_name,
-                messages=api_messages,  # type: ignore[arg-type]
-                temperature=self.config.temperature,
+            api_messages = cast(
+                list[ChatCompletionMessageParam], [msg.to_dict() for msg in messages]
             )
 
-            # Извлечение текста ответа
-            answer = response.choices[0].message.content
-            if answer is None:
-                raise ValueError("LLM returned empty response")
+            async def complete(route: LLMRoute) -> tuple[str, LLMUsage]:
+                started = time.monotonic()
+                response = await self._client_for(route).chat.completions.create(
+                    model=route.model,
+                    messages=api_messages,
+                    temperature=self.config.temperature,
+                )
+                # Извлечение текста ответа
+                answer = response.choices[0].message.content
+                if answer is None:
+                    raise ValueError("LLM returned empty response")
+                return answer, _usage(route, response.usage, time.monotonic() - started)
+
+            self.check_available()
+            tokens = _prompt_tokens(messages)
+            async with self._scheduled(user_id, tokens):
+                # Без запасного маршрута дубль ушел бы тому же медленному upstream
+                if self.config.llm_hedging_enabled and len(self.routes) > 1:
+                    answer, usage = await self._call_hedged(complete, tokens)
+                else:
+                    answer, usage = await self._call_with_fallback(complete, tokens)
             logger.debug(f"LLM response: {answer}")
+            if on_usage is not None:
+                on_usage(usage)
 
+            # Ключ построен по основной модели: ответ запасной модели не кэшируется
+            if (
+                cache_key is not None
+                and self.response_cache is not None
+                and usage.model == self.routes[0].model
+            ):
+                await self.response_cache.put(cache_key, answer)
             return answer
 
         except Exception as e:
             logger.error(f"LLM API error: {e}")
             raise
+
+    async def forget_cached_response(self, messages: list[ChatMessage]) -> None:
+        """Удалить закэшированный ответ на запрос (например, если он оказался непригоден)"""
+        cache_key = self._cache_key(messages)
+        if cache_key is not None and self.response_cache is not None:
+            await self.response_cache.invalidate(cache_key)
+
+    async def stream_response(
+        self,
+        messages: list[ChatMessage],
+        user_id: int | None = None,
+        on_usage: Callable[[LLMUsage], None] | None = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Получить ответ от LLM потоком фрагментов (stream=True).
+
+        Первый фрагмент приходит через время до первого токена, а не через
+        время генерации всего ответа. Повторы и запасные модели применяются
+        к открытию потока; после начала ответа поток не перезапускается.
+
+        Args:
+            messages: История диалога (список ChatMessage)
+            user_id: Пользователь для справедливой очереди (None - вне очереди);
+                слот очереди и слот LLMRateLimiter заняты до конца потока
+            on_usage: Получает LLMUsage после полностью прочитанного потока
+                (задержка - от открытия потока до последнего фрагмента)
+
+        Yields:
+            Непустые фрагменты текста ответа по мере генерации
+
+        Raises:
+            ValueError: Если LLM не вернула ни одного фрагмента текста
+            LLMUnavailableError: Очередь переполнена или цепи всех моделей разомкнуты
+            Exception: При ошибке запроса к API
+        """
+        try:
+            logger.debug(f"Streaming {len(messages)} messages to LLM")
+
+            api_messages = cast(
+                list[ChatCompletionMessageParam], [msg.to_dict() for msg in messages]
+            )
+
+            async def open_stream(
+                route: LLMRoute,
+            ) -> tuple[AsyncStream[ChatCompletionChunk], LLMRoute, float]:
+                started = time.monotonic()
+                stream = await self._client_for(route).chat.completions.create(
+                    model=route.model,
+                    messages=api_messages,
+                    temperature=self.config.temperature,
+                    stream=True,
+                    # usage приходит последним чанком с пустым choices
+                    stream_options={"include_usage": True},
+                )
+                return stream, route, started
+
+            self.check_available()
+            tokens = _prompt_tokens(messages)
+            received = False
+            usage: CompletionUsage | None = None
+            async with self._scheduled(user_id, tokens), AsyncExitStack() as rate_slot:
+                stream, route, started = await self._call_with_fallback(
+                    open_stream, tokens, hold=rate_slot
+                )
+                async with stream:
+                    async for chunk in stream:
+                        if chunk.usage is not None:
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            received = True
+                            yield delta
+
+            if not received:
+                raise ValueError("LLM returned empty response")
+            if on_usage is not None:
+                on_usage(_usage(route, usage, time.monotonic() - started))
+
+        except Exception as e:
+            logger.error(f"LLM API error: {e}")
+            raise
+
+    async def _call_with_fallback(
+        self,
+        call: Callable[[LLMRoute], Awaitable[T]],
+        tokens: int,
+        hold: AsyncExitStack | None = None,
+    ) -> T:
+        """
+        Выполнить запрос по цепочке маршрутов с повторами в пределах общего дедлайна.
+
+        hold передается в _attempt: слот LLMRateLimiter успешной попытки
+        освобождается вместе с ним, а не по возврату результата.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.llm_deadline_seconds
+        last_error: Exception | None = None
+
+        for route in self.routes:
+            for attempt in range(self.config.llm_max_retries + 1):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+
+                try:
+                    return await self._attempt(
+                        call,
+                        route,
+                        min(self.config.llm_request_timeout_seconds, remaining),
+                        tokens,
+                        hold=hold,
+                    )
+                except LLMOverloadedError:
+                    # Перегрузка общая для всех маршрутов: повтор только удлинит очередь
+                    raise
+                except CircuitOpenError as e:
+                    # Цепь разомкнута: сразу к следующему маршруту, без повторов и задержек
+                    last_error = last_error or e
+                    break
+                except Exception as e:
+                    outcome = attempt_outcome(e)
+                    logger.warning(
+                        f"LLM attempt {attempt + 1} to {route.name} failed ({outcome}): {e}"
+                    )
+                    last_error = e
+                    if outcome not in RETRYABLE_OUTCOMES or attempt == self.config.llm_max_retries:
+                        break
+
+                    delay = self._retry_delay(attempt, e)
+                    if delay >= deadline - loop.time():
+                        break
+                    await asyncio.sleep(delay)
+
+        if last_error is None:
+            raise TimeoutError("LLM request deadline exceeded")
+        raise last_error
+
+    async def _call_hedged(self, call: Callable[[LLMRoute], Awaitable[T]], tokens: int) -> T:
+        """
+        Выполнить запрос с хеджированием.
+
+        Если основная цепочка не ответила за перцентиль llm_hedge_percentile
+        недавних задержек основной модели, тот же запрос одной попыткой уходит
+        второму маршруту; берется первый успешный ответ, второй запрос отменяется.
+        Нужен хотя бы один запасной маршрут.
+        """
+        primary, hedge_route = self.routes[0], self.routes[1]
+        hedge_delay = self.metrics.latency_percentile(
+            primary.name, self.config.llm_hedge_percentile, self.config.llm_hedge_min_samples
+        )
+        if hedge_delay is None:
+            hedge_delay = self.config.llm_hedge_initial_delay_seconds
+
+        primary_task = asyncio.create_task(self._call_with_fallback(call, tokens))
+        pending: set[asyncio.Task[T]] = {primary_task}
+        hedge_task: asyncio.Task[T] | None = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                self.metrics.record_hedge(fired=False, won=False)
+                return primary_task.result()
+
+            logger.debug(f"Hedging LLM request to {hedge_route.name} after {hedge_delay:.2f}s")
+            hedge_task = asyncio.create_task(
+                self._attempt(call, hedge_route, self.config.llm_request_timeout_seconds, tokens)
+            )
+            pending.add(hedge_task)
+
+            error: BaseException = RuntimeError("Hedged LLM request failed")
+            primary_failed = False
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task_error = task.exception()
+                    if task_error is None:
+                        self.metrics.record_hedge(fired=True, won=task is hedge_task)
+                        return task.result()
+                    # Ошибка основной цепочки важнее ошибки одиночной хедж-попытки
+                    if task is primary_task or not primary_failed:
+                        error = task_error
+                        primary_failed = task is primary_task
+
+            self.metrics.record_hedge(fired=True, won=False)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _attempt(  # noqa: PLR0913
+        self,
+        call: Callable[[LLMRoute], Awaitable[T]],
+        route: LLMRoute,
+        timeout: float,
+        tokens: int,
+        *,
+        hold: AsyncExitStack | None = None,
+    ) -> T:
+        """
+        Одна попытка запроса к маршруту с учетом исхода и задержки в метриках.
+
+        Ожидание в очереди LLMRateLimiter входит в timeout попытки. Слот
+        освобождается по окончании попытки, а с hold - при закрытии hold:
+        открытый поток ответа занимает слот, пока его читают.
+        Исход попытки учитывается в CircuitBreaker; при разомкнутой цепи
+        попытка не выполняется (CircuitOpenError).
+        """
+        if self.breaker is not None and not self.breaker.allow(route.name):
+            raise CircuitOpenError(f"Circuit for {route.name} is open")
+
+        loop = asyncio.get_running_loop()
+        queued_at = loop.time()
+        # None - попытка не дошла до upstream (отмена, переполненная очередь)
+        outcome: str | None = None
+        try:
+            async with AsyncExitStack() as slot:
+                await slot.enter_async_context(
+                    self.rate_limiter.slot(route.model, tokens, max_wait=timeout)
+                )
+                started = loop.time()
+                try:
+                    result = await asyncio.wait_for(call(route), timeout - (started - queued_at))
+                except Exception as e:
+                    outcome = attempt_outcome(e)
+                    self.metrics.record_attempt(route.name, outcome, loop.time() - started)
+                    raise
+                outcome = "success"
+                self.metrics.record_attempt(route.name, outcome, loop.time() - started)
+                if hold is not None:
+                    hold.push_async_exit(slot.pop_all())
+                return result
+        finally:
+            if self.breaker is not None:
+                self.breaker.record(route.name, outcome)
+
+    def is_available(self) -> bool:
+        """Есть ли маршрут с замкнутой цепью (без circuit breaker - всегда True)"""
+        if self.breaker is None:
+            return True
+        return any(self.breaker.is_available(route.name) for route in self.routes)
+
+    def check_available(self) -> None:
+        """Быстрый отказ до постановки в очередь, если цепи всех моделей разомкнуты"""
+        if not self.is_available():
+            raise CircuitOpenError("Circuits for all LLM models are open")
+
+    def _cache_key(self, messages: list[ChatMessage]) -> str | None:
+        """Ключ кэша ответа: основная модель, температура и сообщения"""
+        if self.response_cache is None:
+            return None
+        return response_cache_key(self.routes[0].model, self.config.temperature, messages)
+
+    def _scheduled(self, user_id: int | None, tokens: int) -> AbstractAsyncContextManager[None]:
+        """Слот справедливой очереди пользователя (без очереди, если она выключена)"""
+        if self.scheduler is None or user_id is None:
+            return nullcontext()
+        return self.scheduler.slot(user_id, tokens)
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Экспоненциальная задержка с полным случайным разбросом, не меньше Retry-After"""
+        ceiling = min(
+            self.config.llm_retry_max_delay_seconds,
+            self.config.llm_retry_base_delay_seconds * 2**attempt,
+        )
+        delay = random.uniform(0, ceiling)
+        if isinstance(error, RateLimitError):
+            try:
+                delay = max(delay, float(error.response.headers.get("retry-after", "")))
+            except ValueError:
+                pass
+        return delay
+
+    def _client_for(self, route: LLMRoute) -> AsyncOpenAI:
+        """Клиент для base_url маршрута (создается один раз на endpoint)"""
+        client = self._clients.get(route.base_url)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=self.config.openrouter_api_key,
+                base_url=route.base_url,
+                timeout=self.config.llm_request_timeout_seconds,
+                max_retries=0,
+            )
+            self._clients[route.base_url] = client
+        return client
+
+
+def _usage(route: LLMRoute, usage: CompletionUsage | None, latency_seconds: float) -> LLMUsage:
+    """LLMUsage ответа: токены по данным API (если вернул) и задержка попытки"""
+    return LLMUsage(
+        model=route.model,
+        prompt_tokens=usage.prompt_tokens if usage is not None else None,
+        completion_tokens=usage.completion_tokens if usage is not None else None,
+        latency_ms=round(latency_seconds * 1000),
+    )
+
+
+def _prompt_tokens(messages: list[ChatMessage]) -> int:
+    """Оценка токенов промпта для лимита токенов в минуту"""
+    return sum(
+        m.token_count if m.token_count is not None else estimate_tokens(m.content) for m in messages
+    )
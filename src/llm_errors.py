@@ -0,0 +1,10 @@
+class LLMUnavailableError(Exception):
+    """LLM временно недоступна: запрос не отправлялся к провайдеру"""
+
+
+class LLMOverloadedError(LLMUnavailableError):
+    """Очередь к LLM переполнена: слот не получен за допустимое время ожидания"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Цепь модели разомкнута (CircuitBreaker): upstream недавно не отвечал"""
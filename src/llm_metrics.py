@@ -0,0 +1,74 @@
+import math
+from collections import Counter, defaultdict, deque
+
+
+class LLMMetrics:
+    """
+    Счетчики попыток запросов к LLM.
+
+    Каждая попытка (включая повторы и запасные модели) учитывается с исходом:
+    success, rate_limited, server_error, timeout, connection_error,
+    empty_response или error. Для успешных попыток хранится скользящее окно
+    последних window_size задержек по маршруту (для порога хеджирования).
+    Маршрут - LLMRoute.name: одна модель у разных провайдеров учитывается отдельно.
+    """
+
+    def __init__(self, window_size: int = 200) -> None:
+        self.window_size: int = window_size
+        self.attempts: Counter[tuple[str, str]] = Counter()
+        self.latency_seconds: defaultdict[str, float] = defaultdict(float)
+        self.requests: Counter[str] = Counter()
+        self._latency_windows: dict[str, deque[float]] = {}
+        self.hedge_candidates: int = 0
+        self.hedges_fired: int = 0
+        self.hedge_wins: int = 0
+
+    def record_attempt(self, route: str, outcome: str, latency_seconds: float) -> None:
+        """Учесть одну попытку запроса по маршруту"""
+        self.attempts[(route, outcome)] += 1
+        self.requests[route] += 1
+        self.latency_seconds[route] += latency_seconds
+        if outcome == "success":
+            window = self._latency_windows.setdefault(route, deque(maxlen=self.window_size))
+            window.append(latency_seconds)
+
+    def record_hedge(self, fired: bool, won: bool) -> None:
+        """Учесть запрос в режиме хеджирования: был ли отправлен дубль и выиграл ли он"""
+        self.hedge_candidates += 1
+        if fired:
+            self.hedges_fired += 1
+        if won:
+            self.hedge_wins += 1
+
+    def latency_percentile(self, route: str, percentile: float, min_samples: int) -> float | None:
+        """
+        Перцентиль задержки успешных попыток маршрута по скользящему окну.
+
+        Returns:
+            Задержка в секундах или None, если образцов меньше min_samples
+        """
+        window = self._latency_windows.get(route)
+        if window is None or len(window) < max(min_samples, 1):
+            return None
+        samples = sorted(window)
+        rank = max(math.ceil(percentile * len(samples)), 1)
+        return samples[min(rank, len(samples)) - 1]
+
+    def stats(self) -> dict[str, float]:
+        """Метрики для мониторинга: попытки по маршруту и исходу, задержки, хеджирование"""
+        result: dict[str, float] = {
+            f"attempts.{route}.{outcome}": count
+            for (route, outcome), count in sorted(self.attempts.items())
+        }
+        for route, count in sorted(self.requests.items()):
+            result[f"avg_latency_ms.{route}"] = self.latency_seconds[route] / count * 1000
+        for route in sorted(self._latency_windows):
+            p95 = self.latency_percentile(route, 0.95, 1)
+            if p95 is not None:
+                result[f"p95_latency_ms.{route}"] = p95 * 1000
+        if self.hedge_candidates:
+            result["hedge.requests"] = self.hedge_candidates
+            result["hedge.fired"] = self.hedges_fired
+            result["hedge.wins"] = self.hedge_wins
+            result["hedge.rate"] = self.hedges_fired / self.hedge_candidates
+        return result
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import NoReturn
+
+from .config import Config
+from .llm_errors import LLMOverloadedError
+from .token_bucket import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_MINUTE = 60.0
+
+
+class LLMRateLimiter:
+    """
+    Общий ограничитель запросов к LLM.
+
+    Не больше llm_max_concurrent_requests попыток одновременно и, по каждой
+    модели, не больше llm_requests_per_minute запросов и llm_tokens_per_minute
+    токенов промпта (token bucket). Вызывающий код ждет своей очереди не
+    дольше llm_queue_timeout_seconds, после чего получает LLMOverloadedError.
+    Значение 0 отключает соответствующий лимит.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.queue_timeout_seconds: float = config.llm_queue_timeout_seconds
+        self.requests_per_minute: int = config.llm_requests_per_minute
+        self.tokens_per_minute: int = config.llm_tokens_per_minute
+        self._semaphore: asyncio.Semaphore | None = (
+            asyncio.Semaphore(config.llm_max_concurrent_requests)
+            if config.llm_max_concurrent_requests > 0
+            else None
+        )
+        self._request_buckets: dict[str, TokenBucket] = {}
+        self._token_buckets: dict[str, TokenBucket] = {}
+        self.in_flight: int = 0
+        self.waiting: int = 0
+        self.max_waiting: int = 0
+        self.admitted: int = 0
+        self.rejected: int = 0
+        self.total_wait_seconds: float = 0.0
+        self.max_wait_seconds: float = 0.0
+
+    @asynccontextmanager
+    async def slot(self, model: str, tokens: int, max_wait: float) -> AsyncIterator[None]:
+        """
+        Дождаться слота для запроса к модели.
+
+        Args:
+            model: Модель (лимиты запросов и токенов в минуту считаются по модели)
+            tokens: Оценка токенов промпта
+            max_wait: Верхняя граница ожидания (например, остаток дедлайна запроса)
+
+        Raises:
+            LLMOverloadedError: Если слот не получен за время ожидания
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        timeout = min(self.queue_timeout_seconds, max_wait)
+
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        acquired = False
+        reserved: list[tuple[TokenBucket, float]] = []
+        try:
+            if self._semaphore is not None:
+                try:
+                    await asyncio.wait_for(self._semaphore.acquire(), timeout)
+                except TimeoutError:
+                    self._reject(model, "concurrency limit")
+                acquired = True
+
+            wait, reserved = self._reserve(model, tokens, timeout - (loop.time() - started))
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Запрос не отправлен: резерв в buckets достается следующим
+            for bucket, amount in reserved:
+                bucket.refund(amount)
+            if acquired and self._semaphore is not None:
+                self._semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited = loop.time() - started
+        self.admitted += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if acquired and self._semaphore is not None:
+                self._semaphore.release()
+
+    def stats(self) -> dict[str, float]:
+        """Метрики очереди: глубина, время ожидания, отказы"""
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": (
+                self.total_wait_seconds / self.admitted * 1000 if self.admitted else 0.0
+            ),
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
+
+    def _reserve(
+        self, model: str, tokens: int, max_wait: float
+    ) -> tuple[float, list[tuple[TokenBucket, float]]]:
+        """Зарезервировать запрос и токены в buckets модели: время ожидания и резерв"""
+        buckets: list[tuple[TokenBucket, float]] = []
+        if self.requests_per_minute > 0:
+            buckets.append(
+                (self._bucket(self._request_buckets, model, self.requests_per_minute), 1)
+            )
+        if self.tokens_per_minute > 0:
+            buckets.append(
+                (self._bucket(self._token_buckets, model, self.tokens_per_minute), tokens)
+            )
+
+        wait = max((bucket.wait_time(amount) for bucket, amount in buckets), default=0.0)
+        if wait > max_wait:
+            self._reject(model, "rate limit")
+        for bucket, amount in buckets:
+            bucket.consume(amount)
+        return wait, buckets
+
+    @staticmethod
+    def _bucket(buckets: dict[str, TokenBucket], model: str, per_minute: int) -> TokenBucket:
+        bucket = buckets.get(model)
+        if bucket is None:
+            bucket = TokenBucket(
+                rate_per_second=per_minute / SECONDS_PER_MINUTE, capacity=per_minute
+            )
+            buckets[model] = bucket
+        return bucket
+
+    def _reject(self, model: str, reason: str) -> NoReturn:
+        self.rejected += 1
+        logger.warning(f"LLM request to {model} rejected: {reason} queue timeout")
+        raise LLMOverloadedError(f"LLM is overloaded ({reason}), try again later")
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Callable
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import Config
+from .llm_response_repository import LLMResponseRepository
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+# Истекшие записи в БД удаляются не чаще раза в интервал, батчами
+EXPIRED_CLEANUP_INTERVAL_SECONDS = 60.0
+EXPIRED_CLEANUP_BATCH_SIZE = 1000
+
+
+def response_cache_key(model: str, temperature: float, messages: list[ChatMessage]) -> str:
+    """SHA-256 (hex) от модели, температуры и сообщений запроса"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "messages": [[m.role, m.content] for m in messages],
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _CacheEntry:
+    response: str
+    expires_at: float
+
+
+class LLMResponseCache:
+    """
+    Кэш ответов LLM по содержимому запроса (см. response_cache_key).
+
+    Первый уровень - LRU/TTL в памяти процесса, второй (если передан
+    session_factory) - таблица llm_responses, общая для процессов и
+    переживающая перезапуск. Ошибки БД не ломают запрос: кэш пропускается.
+    Истекшие записи в БД удаляет put: не чаще раза в
+    EXPIRED_CLEANUP_INTERVAL_SECONDS и не больше EXPIRED_CLEANUP_BATCH_SIZE строк.
+    Используется только вызовами с cache=True (LLMClient.get_response).
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        session_factory: Callable[[], AsyncGenerator[AsyncSession, None]] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries: int = config.llm_response_cache_max_entries
+        self.ttl_seconds: float = config.llm_response_cache_ttl_seconds
+        self.session_factory = session_factory
+        self._clock = clock
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._next_cleanup_at: float = clock()
+        self.hits: int = 0
+        self.persistent_hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expired_deleted: int = 0
+
+    async def get(self, key: str) -> str | None:
+        """Ответ из памяти, затем из БД; None при промахе"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > self._clock():
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.response
+        if entry is not None:
+            del self._entries[key]
+
+        response = await self._get_persistent(key)
+        if response is None:
+            self.misses += 1
+            return None
+
+        self.persistent_hits += 1
+        self._put_memory(key, response)
+        return response
+
+    async def put(self, key: str, response: str) -> None:
+        """Сохранить ответ в память и в БД"""
+        self._put_memory(key, response)
+        if self.session_factory is None:
+            return
+        try:
+            session_gen = self.session_factory()
+            session = await session_gen.__anext__()
+            try:
+                repo = LLMResponseRepository(session)
+                if self._clock() >= self._next_cleanup_at:
+                    self._next_cleanup_at = self._clock() + EXPIRED_CLEANUP_INTERVAL_SECONDS
+                    self.expired_deleted += await repo.delete_expired(EXPIRED_CLEANUP_BATCH_SIZE)
+                await repo.put(key, response, self.ttl_seconds)
+            finally:
+                await session_gen.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to store LLM response in persistent cache: {e}")
+
+    async def invalidate(self, key: str) -> None:
+        """Удалить ответ (например, если он оказался непригоден)"""
+        self._entries.pop(key, None)
+        if self.session_factory is None:
+            return
+        try:
+            session_gen = self.session_factory()
+            session = await session_gen.__anext__()
+            try:
+                await LLMResponseRepository(session).delete(key)
+            finally:
+                await session_gen.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to delete LLM response from persistent cache: {e}")
+
+    def stats(self) -> dict[str, int]:
+        """Счетчики кэша для мониторинга"""
+        return {
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expired_deleted": self.expired_deleted,
+            "entries": len(self._entries),
+        }
+
+    async def _get_persistent(self, key: str) -> str | None:
+        if self.session_factory is None:
+            return None
+        try:
+            session_gen = self.session_factory()
+            session = await session_gen.__anext__()
+            try:
+                return await LLMResponseRepository(session).get(key)
+            finally:
+                await session_gen.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to read persistent LLM response cache: {e}")
+            return None
+
+    def _put_memory(self, key: str, response: str) -> None:
+        self._entries[key] = _CacheEntry(
+            response=response, expires_at=self._clock() + self.ttl_seconds
+        )
+        self._entries.move_to_end(key)
+        # Вытесняем самые давно использованные записи (начало OrderedDict)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
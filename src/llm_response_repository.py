@@ -0,0 +1,70 @@
+"""Репозиторий постоянного кэша ответов LLM"""
+
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import CursorResult
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db_models import LLMResponse
+
+
+class LLMResponseRepository:
+    """Репозиторий закэшированных ответов LLM (таблица llm_responses)"""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get(self, key_hash: str) -> str | None:
+        """Ответ по ключу или None, если записи нет или она истекла"""
+        result = await self.session.execute(
+            select(LLMResponse.response).where(
+                LLMResponse.key_hash == key_hash,
+                LLMResponse.expires_at > func.localtimestamp(),
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def put(self, key_hash: str, response: str, ttl_seconds: float) -> None:
+        """Сохранить ответ (перезаписывает существующую запись) и зафиксировать транзакцию"""
+        expires_at = func.localtimestamp() + timedelta(seconds=ttl_seconds)
+        stmt = insert(LLMResponse).values(
+            key_hash=key_hash, response=response, expires_at=expires_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key_hash"],
+            set_={
+                "response": stmt.excluded.response,
+                "created_at": func.localtimestamp(),
+                "expires_at": stmt.excluded.expires_at,
+            },
+        )
+        await self.session.execute(stmt)
+        await self.session.commit()
+
+    async def delete_expired(self, batch_size: int) -> int:
+        """
+        Удалить пачку истекших записей (по индексу expires_at) и зафиксировать транзакцию.
+
+        Ограниченный батч держит блокировки короткими; SKIP LOCKED позволяет
+        нескольким процессам чистить таблицу параллельно.
+
+        Returns:
+            Количество удаленных записей
+        """
+        batch = (
+            select(LLMResponse.key_hash)
+            .where(LLMResponse.expires_at <= func.localtimestamp())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        query = delete(LLMResponse).where(LLMResponse.key_hash.in_(batch.scalar_subquery()))
+        result: CursorResult[tuple[str]] = await self.session.execute(query)  # type: ignore
+        await self.session.commit()
+        return result.rowcount or 0
+
+    async def delete(self, key_hash: str) -> None:
+        """Удалить ответ по ключу и зафиксировать транзакцию"""
+        await self.session.execute(delete(LLMResponse).where(LLMResponse.key_hash == key_hash))
+        await self.session.commit()
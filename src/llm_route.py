@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+from .config import Config
+
+
+@dataclass(frozen=True)
+class LLMRoute:
+    """Модель и OpenAI-совместимый endpoint, к которому отправляется запрос"""
+
+    model: str
+    base_url: str
+
+    @property
+    def name(self) -> str:
+        """Имя маршрута в circuit breaker и метриках: модель вместе с endpoint"""
+        return f"{self.model}@{self.base_url}"
+
+
+def llm_routes(config: Config) -> list[LLMRoute]:
+    """
+    Упорядоченный список маршрутов: основная модель, затем запасные.
+
+    LLM_FALLBACK_MODELS - через запятую, элемент "model" или "model@base_url"
+    (без base_url используется openrouter_base_url).
+    """
+    routes = [LLMRoute(model=config.model_name, base_url=config.openrouter_base_url)]
+    for raw_item in config.llm_fallback_models.split(","):
+        item = raw_item.strip()
+        if not item:
+            continue
+        model, _, base_url = item.partition("@")
+        routes.append(
+            LLMRoute(model=model.strip(), base_url=base_url.strip() or config.openrouter_base_url)
+        )
+    return routes
@@ -1,19 +1,11 @@
 import asyncio
 import logging
 
-from .bot import TelegramBot
-from .config import Config, load_system_prompt_with_fallback
-from .conversation import ConversationManager
-from .database import Database
-from .handlers import router
-from .llm_client import LLMClient
-
-
-def setup_logging(log_level: str) -> None:
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    )
+from .bot_runtime import BotRuntime, setup_logging
+from .bot_supervisor import BotSupervisor
+from .config import Config
+from .update_poller import poll_updates
+from .webhook_server import serve_webhook
 
 
 async def main() -> None:
@@ -23,51 +15,44 @@ async def main() -> None:
     # Настройка логирования
     setup_logging(config.log_level)
     logger = logging.getLogger(__name__)
-    logger.info("Starting systech-aidd bot...")
-
-    # Инициализация базы данных
-    database = Database(config.database_url)
+    logger.info(f"Starting systech-aidd bot ({config.telegram_delivery_mode})...")
+
+    # Несколько процессов: этот процесс только получает обновления (webhook или
+    # long polling) и распределяет их по процессам-обработчикам
+    if config.bot_workers > 1:
+        supervisor = BotSupervisor(config)
+        if not await supervisor.start():
+            logger.error("Failed to start bot workers. Exiting...")
+            return
+        try:
+            if config.telegram_delivery_mode == "webhook":
+                await serve_webhook(
+                    config, supervisor.route, lambda: {"workers": supervisor.stats()}
+                )
+            else:
+                await poll_updates(config, supervisor.put)
+        finally:
+            logger.info("Shutting down...")
+            await supervisor.stop()
+        return
 
-    # Проверка подключения к БД
-    if not await database.check_connection():
+    # Инициализация компонентов (БД, LLM, история) в этом процессе
+    runtime = BotRuntime(config)
+    if not await runtime.start():
         logger.error("Failed to connect to database. Exiting...")
         return
 
-    logger.info("Database connection successful")
-
-    # Загрузка системного промпта из файла (с fallback на дефолт)
-    system_prompt = load_system_prompt_with_fallback(config.system_prompt_file)
-    logger.info(f"System prompt loaded from {config.system_prompt_file}")
-
-    # Создание компонентов
-    llm_client = LLMClient(config)
-    conversation_manager = ConversationManager(
-        session_factory=database.get_session,
-        max_history_messages=config.max_history_messages,
-    )
-
-    # Создание бота
-    bot = TelegramBot(config)
-
-    # Регистрация handlers
-    bot.dp.include_router(router)
-
     try:
-        # Запуск polling с dependency injection
-        logger.info("Starting bot polling...")
-        await bot.dp.start_polling(
-            bot.bot,
-            llm_client=llm_client,
-            conversation_manager=conversation_manager,
-            session_factory=database.get_session,
-            system_prompt=system_prompt,
-        )
+        if config.telegram_delivery_mode == "webhook":
+            await serve_webhook(config, runtime.feed_nowait, runtime.stats)
+        else:
+            logger.info("Starting bot polling...")
+            await runtime.run_polling()
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     finally:
         logger.info("Shutting down...")
-        await bot.stop()
-        await database.disconnect()
+        await runtime.stop()
         logger.info("Bot shutdown complete")
 
 
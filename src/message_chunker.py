@@ -0,0 +1,114 @@
+"""Разбиение длинных ответов на сообщения Telegram (не длиннее 4096 символов)."""
+
+from collections.abc import Iterator
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+CODE_FENCE = "```"
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[str]:
+    """
+    Разбить текст на части не длиннее limit символов.
+
+    Границы частей выбираются по абзацам (пустая строка), затем по строкам,
+    затем по пробелам. Блок кода (```) не разрывается, если помещается в
+    часть целиком; длинный блок делится по строкам, и каждая часть получает
+    свои открывающую и закрывающую ``` - форматирование не ломается.
+    """
+    if len(text) <= limit:
+        return [text]
+
+    chunks: list[str] = []
+    current = ""
+    for separator, piece in _pieces(text, limit):
+        if current and len(current) + len(separator) + len(piece) <= limit:
+            current += separator + piece
+            continue
+        if current:
+            chunks.append(current)
+        current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _pieces(text: str, limit: int) -> Iterator[tuple[str, str]]:
+    """Фрагменты не длиннее limit с разделителем, который стоял перед ними в тексте"""
+    for separator, block in _blocks(text):
+        if len(block) <= limit:
+            yield separator, block
+        elif block.lstrip().startswith(CODE_FENCE):
+            for index, part in enumerate(_split_code_block(block, limit)):
+                yield (separator if index == 0 else "\n"), part
+        else:
+            for index, line in enumerate(block.split("\n")):
+                line_separator = separator if index == 0 else "\n"
+                for part_separator, part in _cut_line(line, limit):
+                    yield line_separator + part_separator, part
+                    line_separator = ""
+
+
+def _blocks(text: str) -> Iterator[tuple[str, str]]:
+    """Абзацы и блоки кода (целиком) с переводами строк перед ними"""
+    lines: list[str] = []
+    newlines = 0
+    in_code = False
+    for line in text.split("\n"):
+        is_fence = line.lstrip().startswith(CODE_FENCE)
+        if in_code:
+            lines.append(line)
+            if is_fence:
+                yield "\n" * newlines, "\n".join(lines)
+                lines, newlines, in_code = [], 1, False
+        elif is_fence:
+            if lines:
+                yield "\n" * newlines, "\n".join(lines)
+                newlines = 1
+            lines, in_code = [line], True
+        elif not line.strip():
+            if lines:
+                yield "\n" * newlines, "\n".join(lines)
+                lines, newlines = [], 1
+            newlines += 1
+        else:
+            lines.append(line)
+    if lines:
+        yield "\n" * newlines, "\n".join(lines)
+
+
+def _split_code_block(block: str, limit: int) -> Iterator[str]:
+    """Разбить блок кода по строкам, закрывая и заново открывая ``` в каждой части"""
+    lines = block.split("\n")
+    opener = lines[0]
+    body = lines[1:-1] if len(lines) > 1 and lines[-1].strip() == CODE_FENCE else lines[1:]
+    # Длинное описание языка после ``` не должно вытеснять код из частей
+    if len(opener) > limit // 2:
+        opener = CODE_FENCE
+    # Место под открывающую строку, закрывающую ``` и два перевода строки
+    budget = max(limit - len(opener) - len(CODE_FENCE) - 2, 1)
+
+    current: list[str] = []
+    size = 0
+    for line in body:
+        for _, part in _cut_line(line, budget):
+            if current and size + 1 + len(part) > budget:
+                yield "\n".join([opener, *current, CODE_FENCE])
+                current, size = [], 0
+            size += len(part) + (1 if current else 0)
+            current.append(part)
+    if current:
+        yield "\n".join([opener, *current, CODE_FENCE])
+
+
+def _cut_line(line: str, limit: int) -> Iterator[tuple[str, str]]:
+    """Разрезать строку длиннее limit, по возможности по пробелу"""
+    separator = ""
+    while len(line) > limit:
+        cut = line.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            yield separator, line[:limit]
+            line, separator = line[limit:], ""
+        else:
+            yield separator, line[:cut]
+            line, separator = line[cut + 1 :], " "
+    yield separator, line
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator, Callable
+from dataclasses import dataclass, field
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import Config
+from .db_models import Message
+from .models import ChatMessage, ConversationKey
+from .repository import MessageRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingMessage:
+    key: ConversationKey
+    message: ChatMessage
+    future: asyncio.Future[Message] = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+
+class MessageWriteQueue:
+    """
+    Write-behind очередь записи сообщений.
+
+    Собирает сообщения всех параллельных диалогов и пишет их пачками: по
+    max_batch_size строк или раз в flush_interval_ms, одним многострочным
+    INSERT ... RETURNING в одной транзакции. Вызывающий код ждет подтверждения
+    записи (commit пачки), поэтому гарантии сохранности те же, что у прямой вставки.
+    Не больше max_pending сообщений ждут записи: сверх лимита add ждет
+    освобождения места (backpressure).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+        config: Config,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_batch_size: int = config.message_write_queue_max_batch_size
+        self.flush_interval_seconds: float = config.message_write_queue_flush_interval_ms / 1000
+        self._queue: asyncio.Queue[_PendingMessage | None] = asyncio.Queue(
+            maxsize=config.message_write_queue_max_pending
+        )
+        self._task: asyncio.Task[None] | None = None
+        self._stopping: bool = False
+        self.batches: int = 0
+        self.messages: int = 0
+        self.failed_batches: int = 0
+        self.max_observed_batch_size: int = 0
+        self.last_flush_ms: float = 0.0
+        self.total_flush_ms: float = 0.0
+        self.max_flush_ms: float = 0.0
+
+    async def add(self, key: ConversationKey, message: ChatMessage) -> Message:
+        """
+        Поставить сообщение в очередь и дождаться его записи в БД.
+
+        Returns:
+            Сохраненное сообщение (id, created_at, token_count из RETURNING)
+        """
+        if self._stopping:
+            raise RuntimeError("Message write queue is stopped")
+        self.start()
+
+        pending = _PendingMessage(key=key, message=message)
+        await self._queue.put(pending)
+        return await pending.future
+
+    def start(self) -> None:
+        """Запустить фоновую запись (вызывается и лениво из add)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Дописать все принятые сообщения и остановить фоновую запись"""
+        self._stopping = True
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+        # Сообщения, дождавшиеся места в очереди уже после сигнала остановки
+        while not self._queue.empty():
+            await self._flush(self._take_batch([]))
+        logger.info(f"Message write queue stopped: {self.stats()}")
+
+    def stats(self) -> dict[str, float]:
+        """Метрики очереди: размер пачек и время записи"""
+        return {
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "messages": self.messages,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": self.messages / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_observed_batch_size,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": self.total_flush_ms / self.batches if self.batches else 0.0,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = loop.time() + self.flush_interval_seconds
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if pending is None:
+                    # Сигнал остановки: дописываем собранное и выходим
+                    await self._flush(batch)
+                    return
+                batch.append(pending)
+            await self._flush(batch)
+
+    def _take_batch(self, batch: list[_PendingMessage]) -> list[_PendingMessage]:
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if pending is not None:
+                batch.append(pending)
+        return batch
+
+    async def _flush(self, batch: list[_PendingMessage]) -> None:
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        try:
+            session_gen = self.session_factory()
+            session = await session_gen.__anext__()
+            try:
+                repo = MessageRepository(session)
+                db_messages = await repo.add_messages([(p.key, p.message) for p in batch])
+            finally:
+                await session_gen.aclose()
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"Failed to write batch of {len(batch)} messages: {e}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self.messages += len(batch)
+        self.max_observed_batch_size = max(self.max_observed_batch_size, len(batch))
+        self.last_flush_ms = elapsed_ms
+        self.total_flush_ms += elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+
+        for pending, db_message in zip(batch, db_messages, strict=True):
+            if not pending.future.done():
+                pending.future.set_result(db_message)
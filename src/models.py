@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from datetime import datetime
 from enum import Enum
 from typing import TYPE_CHECKING, Literal
 
@@ -27,22 +28,53 @@ class ConversationKey:
     user_id: int
 
 
+@dataclass(frozen=True)
+class LLMUsage:
+    """
+    Расход на один ответ LLM: модель, токены (по данным API) и задержка upstream.
+
+    prompt_tokens и completion_tokens равны None, если API не вернул usage.
+    """
+
+    model: str
+    prompt_tokens: int | None
+    completion_tokens: int | None
+    latency_ms: int
+
+
 @dataclass
 class ChatMessage:
     """
     Сообщение в диалоге с LLM.
 
     Формат совместим с OpenAI Chat Completions API.
+    created_at и token_count заполняются для сообщений, прочитанных из БД,
+    usage - для ответов ассистента, полученных от LLM; в API они не передаются.
     """
 
     role: Literal["system", "user", "assistant"]
     content: str
+    created_at: datetime | None = None
+    token_count: int | None = None
+    usage: LLMUsage | None = None
 
     def to_dict(self) -> dict[str, str]:
         """Конвертация в формат OpenAI API"""
         return {"role": self.role, "content": self.content}
 
 
+@dataclass(frozen=True)
+class ConversationTurn:
+    """
+    Один ход диалога: ключ и история, подготовленная для запроса к LLM.
+
+    Создается ConversationManager.start_turn и завершается finish_turn.
+    """
+
+    key: ConversationKey
+    history: list[ChatMessage]
+
+
 @dataclass(frozen=True)
 class UserData:
     """
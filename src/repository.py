@@ -1,12 +1,24 @@
 import logging
 from datetime import datetime
 
-from sqlalchemy import desc, select, update
+from sqlalchemy import (
+    ColumnElement,
+    String,
+    and_,
+    desc,
+    func,
+    literal_column,
+    select,
+    tuple_,
+    update,
+)
 from sqlalchemy.engine import CursorResult
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .db_models import Message
+from .conversation_repository import ConversationRepository
+from .db_models import Conversation, Message
 from .models import ChatMessage, ConversationKey
+from .token_estimator import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -17,69 +29,96 @@ class MessageRepository:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def add_message(self, key: ConversationKey, message: ChatMessage) -> Message:
-        """Добавить сообщение в БД"""
-        content_length = len(message.content)
-        db_message = Message(
-            chat_id=key.chat_id,
-            user_id=key.user_id,
-            role=message.role,
-            content=message.content,
-            content_length=content_length,
-        )
-        self.session.add(db_message)
-        await self.session.commit()
-        await self.session.refresh(db_message)
+    async def add_message(
+        self, key: ConversationKey, message: ChatMessage, commit: bool = True
+    ) -> Message:
+        """
+        Добавить сообщение в БД.
 
-        logger.debug(
-            f"Added message to DB: chat_id={key.chat_id}, "
-            f"user_id={key.user_id}, role={message.role}"
-        )
-        return db_message
+        id и created_at возвращаются тем же INSERT ... RETURNING, отдельный refresh не нужен.
+        Счетчики диалога в conversations обновляются в той же транзакции.
+        При commit=False сообщение только отправляется в текущую транзакцию (flush),
+        фиксирует ее вызывающий код.
+        """
+        db_messages = await self.add_messages([(key, message)], commit=commit)
+        return db_messages[0]
+
+    async def add_messages(
+        self, items: list[tuple[ConversationKey, ChatMessage]], commit: bool = True
+    ) -> list[Message]:
+        """
+        Добавить пачку сообщений (возможно, из разных диалогов) в БД.
+
+        Пачка уходит одним многострочным INSERT ... RETURNING, счетчики всех
+        затронутых диалогов обновляются одним UPSERT в той же транзакции.
+        Порядок результата совпадает с порядком items.
+        """
+        db_messages = [
+            Message(
+                chat_id=key.chat_id,
+                user_id=key.user_id,
+                role=message.role,
+                content=message.content,
+                content_length=len(message.content),
+                token_count=estimate_tokens(message.content),
+                model=message.usage.model if message.usage else None,
+                prompt_tokens=message.usage.prompt_tokens if message.usage else None,
+                completion_tokens=message.usage.completion_tokens if message.usage else None,
+                latency_ms=message.usage.latency_ms if message.usage else None,
+            )
+            for key, message in items
+        ]
+        self.session.add_all(db_messages)
+        await self.session.flush()
+        await ConversationRepository(self.session).record_messages(db_messages)
+        if commit:
+            await self.session.commit()
+
+        logger.debug(f"Added {len(db_messages)} message(s) to DB")
+        return db_messages
 
     async def get_history(
-        self, key: ConversationKey, limit: int | None = None
+        self,
+        key: ConversationKey,
+        limit: int | None = None,
+        after: tuple[datetime, int] | None = None,
     ) -> list[ChatMessage]:
         """
-        Получить историю диалога (только не удаленные сообщения).
+        Получить историю диалога (только не удаленные и не очищенные сообщения).
+
+        Возвращает limit последних не-system сообщений; лимит применяется в SQL,
+        поэтому стоимость чтения не растет с длиной диалога. System prompt
+        хранится в system_prompts, а не в messages (старые system-строки пропускаются).
 
         Args:
             key: Ключ диалога
-            limit: Ограничение количества сообщений (кроме system)
+            limit: Ограничение количества сообщений
+            after: (created_at, id) сообщения, после которого читать (граница резюме)
 
         Returns:
-            Список сообщений в формате ChatMessage
+            Список сообщений в формате ChatMessage (от старых к новым)
         """
-        # Запрос всех не удаленных сообщений
-        query = (
-            select(Message)
-            .where(
-                Message.chat_id == key.chat_id,
-                Message.user_id == key.user_id,
-                Message.deleted_at.is_(None),
-            )
-            .order_by(desc(Message.created_at))
-        )
+        recent_query = select(
+            Message.id, Message.role, Message.content, Message.created_at, Message.token_count
+        ).where(*self._window_filter(key, after))
+        recent_query = recent_query.order_by(desc(Message.created_at), desc(Message.id))
+        if limit is not None:
+            recent_query = recent_query.limit(limit)
+        window = recent_query.subquery()
 
-        result = await self.session.execute(query)
-        messages = list(result.scalars().all())
+        query = select(
+            window.c.role, window.c.content, window.c.created_at, window.c.token_count
+        ).order_by(window.c.created_at, window.c.id)
 
-        # Разделяем system и не-system сообщения
-        system_messages = [m for m in messages if m.role == "system"]
-        non_system_messages = [m for m in messages if m.role != "system"]
-
-        # Применяем лимит только к не-system сообщениям
-        if limit is not None and len(non_system_messages) > limit:
-            non_system_messages = non_system_messages[:limit]
-
-        # Объединяем и сортируем по дате (от старых к новым)
-        filtered_messages = system_messages + non_system_messages
-        filtered_messages.sort(key=lambda m: m.created_at)
-
-        # Конвертируем в ChatMessage
+        result = await self.session.execute(query)
         chat_messages = [
-            ChatMessage(role=msg.role, content=msg.content)  # type: ignore
-            for msg in filtered_messages
+            ChatMessage(
+                role=row.role,
+                content=row.content,
+                created_at=row.created_at,
+                token_count=row.token_count,
+            )
+            for row in result
         ]
 
         logger.debug(
@@ -88,9 +127,34 @@ class MessageRepository:
         )
         return chat_messages
 
+    async def get_messages_after(
+        self, key: ConversationKey, after: tuple[datetime, int] | None, limit: int
+    ) -> list[Message]:
+        """
+        Получить limit первых не-system сообщений после границы after.
+
+        Используется фоновым HistorySummarizer: он сворачивает историю по
+        порядку от текущей границы резюме, и ему нужны id сообщений для
+        новой границы.
+
+        Returns:
+            Список Message (от старых к новым)
+        """
+        query = (
+            select(Message)
+            .where(*self._window_filter(key, after))
+            .order_by(Message.created_at, Message.id)
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
     async def soft_delete_history(self, key: ConversationKey) -> int:
         """
-        Мягкое удаление всех сообщений диалога.
+        Мягкое удаление всех сообщений диалога одним UPDATE.
+
+        Для /clear используется ConversationRepository.mark_cleared: UPDATE всех
+        строк диалога на длинной истории - долгая запись в горячую таблицу.
 
         Returns:
             Количество удаленных сообщений
@@ -106,6 +170,7 @@ class MessageRepository:
         )
 
         result: CursorResult[tuple[int]] = await self.session.execute(query)  # type: ignore
+        await ConversationRepository(self.session).reset_counters(key)
         await self.session.commit()
 
         deleted_count: int = result.rowcount or 0
@@ -119,18 +184,92 @@ class MessageRepository:
         """
         Получить количество не удаленных сообщений в диалоге.
 
+        Читает счетчик из conversations по первичному ключу.
+
         Returns:
             Количество сообщений
         """
-        query = select(Message).where(
+        conversation = await ConversationRepository(self.session).get_conversation(key)
+        count = conversation.message_count if conversation is not None else 0
+
+        logger.debug(f"Message count for chat_id={key.chat_id}, user_id={key.user_id}: {count}")
+        return count
+
+    async def compact_cleared_messages(self, batch_size: int) -> int:
+        """
+        Пометить удаленными (deleted_at) пачку сообщений за границей очистки диалогов.
+
+        Ограниченный батч держит блокировки и объем WAL маленькими;
+        SKIP LOCKED позволяет нескольким процессам компактировать параллельно.
+
+        Returns:
+            Количество помеченных сообщений
+        """
+        batch = (
+            select(Message.id)
+            .join(
+                Conversation,
+                and_(
+                    Conversation.chat_id == Message.chat_id,
+                    Conversation.user_id == Message.user_id,
+                ),
+            )
+            .where(
+                Conversation.cleared_message_id.is_not(None),
+                Message.deleted_at.is_(None),
+                tuple_(Message.created_at, Message.id)
+                <= tuple_(Conversation.cleared_message_created_at, Conversation.cleared_message_id),
+            )
+            .limit(batch_size)
+            .with_for_update(of=Message, skip_locked=True)
+        )
+        query = (
+            update(Message)
+            .where(Message.id.in_(batch.scalar_subquery()))
+            .values(deleted_at=func.now())
+        )
+
+        result: CursorResult[tuple[int]] = await self.session.execute(query)  # type: ignore
+        await self.session.commit()
+
+        compacted_count: int = result.rowcount or 0
+        logger.debug(f"Compacted {compacted_count} cleared messages")
+        return compacted_count
+
+    def _window_filter(
+        self, key: ConversationKey, after: tuple[datetime, int] | None
+    ) -> tuple[ColumnElement[bool], ...]:
+        """Условия окна истории: видимые не-system сообщения после границы after"""
+        # Литерал, а не параметр: так фильтр одинаково планируется и в generic plan
+        # prepared statement (asyncpg)
+        system_role: ColumnElement[str] = literal_column("'system'", String)
+        conditions = (*self._visible_filter(key), Message.role != system_role)
+        if after is None:
+            return conditions
+        return (*conditions, tuple_(Message.created_at, Message.id) > tuple_(*after))
+
+    def _visible_filter(self, key: ConversationKey) -> tuple[ColumnElement[bool], ...]:
+        """
+        Условия видимости сообщений диалога.
+
+        Сообщение видно, если оно не удалено и (created_at, id) позже границы
+        очистки диалога из conversations. Граница сравнивается как row value,
+        поэтому попадает в условие индекса idx_messages_active.
+        """
+        marker_filter = and_(
+            Conversation.chat_id == key.chat_id, Conversation.user_id == key.user_id
+        )
+        cleared_at = select(Conversation.cleared_message_created_at).where(marker_filter)
+        cleared_id = select(Conversation.cleared_message_id).where(marker_filter)
+        return (
             Message.chat_id == key.chat_id,
             Message.user_id == key.user_id,
             Message.deleted_at.is_(None),
+            tuple_(Message.created_at, Message.id)
+            > tuple_(
+                func.coalesce(
+                    cleared_at.scalar_subquery(), literal_column("'-infinity'::timestamp")
+                ),
+                func.coalesce(cleared_id.scalar_subquery(), 0),
+            ),
         )
-
-        result = await self.session.execute(query)
-        messages = result.scalars().all()
-        count = len(list(messages))
-
-        logger.debug(f"Message count for chat_id={key.chat_id}, user_id={key.user_id}: {count}")
-        return count
@@ -0,0 +1,83 @@
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from aiogram.types import Message
+
+from .message_chunker import TELEGRAM_MESSAGE_LIMIT, split_message
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_TEXT = "…"
+
+
+class StreamingReply:
+    """
+    Потоковая доставка ответа LLM в Telegram.
+
+    Сразу отправляет сообщение-заглушку и редактирует его по мере прихода
+    фрагментов, не чаще раза в edit_interval_seconds (лимиты Bot API на
+    редактирование). Первый фрагмент показывается без задержки, поэтому
+    ожидание пользователя сокращается до времени первого токена.
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        edit_interval_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.message = message
+        self.edit_interval_seconds: float = edit_interval_seconds
+        self._clock = clock
+        self._reply: Message | None = None
+        self._shown_text: str = ""
+        self._last_edit_at: float = float("-inf")
+
+    async def deliver(self, deltas: AsyncIterator[str]) -> str:
+        """
+        Показать ответ по мере генерации.
+
+        Returns:
+            Полный текст ответа (для сохранения в историю)
+        """
+        self._reply = await self.message.answer(PLACEHOLDER_TEXT)
+
+        text = ""
+        async for delta in deltas:
+            text += delta
+            if self._clock() - self._last_edit_at >= self.edit_interval_seconds:
+                await self._edit_progress(text[:TELEGRAM_MESSAGE_LIMIT])
+
+        # Финальный текст: заглушка получает первую часть, остальное - новыми сообщениями
+        chunks = split_message(text)
+        await self._edit(chunks[0])
+        for chunk in chunks[1:]:
+            await self.message.answer(chunk)
+        return text
+
+    async def fail(self, error_text: str) -> None:
+        """Сообщить об ошибке: заменить заглушку или отправить новое сообщение"""
+        if self._reply is None:
+            await self.message.answer(error_text)
+        else:
+            await self._edit(error_text)
+
+    async def _edit_progress(self, text: str) -> None:
+        # Промежуточная правка не критична: при ошибке (в т.ч. flood control) пропускаем
+        try:
+            await self._edit(text)
+        except TelegramAPIError as e:
+            logger.debug(f"Skipped streaming edit: {e}")
+
+    async def _edit(self, text: str) -> None:
+        if self._reply is None or text == self._shown_text:
+            return
+        try:
+            await self._reply.edit_text(text)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
+        self._shown_text = text
+        self._last_edit_at = self._clock()
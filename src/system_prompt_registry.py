@@ -0,0 +1,64 @@
+import logging
+from collections.abc import AsyncGenerator, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .system_prompt_repository import SystemPromptRepository, compute_content_hash
+
+logger = logging.getLogger(__name__)
+
+
+class SystemPromptRegistry:
+    """
+    In-process реестр версий system prompt.
+
+    Текст каждой версии хранится в памяти процесса один раз; к БД обращается
+    только при первом использовании версии. Новая версия фиксируется в своей
+    транзакции, чтобы откат хода диалога не оставил в памяти несуществующий id.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncGenerator[AsyncSession, None]]) -> None:
+        self.session_factory = session_factory
+        self._contents: dict[int, str] = {}
+        self._ids_by_hash: dict[str, int] = {}
+
+    async def resolve_id(self, content: str) -> int:
+        """Получить id версии для текста prompt, зарегистрировав ее при необходимости"""
+        content_hash = compute_content_hash(content)
+        prompt_id = self._ids_by_hash.get(content_hash)
+        if prompt_id is not None:
+            return prompt_id
+
+        session_gen = self.session_factory()
+        session = await session_gen.__anext__()
+        try:
+            prompt = await SystemPromptRepository(session).get_or_create(content)
+            await session.commit()
+        finally:
+            await session_gen.aclose()
+
+        self._remember(prompt.id, content_hash, prompt.content)
+        return prompt.id
+
+    async def get_content(self, prompt_id: int) -> str:
+        """Получить текст версии prompt"""
+        content = self._contents.get(prompt_id)
+        if content is not None:
+            return content
+
+        session_gen = self.session_factory()
+        session = await session_gen.__anext__()
+        try:
+            prompt = await SystemPromptRepository(session).get_by_id(prompt_id)
+        finally:
+            await session_gen.aclose()
+
+        if prompt is None:
+            raise ValueError(f"System prompt {prompt_id} not found")
+        self._remember(prompt.id, prompt.content_hash, prompt.content)
+        return prompt.content
+
+    def _remember(self, prompt_id: int, content_hash: str, content: str) -> None:
+        self._contents[prompt_id] = content
+        self._ids_by_hash[content_hash] = prompt_id
+        logger.debug(f"System prompt {prompt_id} loaded into registry")
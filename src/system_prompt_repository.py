@@ -0,0 +1,72 @@
+"""Репозиторий для работы с версиями system prompt в базе данных"""
+
+import hashlib
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db_models import SystemPrompt
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory lock, под которым выдается номер новой версии prompt
+VERSION_LOCK_KEY = 720_261_106
+
+
+def compute_content_hash(content: str) -> str:
+    """SHA-256 текста prompt (hex), ключ дедупликации"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class SystemPromptRepository:
+    """Репозиторий для работы с версиями system prompt в базе данных"""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get_or_create(self, content: str) -> SystemPrompt:
+        """
+        Найти версию prompt по хэшу текста или создать следующую версию.
+
+        Номер версии вычисляется под advisory lock транзакции: параллельные
+        регистрации разных текстов получают разные номера (lock держится до
+        commit). Вставка выполняется в текущую транзакцию, фиксирует ее
+        вызывающий код.
+        """
+        content_hash = compute_content_hash(content)
+        existing = await self._get_by_hash(content_hash)
+        if existing is not None:
+            return existing
+
+        await self.session.execute(select(func.pg_advisory_xact_lock(VERSION_LOCK_KEY)))
+        next_version = select(func.coalesce(func.max(SystemPrompt.version), 0) + 1)
+        stmt = (
+            insert(SystemPrompt)
+            .values(
+                content_hash=content_hash,
+                version=next_version.scalar_subquery(),
+                content=content,
+            )
+            .on_conflict_do_nothing(index_elements=["content_hash"])
+            .returning(SystemPrompt.id)
+        )
+        created_id = (await self.session.execute(stmt)).scalar_one_or_none()
+        if created_id is not None:
+            logger.info(f"Registered new system prompt version: id={created_id}")
+
+        result = await self.session.execute(
+            select(SystemPrompt).where(SystemPrompt.content_hash == content_hash)
+        )
+        return result.scalar_one()
+
+    async def get_by_id(self, prompt_id: int) -> SystemPrompt | None:
+        """Получить версию prompt по id"""
+        return await self.session.get(SystemPrompt, prompt_id)
+
+    async def _get_by_hash(self, content_hash: str) -> SystemPrompt | None:
+        result = await self.session.execute(
+            select(SystemPrompt).where(SystemPrompt.content_hash == content_hash)
+        )
+        return result.scalar_one_or_none()
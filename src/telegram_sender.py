@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+
+from .chat_sequencer import ChatSequencer
+from .config import Config
+from .message_chunker import split_message
+from .token_bucket import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Сколько корзин чатов держать; сверх лимита удаляются корзины простаивающих чатов
+MAX_CHAT_BUCKETS = 10_000
+
+
+class TelegramSender:
+    """
+    Очередь исходящих сообщений Telegram с учетом flood control.
+
+    send ставит ответ в очередь и сразу возвращается (ждет только места в
+    очереди, не больше telegram_send_queue_size ответов). Сообщения одного
+    чата уходят по порядку, разные чаты - параллельно (ChatSequencer).
+    Частота отправки ограничена корзиной каждого чата
+    (telegram_chat_messages_per_second, запас telegram_chat_burst) и общим
+    token bucket без запаса: общие отправки идут равномерно, без всплесков
+    сверх лимита Bot API. Лимит бота telegram_global_messages_per_second
+    делится поровну между bot_workers процессами, у каждого из которых своя
+    очередь отправки. Длинный ответ делится на части по 4096 символов
+    (split_message). На RetryAfter (429) отправка повторяется после
+    указанной паузы, не больше telegram_send_max_retries раз. Потоковые
+    ответы (StreamingReply) идут мимо очереди.
+    """
+
+    def __init__(
+        self, bot: Bot, config: Config, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.bot = bot
+        self.chat_rate: float = config.telegram_chat_messages_per_second
+        self.chat_burst: float = config.telegram_chat_burst
+        self.max_retries: int = config.telegram_send_max_retries
+        self.global_rate: float = config.telegram_global_messages_per_second / config.bot_workers
+        self._clock = clock
+        self._sequencer = ChatSequencer(max_pending=config.telegram_send_queue_size)
+        self._global_bucket = TokenBucket(
+            rate_per_second=self.global_rate,
+            capacity=1.0,
+            clock=clock,
+        )
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self.sent: int = 0
+        self.failed: int = 0
+        self.retried: int = 0
+        self.total_throttle_seconds: float = 0.0
+
+    async def send(self, chat_id: int, text: str) -> None:
+        """Поставить ответ в очередь отправки (длинный ответ уйдет несколькими сообщениями)"""
+        chunks = split_message(text)
+
+        async def deliver() -> None:
+            await self._deliver(chat_id, chunks)
+
+        await self._sequencer.put(chat_id, deliver)
+
+    async def stop(self) -> None:
+        """Дождаться отправки всех принятых сообщений"""
+        await self._sequencer.join()
+        logger.info(f"Telegram sender stopped: {self.stats()}")
+
+    def stats(self) -> dict[str, float]:
+        """Метрики отправки: очередь, отправленные, ошибки, повторы после 429"""
+        return {
+            "pending": self._sequencer.stats()["pending"],
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "throttle_seconds": self.total_throttle_seconds,
+        }
+
+    async def _deliver(self, chat_id: int, chunks: list[str]) -> None:
+        for chunk in chunks:
+            try:
+                await self._send_chunk(chat_id, chunk)
+            except TelegramAPIError as e:
+                # Остальные части без первой бессмысленны
+                self.failed += 1
+                logger.error(f"Failed to send message to chat {chat_id}: {e}")
+                return
+
+    async def _send_chunk(self, chat_id: int, text: str) -> None:
+        for attempt in range(self.max_retries + 1):
+            await self._throttle(chat_id)
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retried += 1
+                logger.warning(f"Flood control for chat {chat_id}, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+                continue
+            self.sent += 1
+            return
+
+    async def _throttle(self, chat_id: int) -> None:
+        """Дождаться очереди в корзине чата, затем в общей корзине"""
+        for bucket in (self._chat_bucket(chat_id), self._global_bucket):
+            wait = bucket.wait_time()
+            bucket.consume()
+            if wait > 0:
+                self.total_throttle_seconds += wait
+                await asyncio.sleep(wait)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                self._prune_chat_buckets()
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, clock=self._clock)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_chat_buckets(self) -> None:
+        # Полная корзина ничем не отличается от новой
+        idle = [
+            chat_id
+            for chat_id, bucket in self._chat_buckets.items()
+            if bucket.wait_time(bucket.capacity) == 0
+        ]
+        for chat_id in idle:
+            del self._chat_buckets[chat_id]
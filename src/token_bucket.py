@@ -0,0 +1,46 @@
+import time
+from collections.abc import Callable
+
+
+class TokenBucket:
+    """
+    Token bucket: rate_per_second единиц в секунду, запас не больше capacity.
+
+    consume разрешает уход в минус (резервирование): следующие вызовы
+    получают большее wait_time, поэтому ожидающие обслуживаются по очереди.
+    Неиспользованный резерв возвращается через refund.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate_per_second: float = rate_per_second
+        self.capacity: float = capacity
+        self._clock = clock
+        self._tokens: float = capacity
+        self._updated_at: float = clock()
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Сколько секунд ждать, чтобы забрать amount единиц"""
+        self._refill()
+        deficit = min(amount, self.capacity) - self._tokens
+        return max(deficit, 0.0) / self.rate_per_second
+
+    def consume(self, amount: float = 1.0) -> None:
+        """Забрать amount единиц (запрос больше capacity считается как capacity)"""
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float = 1.0) -> None:
+        """Вернуть забранные consume единицы (запас не превышает capacity)"""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+        self._updated_at = now
@@ -0,0 +1,17 @@
+"""Оценка количества токенов без токенизатора модели"""
+
+import math
+
+# BPE-токенизаторы в среднем кодируют ~4 байта UTF-8 в токен: ~4 символа
+# английского текста или ~2 символа кириллицы
+BYTES_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Оценить количество токенов текста.
+
+    Та же формула используется в SQL миграции, заполняющей messages.token_count:
+    ceil(octet_length(content) / 4).
+    """
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
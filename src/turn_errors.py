@@ -0,0 +1,2 @@
+class TurnCancelledError(Exception):
+    """Ход диалога отменен (например, история очищена во время генерации ответа)"""
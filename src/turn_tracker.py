@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, nullcontext
+from typing import Any
+
+from .config import Config
+from .models import ConversationKey
+from .turn_errors import TurnCancelledError
+
+logger = logging.getLogger(__name__)
+
+
+class TurnTracker:
+    """
+    Дедлайн и отмена ходов диалога, которые сейчас в работе.
+
+    track(key) оборачивает ход целиком (start_turn, запрос к LLM, finish_turn)
+    в задаче обработчика. Ход дольше turn_deadline_seconds прерывается TimeoutError.
+    cancel(key) отменяет ходы диалога (например, при очистке истории): задача
+    получает CancelledError на ближайшем await, поэтому запрос к LLM закрывается,
+    слоты очередей и сессии БД освобождаются, а ответ не сохраняется. Внутри track
+    такая отмена превращается в TurnCancelledError. Внешняя отмена задачи
+    (клиент отключился) учитывается и пробрасывается как есть.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.deadline_seconds: float | None = config.turn_deadline_seconds or None
+        self._active: dict[ConversationKey, set[asyncio.Task[Any]]] = {}
+        self._cancel_requested: set[asyncio.Task[Any]] = set()
+        self._completed = 0
+        self._cancelled = 0
+        self._deadline_exceeded = 0
+
+    @asynccontextmanager
+    async def track(self, key: ConversationKey) -> AsyncIterator[None]:
+        """
+        Выполнить ход диалога с дедлайном и возможностью отмены по ключу.
+
+        Raises:
+            TurnCancelledError: Ход отменен через cancel(key)
+            TimeoutError: Истек turn_deadline_seconds
+        """
+        task = asyncio.current_task()
+        if task is None:
+            raise RuntimeError("TurnTracker.track must be used inside a task")
+
+        self._active.setdefault(key, set()).add(task)
+        try:
+            async with asyncio.timeout(self.deadline_seconds) as deadline:
+                yield
+        except TimeoutError:
+            if deadline.expired():
+                self._deadline_exceeded += 1
+                logger.warning(f"Turn for {key} exceeded {self.deadline_seconds}s deadline")
+            raise
+        except asyncio.CancelledError:
+            self._cancelled += 1
+            if task in self._cancel_requested:
+                task.uncancel()
+                raise TurnCancelledError(f"Turn for {key} was cancelled") from None
+            raise
+        else:
+            self._completed += 1
+        finally:
+            tasks = self._active.get(key)
+            if tasks is not None:
+                tasks.discard(task)
+                if not tasks:
+                    del self._active[key]
+            self._cancel_requested.discard(task)
+
+    def cancel(self, key: ConversationKey) -> int:
+        """Отменить ходы диалога в работе (кроме текущей задачи), вернуть их число"""
+        current = asyncio.current_task()
+        cancelled = 0
+        for task in self._active.get(key, ()):
+            if task is current or task in self._cancel_requested:
+                continue
+            self._cancel_requested.add(task)
+            task.cancel()
+            cancelled += 1
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} in-flight turn(s) for {key}")
+        return cancelled
+
+    def stats(self) -> dict[str, int]:
+        """Ходы в работе, завершенные, отмененные и прерванные по дедлайну"""
+        return {
+            "active": sum(len(tasks) for tasks in self._active.values()),
+            "completed": self._completed,
+            "cancelled": self._cancelled,
+            "deadline_exceeded": self._deadline_exceeded,
+        }
+
+
+def tracked_turn(
+    tracker: TurnTracker | None, key: ConversationKey
+) -> AbstractAsyncContextManager[None]:
+    """Контекст хода диалога: TurnTracker.track или пустой контекст без трекера"""
+    if tracker is None:
+        return nullcontext()
+    return tracker.track(key)
@@ -0,0 +1,61 @@
+"""Long polling сырых обновлений Telegram для BotSupervisor (без разбора в модели aiogram)."""
+
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import aiohttp
+
+from .config import Config
+from .handlers import router
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+POLL_TIMEOUT_SECONDS = 30
+RETRY_DELAY_SECONDS = 1.0
+
+# Передает обновление в обработку, дожидаясь места в очереди
+UpdateSink = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+async def poll_updates(config: Config, sink: UpdateSink, api_url: str = TELEGRAM_API_URL) -> None:
+    """
+    Получать обновления getUpdates и передавать их sink по порядку.
+
+    Процесс только читает JSON и распределяет обновления: разбор в модели
+    aiogram и обработка выполняются в процессах-обработчиках. offset
+    сдвигается после передачи обновления, поэтому переданные обновления не
+    запрашиваются повторно. Работает до отмены задачи.
+    """
+    url = f"{api_url}/bot{config.telegram_token}/getUpdates"
+    allowed_updates = json.dumps(router.resolve_used_update_types())
+    offset: int | None = None
+    timeout = aiohttp.ClientTimeout(total=POLL_TIMEOUT_SECONDS + 10)
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        while True:
+            params: dict[str, str | int] = {
+                "timeout": POLL_TIMEOUT_SECONDS,
+                "allowed_updates": allowed_updates,
+            }
+            if offset is not None:
+                params["offset"] = offset
+            try:
+                async with session.get(url, params=params) as response:
+                    payload = await response.json()
+            except (aiohttp.ClientError, TimeoutError, json.JSONDecodeError) as e:
+                logger.warning(f"getUpdates failed: {e}")
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+                continue
+
+            if not payload.get("ok"):
+                logger.error(f"getUpdates error: {payload.get('description')}")
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+                continue
+
+            for update in payload["result"]:
+                await sink(update)
+                offset = update["update_id"] + 1
@@ -0,0 +1,70 @@
+"""Маршрутизация сырых обновлений Telegram (dict из webhook) по чатам и процессам."""
+
+from typing import Any
+
+# Обновления, у которых чат лежит в объекте первого уровня (update[type]["chat"])
+_CHAT_UPDATE_TYPES = (
+    "message",
+    "edited_message",
+    "channel_post",
+    "edited_channel_post",
+    "business_message",
+    "edited_business_message",
+    "my_chat_member",
+    "chat_member",
+    "chat_join_request",
+    "message_reaction",
+)
+
+# Команды, которые должны прерывать текущий ход диалога, а не ждать его в очереди чата
+_PRIORITY_COMMANDS = frozenset({"/clear"})
+
+
+def update_chat_id(update: dict[str, Any]) -> int | None:
+    """
+    chat_id обновления: по нему сохраняется порядок обработки.
+
+    Для callback_query - чат исходного сообщения; для обновлений без чата
+    (inline-запросы и т.п.) - id пользователя. None, если нет ни того, ни другого.
+    """
+    for update_type in _CHAT_UPDATE_TYPES:
+        payload = update.get(update_type)
+        if isinstance(payload, dict) and isinstance(payload.get("chat"), dict):
+            chat_id = payload["chat"].get("id")
+            return chat_id if isinstance(chat_id, int) else None
+
+    callback = update.get("callback_query")
+    if isinstance(callback, dict) and isinstance(callback.get("message"), dict):
+        chat = callback["message"].get("chat")
+        if isinstance(chat, dict) and isinstance(chat.get("id"), int):
+            return int(chat["id"])
+
+    for payload in update.values():
+        if isinstance(payload, dict) and isinstance(payload.get("from"), dict):
+            user_id = payload["from"].get("id")
+            return user_id if isinstance(user_id, int) else None
+    return None
+
+
+def update_shard(update: dict[str, Any], workers: int) -> int:
+    """Номер процесса-обработчика: все обновления одного чата попадают в один процесс"""
+    chat_id = update_chat_id(update)
+    key = chat_id if chat_id is not None else update.get("update_id", 0)
+    return key % workers
+
+
+def is_priority_update(update: dict[str, Any]) -> bool:
+    """Команда, которая обрабатывается сразу, вне очереди чата (например, /clear)"""
+    message = update.get("message")
+    if not isinstance(message, dict):
+        return False
+    text = message.get("text")
+    return isinstance(text, str) and is_priority_command(text)
+
+
+def is_priority_command(text: str) -> bool:
+    """Текст сообщения - команда, прерывающая текущий ход диалога (/clear, /clear@bot)"""
+    if not text.startswith("/"):
+        return False
+    command = text.split(maxsplit=1)[0].split("@", 1)[0]
+    return command in _PRIORITY_COMMANDS
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .models import UserData
+
+
+@dataclass
+class _ProfileEntry:
+    fingerprint: int
+    expires_at: float
+
+
+class UserProfileCache:
+    """
+    In-process LRU/TTL кэш отпечатков профилей пользователей.
+
+    Хранит user_id -> hash(UserData) последнего сохраненного в БД профиля:
+    UPSERT пользователя нужен только при изменении профиля или по истечении
+    TTL (на случай, если строку в users изменил другой процесс).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries: int = max_entries
+        self.ttl_seconds: float = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[int, _ProfileEntry] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def is_saved(self, user_data: UserData) -> bool:
+        """Сохранен ли в БД именно этот профиль (и запись не устарела)"""
+        entry = self._entries.get(user_data.user_id)
+        if entry is not None and entry.expires_at <= self._clock():
+            del self._entries[user_data.user_id]
+            entry = None
+        if entry is None or entry.fingerprint != hash(user_data):
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        self._entries.move_to_end(user_data.user_id)
+        return True
+
+    def remember(self, user_data: UserData) -> None:
+        """Запомнить профиль, зафиксированный в БД"""
+        self._entries[user_data.user_id] = _ProfileEntry(
+            fingerprint=hash(user_data), expires_at=self._clock() + self.ttl_seconds
+        )
+        self._entries.move_to_end(user_data.user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        """Счетчики кэша для мониторинга"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
@@ -7,7 +7,7 @@ from sqlalchemy import func, select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .db_models import Message, User
+from .db_models import Conversation, User
 
 logger = logging.getLogger(__name__)
 
@@ -24,17 +24,21 @@ class UserRepository:
         username: str | None = None,
         first_name: str | None = None,
         last_name: str | None = None,
+        commit: bool = True,
     ) -> User:
         """
         Создать или обновить пользователя (UPSERT).
 
         При конфликте по user_id обновляет username, first_name, last_name, updated_at.
+        Строка пользователя возвращается тем же запросом (RETURNING), без
+        отдельного SELECT.
 
         Args:
             user_id: ID пользователя в Telegram
             username: Username пользователя (без @)
             first_name: Имя пользователя
             last_name: Фамилия пользователя
+            commit: Фиксировать транзакцию (False - оставить фиксацию вызывающему коду)
 
         Returns:
             Объект User из БД
@@ -59,15 +63,13 @@ class UserRepository:
             },
         )
 
-        await self.session.execute(stmt)
-        await self.session.commit()
-
-        # Получаем созданного/обновленного пользователя
-        result = await self.session.execute(select(User).where(User.user_id == user_id))
-        user = result.scalar_one()
-
-        # Обновляем объект из БД чтобы получить актуальные данные
-        await self.session.refresh(user)
+        # populate_existing: объект из identity map сессии получает значения из RETURNING
+        result = await self.session.scalars(
+            stmt.returning(User), execution_options={"populate_existing": True}
+        )
+        user = result.one()
+        if commit:
+            await self.session.commit()
 
         logger.info(f"Upserted user: user_id={user_id}, username={username}")
         return user
@@ -96,6 +98,8 @@ class UserRepository:
         """
         Получить количество сообщений пользователя.
 
+        Суммирует счетчики диалогов пользователя вместо сканирования messages.
+
         Args:
             user_id: ID пользователя в Telegram
 
@@ -103,9 +107,8 @@ class UserRepository:
             Количество не удаленных сообщений
         """
         result = await self.session.execute(
-            select(func.count(Message.id)).where(
-                Message.user_id == user_id,
-                Message.deleted_at.is_(None),
+            select(func.coalesce(func.sum(Conversation.message_count), 0)).where(
+                Conversation.user_id == user_id
             )
         )
         count = result.scalar() or 0
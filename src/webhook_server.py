@@ -0,0 +1,106 @@
+"""Прием обновлений Telegram через webhook (aiohttp сервер)."""
+
+import asyncio
+import hmac
+import json
+import logging
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from aiogram import Bot
+from aiohttp import web
+
+from .config import Config
+from .handlers import router
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Принимает обновление в обработку; False - очередь переполнена
+UpdateRoute = Callable[[dict[str, Any]], bool]
+
+# Метрики процесса для GET /metrics
+MetricsProvider = Callable[[], Mapping[str, Any]]
+
+
+def create_webhook_app(
+    config: Config, route: UpdateRoute, metrics: MetricsProvider | None = None
+) -> web.Application:
+    """
+    Создать aiohttp приложение webhook.
+
+    Запрос без верного секрета (заголовок X-Telegram-Bot-Api-Secret-Token)
+    отклоняется с 403. Обновление только ставится в очередь (route) и сразу
+    подтверждается 200; при переполненной очереди ответ 503 - Telegram
+    повторит доставку позже. С metrics доступен GET /metrics.
+    """
+    secret = config.telegram_webhook_secret.encode()
+
+    async def handle_update(request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_TOKEN_HEADER, "").encode()
+        if not hmac.compare_digest(token, secret):
+            logger.warning(f"Rejected webhook request with invalid secret from {request.remote}")
+            return web.Response(status=403)
+
+        try:
+            update = await request.json()
+        except json.JSONDecodeError:
+            return web.Response(status=400)
+        if not isinstance(update, dict):
+            return web.Response(status=400)
+
+        if not route(update):
+            logger.warning(f"Update queue is full, deferring update {update.get('update_id')}")
+            return web.Response(status=503)
+        return web.Response(status=200)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response({"status": "healthy"})
+
+    app = web.Application()
+    app.router.add_post(config.telegram_webhook_path, handle_update)
+    app.router.add_get("/health", health)
+    if metrics is not None:
+        provider = metrics
+
+        async def get_metrics(request: web.Request) -> web.Response:
+            return web.json_response(provider())
+
+        app.router.add_get("/metrics", get_metrics)
+    return app
+
+
+async def serve_webhook(
+    config: Config, route: UpdateRoute, metrics: MetricsProvider | None = None
+) -> None:
+    """
+    Запустить webhook сервер и зарегистрировать webhook в Telegram.
+
+    Работает до отмены задачи (остановка процесса).
+    """
+    runner = web.AppRunner(create_webhook_app(config, route, metrics))
+    await runner.setup()
+    site = web.TCPSite(runner, config.telegram_webhook_host, config.telegram_webhook_port)
+    await site.start()
+    logger.info(
+        f"Webhook server listening on {config.telegram_webhook_host}:"
+        f"{config.telegram_webhook_port}{config.telegram_webhook_path}"
+    )
+
+    bot = Bot(token=config.telegram_token)
+    try:
+        await bot.set_webhook(
+            url=config.telegram_webhook_url.rstrip("/") + config.telegram_webhook_path,
+            secret_token=config.telegram_webhook_secret,
+            max_connections=config.telegram_webhook_max_connections,
+            allowed_updates=router.resolve_used_update_types(),
+        )
+    finally:
+        await bot.session.close()
+    logger.info("Webhook registered in Telegram")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
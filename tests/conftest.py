@@ -67,6 +67,21 @@ class ConfigForTests(Config):
         return (init_settings,)
 
 
+class FakeClock:
+    """Управляемые часы для проверки TTL, интервалов и пополнения лимитов"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_config(**overrides: float) -> Config:
+    """Config с заданными лимитами"""
+    return Config(telegram_token="test", openrouter_api_key="test", **overrides)  # type: ignore[arg-type]
+
+
 # Убираем session-scoped event_loop fixture
 # pytest-asyncio с asyncio_mode = auto автоматически управляет event loop
 
@@ -135,6 +150,7 @@ async def clean_db_session(database: Database) -> AsyncGenerator[AsyncSession, N
     async for session in database.get_session():
         # Очистить таблицы перед тестом
         await session.execute(text("DELETE FROM messages"))
+        await session.execute(text("DELETE FROM conversations"))
         await session.execute(text("DELETE FROM users"))
         await session.commit()
 
@@ -142,6 +158,7 @@ async def clean_db_session(database: Database) -> AsyncGenerator[AsyncSession, N
 
         # Очистить таблицы после теста
         await session.execute(text("DELETE FROM messages"))
+        await session.execute(text("DELETE FROM conversations"))
         await session.execute(text("DELETE FROM users"))
         await session.commit()
 
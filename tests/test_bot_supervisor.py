@@ -0,0 +1,109 @@
+"""Тесты для BotSupervisor"""
+
+import asyncio
+
+import pytest
+
+import src.bot_supervisor
+from src.bot_supervisor import BotSupervisor
+from src.config import Config
+from tests.worker_stubs import crashing_worker, failing_worker, stuck_worker
+
+
+def make_update(update_id: int, chat_id: int) -> dict[str, object]:
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}, "text": "hi"}}
+
+
+def test_route_sends_chat_updates_to_one_worker_in_order() -> None:
+    """Обновления чата попадают в очередь одного процесса в порядке поступления"""
+    supervisor = BotSupervisor(
+        Config(telegram_token="test", openrouter_api_key="test", bot_workers=2)
+    )
+
+    for update_id in range(3):
+        assert supervisor.route(make_update(update_id, chat_id=4))
+    assert supervisor.route(make_update(3, chat_id=5))
+
+    assert [supervisor._queues[0].get(timeout=1)["update_id"] for _ in range(3)] == [0, 1, 2]
+    assert supervisor._queues[1].get(timeout=1)["update_id"] == 3
+    assert supervisor.stats() == {"routed.0": 3, "routed.1": 1, "rejected": 0, "restarts": 0}
+
+
+def test_route_rejects_when_worker_queue_is_full() -> None:
+    """Переполненная очередь процесса: обновление отклоняется (webhook ответит 503)"""
+    supervisor = BotSupervisor(
+        Config(
+            telegram_token="test",
+            openrouter_api_key="test",
+            bot_workers=1,
+            bot_worker_queue_size=1,
+        )
+    )
+
+    assert supervisor.route(make_update(1, chat_id=1))
+    assert not supervisor.route(make_update(2, chat_id=1))
+    assert supervisor.stats()["rejected"] == 1
+
+
+async def test_put_waits_for_space_in_full_worker_queue() -> None:
+    """put (long polling) ждет места в очереди процесса вместо отказа"""
+    supervisor = BotSupervisor(
+        Config(
+            telegram_token="test",
+            openrouter_api_key="test",
+            bot_workers=1,
+            bot_worker_queue_size=1,
+        )
+    )
+    await supervisor.put(make_update(1, chat_id=1))
+
+    pending = asyncio.create_task(supervisor.put(make_update(2, chat_id=1)))
+    await asyncio.sleep(0.05)
+    assert not pending.done()
+
+    assert supervisor._queues[0].get(timeout=1)["update_id"] == 1
+    await asyncio.wait_for(pending, timeout=5)
+    assert supervisor._queues[0].get(timeout=1)["update_id"] == 2
+    assert supervisor.stats() == {"routed.0": 2, "rejected": 0, "restarts": 0}
+
+
+def make_supervisor(worker: src.bot_supervisor.WorkerTarget) -> BotSupervisor:
+    config = Config(
+        telegram_token="test", openrouter_api_key="test", bot_workers=1, bot_worker_queue_size=1
+    )
+    return BotSupervisor(config, worker=worker)
+
+
+async def test_start_fails_when_worker_does_not_start() -> None:
+    """Процесс сообщил об ошибке запуска: start возвращает False"""
+    supervisor = make_supervisor(failing_worker)
+
+    assert await supervisor.start() is False
+
+
+async def test_dead_worker_is_restarted() -> None:
+    """Упавший процесс перезапускается при следующем обновлении его чата"""
+    supervisor = make_supervisor(crashing_worker)
+    assert await supervisor.start()
+
+    assert supervisor.route(make_update(1, chat_id=1))
+    crashed = supervisor._processes[0]
+    await asyncio.to_thread(crashed.join, 10)
+    assert not crashed.is_alive()
+
+    assert supervisor.route(make_update(2, chat_id=1))
+    assert supervisor._processes[0] is not crashed
+    assert supervisor.stats()["restarts"] == 1
+    await supervisor.stop()
+
+
+async def test_stop_does_not_block_on_full_queue(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Очередь зависшего процесса полна: stop не блокируется и завершает процесс"""
+    monkeypatch.setattr(src.bot_supervisor, "WORKER_STOP_TIMEOUT_SECONDS", 0.2)
+    supervisor = make_supervisor(stuck_worker)
+    assert await supervisor.start()
+    assert supervisor.route(make_update(1, chat_id=1))
+
+    await asyncio.wait_for(supervisor.stop(), timeout=10)
+
+    assert not supervisor._processes[0].is_alive()
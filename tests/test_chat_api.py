@@ -1,5 +1,6 @@
+import asyncio
 from collections.abc import AsyncGenerator
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 from httpx import ASGITransport, AsyncClient
@@ -20,6 +21,7 @@ async def async_client(
     from src.conversation import ConversationManager  # noqa: PLC0415
     from src.database import Database  # noqa: PLC0415
     from src.llm_client import LLMClient  # noqa: PLC0415
+    from src.turn_tracker import TurnTracker  # noqa: PLC0415
 
     # Create fresh database instance for testing with testcontainer
     database = Database(test_database_url)
@@ -36,15 +38,18 @@ async def async_client(
         openrouter_api_key="test_api_key",
     )
     llm_client = LLMClient(config)
+    turn_tracker = TurnTracker(config)
     conversation_manager = ConversationManager(
         session_factory=database.get_session,
         max_history_messages=20,
+        turn_tracker=turn_tracker,
     )
 
     chat_handler = WebChatHandler(
         llm_client=llm_client,
         conversation_manager=conversation_manager,
         system_prompt="Test system prompt",
+        turn_tracker=turn_tracker,
     )
 
     text2sql_handler = Text2SQLHandler(
@@ -91,6 +96,148 @@ async def test_chat_message_success(async_client: AsyncClient) -> None:
         assert isinstance(data["message_id"], int)
 
 
+@pytest.mark.asyncio
+async def test_chat_stream_success(async_client: AsyncClient) -> None:
+    """SSE endpoint отдает фрагменты ответа и сохраняет итоговое сообщение."""
+
+    async def fake_stream(
+        self: object, messages: object, user_id: object = None, on_usage: object = None
+    ) -> AsyncGenerator[str, None]:
+        for delta in ["Стрим", "овый ответ"]:
+            yield delta
+
+    with patch("src.llm_client.LLMClient.stream_response", new=fake_stream):
+        payload = {"user_id": "test-stream-user", "message": "Hello!"}
+        response = await async_client.post("/api/v1/chat/stream", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert 'data: {"delta": "Стрим"}\n\n' in response.text
+    assert response.text.endswith("event: done\ndata: {}\n\n")
+
+    history = await async_client.get("/api/v1/chat/history/test-stream-user")
+    assert history.json()["messages"][-1]["content"] == "Стримовый ответ"
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_llm_error(async_client: AsyncClient) -> None:
+    """Ошибка LLM посреди потока передается событием error."""
+
+    async def failing_stream(
+        self: object, messages: object, user_id: object = None, on_usage: object = None
+    ) -> AsyncGenerator[str, None]:
+        yield "partial"
+        raise RuntimeError("LLM API error")
+
+    with patch("src.llm_client.LLMClient.stream_response", new=failing_stream):
+        payload = {"user_id": "test-stream-error", "message": "Hello!"}
+        response = await async_client.post("/api/v1/chat/stream", json=payload)
+
+    assert response.status_code == 200
+    assert "event: error" in response.text
+    assert "event: done" not in response.text
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_cancelled_by_clear(async_client: AsyncClient) -> None:
+    """Очистка истории посреди потока: событие error, частичный ответ не сохраняется."""
+    streaming = asyncio.Event()
+
+    async def endless_stream(
+        self: object, messages: object, user_id: object = None, on_usage: object = None
+    ) -> AsyncGenerator[str, None]:
+        yield "partial"
+        streaming.set()
+        await asyncio.sleep(10)
+        yield "late"
+
+    with patch("src.llm_client.LLMClient.stream_response", new=endless_stream):
+        payload = {"user_id": "test-stream-clear", "message": "Hello!"}
+        request = asyncio.create_task(async_client.post("/api/v1/chat/stream", json=payload))
+        await asyncio.wait_for(streaming.wait(), timeout=5)
+        await async_client.delete("/api/v1/chat/history/test-stream-clear")
+        response = await asyncio.wait_for(request, timeout=5)
+
+    assert "event: error" in response.text
+    assert "Chat history was cleared" in response.text
+    assert "event: done" not in response.text
+
+    history = await async_client.get("/api/v1/chat/history/test-stream-clear")
+    assert history.json()["messages"] == []
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(async_client: AsyncClient) -> None:
+    """Метрики LLM и очереди запросов доступны через API."""
+    response = await async_client.get("/api/v1/metrics")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert "llm" in data
+    assert data["turns"]["active"] == 0
+    assert data["llm_rate_limiter"]["rejected"] == 0
+    assert "queue_depth" in data["llm_rate_limiter"]
+
+
+@pytest.mark.asyncio
+async def test_chat_unavailable_when_circuits_open(async_client: AsyncClient) -> None:
+    """Разомкнутые цепи LLM: 503 без обращения к LLM, health показывает degraded."""
+    import src.api.app as app_module  # noqa: PLC0415
+
+    assert app_module.chat_handler is not None
+    breaker = app_module.chat_handler.llm_client.breaker
+    model = app_module.chat_handler.llm_client.routes[0].name
+    assert breaker is not None
+    for _ in range(breaker.min_requests):
+        assert breaker.allow(model)
+        breaker.record(model, "timeout")
+
+    with patch("src.llm_client.LLMClient.get_response", new_callable=AsyncMock) as mock_llm:
+        payload = {"user_id": "test-unavailable", "message": "Hello!"}
+        response = await async_client.post("/api/v1/chat/message", json=payload)
+        stream = await async_client.post("/api/v1/chat/stream", json=payload)
+
+    assert response.status_code == 503
+    mock_llm.assert_not_called()
+    assert "event: error" in stream.text
+    assert "temporarily unavailable" in stream.text
+
+    health = (await async_client.get("/health")).json()
+    assert health["status"] == "degraded"
+    assert "open" in health["llm_circuits"].values()
+    metrics = (await async_client.get("/api/v1/metrics")).json()
+    assert metrics["llm_circuit_breaker"]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_chat_request() -> None:
+    """Отключение клиента отменяет обработку обычного (не потокового) запроса."""
+    from fastapi import HTTPException  # noqa: PLC0415
+
+    import src.api.app as app_module  # noqa: PLC0415
+
+    cancelled = False
+
+    async def slow_handler() -> str:
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        return "late answer"
+
+    http_request = Mock()
+    http_request.is_disconnected = AsyncMock(return_value=True)
+
+    with patch.object(app_module, "DISCONNECT_POLL_SECONDS", 0.01):
+        with pytest.raises(HTTPException) as error:
+            await app_module._cancel_on_disconnect(http_request, slow_handler())
+
+    assert error.value.status_code == 499
+    assert cancelled
+
+
 @pytest.mark.asyncio
 async def test_chat_message_empty_message(async_client: AsyncClient) -> None:
     """Test chat message with empty message (validation error)."""
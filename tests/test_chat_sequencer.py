@@ -0,0 +1,86 @@
+"""Тесты для ChatSequencer"""
+
+import asyncio
+
+import pytest
+
+from src.chat_sequencer import ChatSequencer, Job
+
+
+def job(log: list[str], name: str, delay: float = 0.0) -> Job:
+    """Задача, которая записывает начало и конец своей обработки"""
+
+    async def run() -> None:
+        log.append(f"start {name}")
+        await asyncio.sleep(delay)
+        log.append(f"end {name}")
+
+    return run
+
+
+@pytest.mark.asyncio
+async def test_same_chat_is_sequential_other_chats_parallel() -> None:
+    """Задачи одного чата идут по очереди, другой чат не ждет их"""
+    sequencer = ChatSequencer()
+    log: list[str] = []
+
+    assert sequencer.put_nowait(1, job(log, "1a", delay=0.02))
+    assert sequencer.put_nowait(1, job(log, "1b"))
+    assert sequencer.put_nowait(2, job(log, "2a"))
+    await sequencer.join()
+
+    assert log.index("end 1a") < log.index("start 1b")
+    assert log.index("end 2a") < log.index("end 1a")
+    assert sequencer.stats() == {
+        "pending": 0,
+        "active_chats": 0,
+        "processed": 3,
+        "failed": 0,
+        "rejected": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_unkeyed_job_skips_chat_queue() -> None:
+    """Задача без ключа (например, /clear) не ждет очереди чата"""
+    sequencer = ChatSequencer()
+    log: list[str] = []
+
+    sequencer.put_nowait(1, job(log, "long", delay=0.05))
+    sequencer.put_nowait(None, job(log, "clear"))
+    await sequencer.join()
+
+    assert log.index("end clear") < log.index("end long")
+
+
+@pytest.mark.asyncio
+async def test_failed_job_does_not_block_chat() -> None:
+    """Ошибка обработки учитывается, следующие задачи чата выполняются"""
+    sequencer = ChatSequencer()
+    log: list[str] = []
+
+    async def failing() -> None:
+        raise RuntimeError("handler failed")
+
+    sequencer.put_nowait(1, failing)
+    sequencer.put_nowait(1, job(log, "next"))
+    await sequencer.join()
+
+    assert log == ["start next", "end next"]
+    assert sequencer.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_backpressure() -> None:
+    """Сверх max_pending put_nowait отказывает, put ждет освобождения места"""
+    sequencer = ChatSequencer(max_pending=1)
+    log: list[str] = []
+
+    assert sequencer.put_nowait(1, job(log, "first", delay=0.01))
+    assert not sequencer.put_nowait(2, job(log, "rejected"))
+    await sequencer.put(2, job(log, "second"))
+    await sequencer.join()
+
+    assert "start rejected" not in log
+    assert log.index("end first") < log.index("start second")
+    assert sequencer.stats()["rejected"] == 1
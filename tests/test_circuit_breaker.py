@@ -0,0 +1,87 @@
+"""Тесты для CircuitBreaker"""
+
+from src.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.config import Config
+from tests.conftest import FakeClock
+
+
+def make_breaker(clock: FakeClock) -> CircuitBreaker:
+    """Breaker: окно 4 попытки, минимум 4, порог 50%, размыкание на 10 секунд"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        llm_breaker_window_size=4,
+        llm_breaker_min_requests=4,
+        llm_breaker_failure_rate=0.5,
+        llm_breaker_open_seconds=10.0,
+    )
+    return CircuitBreaker(config, clock=clock)
+
+
+def record(breaker: CircuitBreaker, model: str, outcome: str) -> None:
+    assert breaker.allow(model)
+    breaker.record(model, outcome)
+
+
+def test_opens_on_failure_rate() -> None:
+    """Цепь размыкается, когда доля отказов в окне достигает порога"""
+    breaker = make_breaker(FakeClock())
+
+    record(breaker, "m", "success")
+    record(breaker, "m", "timeout")
+    record(breaker, "m", "success")
+    assert breaker.state("m") == CLOSED
+
+    record(breaker, "m", "server_error")
+
+    assert breaker.state("m") == OPEN
+    assert not breaker.allow("m")
+    assert not breaker.is_available("m")
+    assert breaker.stats()["opened.m"] == 1
+    assert breaker.stats()["rejected.m"] == 1
+
+
+def test_client_errors_do_not_open() -> None:
+    """Ошибки запроса (4xx) и отмененные попытки не считаются отказами upstream"""
+    breaker = make_breaker(FakeClock())
+
+    for _ in range(4):
+        record(breaker, "m", "client_error")
+        assert breaker.allow("m")
+        breaker.record("m", None)
+
+    assert breaker.state("m") == CLOSED
+    assert breaker.stats()["failure_rate.m"] == 0.0
+
+
+def test_half_open_probe_closes_or_reopens() -> None:
+    """После паузы пропускается одна пробная попытка; ее исход решает состояние"""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        record(breaker, "m", "timeout")
+    assert breaker.state("m") == OPEN
+
+    clock.now = 10.0
+    assert breaker.state("m") == HALF_OPEN
+    assert breaker.allow("m")
+    assert not breaker.allow("m")
+    breaker.record("m", "connection_error")
+    assert breaker.state("m") == OPEN
+
+    clock.now = 20.0
+    assert breaker.allow("m")
+    breaker.record("m", "success")
+    assert breaker.state("m") == CLOSED
+    assert breaker.stats()["opened.m"] == 2
+
+
+def test_models_are_independent() -> None:
+    """Размыкание цепи одной модели не влияет на другие"""
+    breaker = make_breaker(FakeClock())
+    for _ in range(4):
+        record(breaker, "primary", "server_error")
+
+    assert breaker.states() == {"primary": OPEN}
+    assert breaker.allow("backup")
+    assert breaker.states() == {"backup": CLOSED, "primary": OPEN}
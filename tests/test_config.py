@@ -2,6 +2,9 @@
 
 from pathlib import Path
 
+import pytest
+from pydantic import ValidationError
+
 from src.config import Config, load_system_prompt, load_system_prompt_with_fallback
 from tests.conftest import ConfigForTests
 
@@ -84,3 +87,32 @@ def test_config_system_prompt_file_default() -> None:
     """Тест дефолтного значения system_prompt_file в конфиге."""
     config = Config(telegram_token="test_token", openrouter_api_key="test_key")
     assert config.system_prompt_file == "prompts/system.txt"
+
+
+def test_config_history_cache_disabled_by_default() -> None:
+    """Кэш истории выключен по умолчанию"""
+    config = ConfigForTests(telegram_token="test", openrouter_api_key="test")
+
+    assert config.history_cache_enabled is False
+    assert config.history_cache_max_entries > 0
+    assert config.history_cache_max_bytes > 0
+
+
+def test_config_webhook_requires_url_and_secret() -> None:
+    """Режим webhook без адреса или секрета - ошибка конфигурации"""
+    with pytest.raises(ValidationError, match="TELEGRAM_WEBHOOK_SECRET"):
+        ConfigForTests(
+            telegram_token="test",
+            openrouter_api_key="test",
+            telegram_delivery_mode="webhook",
+            telegram_webhook_url="https://bot.example.com",
+        )
+
+    config = ConfigForTests(
+        telegram_token="test",
+        openrouter_api_key="test",
+        telegram_delivery_mode="webhook",
+        telegram_webhook_url="https://bot.example.com",
+        telegram_webhook_secret="secret",
+    )
+    assert config.telegram_delivery_mode == "webhook"
@@ -1,9 +1,13 @@
 """Тесты для ConversationManager"""
 
+from collections.abc import AsyncGenerator, Callable
+
 import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.conversation import ConversationManager
-from src.models import ChatMessage, ConversationKey
+from src.models import ChatMessage, ConversationKey, UserData
+from src.user_repository import UserRepository
 
 
 @pytest.mark.asyncio
@@ -96,3 +100,74 @@ async def test_multiple_conversations(conversation_manager: ConversationManager)
     assert len(user2_messages) == 1
     assert user1_messages[0].content == "user1"
     assert user2_messages[0].content == "user2"
+
+
+@pytest.mark.asyncio
+async def test_start_turn_uses_single_session(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Подготовка хода диалога выполняется в одной сессии"""
+    sessions_opened = 0
+
+    async def counting_session_factory() -> AsyncGenerator[AsyncSession, None]:
+        nonlocal sessions_opened
+        sessions_opened += 1
+        async for session in session_factory():
+            yield session
+
+    manager = ConversationManager(session_factory=counting_session_factory, max_history_messages=3)
+    key = ConversationKey(chat_id=7, user_id=7)
+    user_data = UserData(user_id=7, username="turn_user", first_name="Turn", last_name=None)
+    # Регистрация версии prompt - разовая операция процесса в своей транзакции
+    await manager.system_prompts.resolve_id("system")
+    sessions_opened = 0
+
+    turn = await manager.start_turn(
+        key, ChatMessage(role="user", content="hello"), "system", user_data=user_data
+    )
+
+    assert sessions_opened == 1
+    assert turn.key == key
+    assert [m.role for m in turn.history] == ["system", "user"]
+    assert turn.history[1].content == "hello"
+
+    async for session in session_factory():
+        user = await UserRepository(session).get_user_by_id(7)
+        assert user is not None
+        assert user.username == "turn_user"
+
+
+@pytest.mark.asyncio
+async def test_finish_turn_saves_assistant_message(
+    conversation_manager: ConversationManager,
+) -> None:
+    """Ответ ассистента сохраняется после завершения хода"""
+    key = ConversationKey(chat_id=8, user_id=8)
+
+    turn = await conversation_manager.start_turn(
+        key, ChatMessage(role="user", content="question"), "system"
+    )
+    await conversation_manager.finish_turn(turn, ChatMessage(role="assistant", content="answer"))
+
+    history = await conversation_manager.get_history(key, "system")
+    assert [m.content for m in history] == ["system", "question", "answer"]
+
+
+@pytest.mark.asyncio
+async def test_history_window_respects_token_budget(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Длинное старое сообщение не попадает в окно, если не укладывается в бюджет"""
+    manager = ConversationManager(
+        session_factory=session_factory, max_history_messages=10, history_token_budget=50
+    )
+    key = ConversationKey(chat_id=9, user_id=9)
+
+    await manager.add_message(key, ChatMessage(role="user", content="x" * 400))
+    await manager.add_message(key, ChatMessage(role="assistant", content="short answer"))
+    await manager.add_message(key, ChatMessage(role="user", content="short question"))
+
+    history = await manager.get_history(key, "system")
+
+    assert [m.content for m in history] == ["system", "short answer", "short question"]
+    assert all(m.token_count for m in history[1:])
@@ -0,0 +1,70 @@
+"""Тесты для ConversationRepository и счетчиков диалога"""
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conversation import ConversationManager
+from src.conversation_repository import ConversationRepository
+from src.db_models import Message
+from src.models import ChatMessage, ConversationKey
+from src.repository import MessageRepository
+
+
+@pytest.mark.asyncio
+async def test_add_message_updates_counters(db_session: AsyncSession) -> None:
+    """add_message обновляет счетчики диалога в той же транзакции"""
+    key = ConversationKey(chat_id=616161, user_id=616161)
+    message_repo = MessageRepository(db_session)
+
+    await message_repo.add_message(key, ChatMessage(role="user", content="sys"))
+    await message_repo.add_message(key, ChatMessage(role="user", content="hello"))
+    last = await message_repo.add_message(key, ChatMessage(role="assistant", content="hi!"))
+
+    conversation = await ConversationRepository(db_session).get_conversation(key)
+
+    assert conversation is not None
+    assert conversation.message_count == 3  # noqa: PLR2004
+    assert conversation.total_content_length == len("sys") + len("hello") + len("hi!")
+    assert conversation.last_message_at == last.created_at
+
+
+@pytest.mark.asyncio
+async def test_clear_history_resets_counters(
+    conversation_manager: ConversationManager, db_session: AsyncSession
+) -> None:
+    """После /clear счетчики считают только новые сообщения"""
+    key = ConversationKey(chat_id=626262, user_id=626262)
+    await conversation_manager.get_history(key, "system")
+    await conversation_manager.add_message(key, ChatMessage(role="user", content="old"))
+
+    await conversation_manager.clear_history(key)
+    await conversation_manager.add_message(key, ChatMessage(role="user", content="new"))
+
+    conversation = await ConversationRepository(db_session).get_conversation(key)
+
+    assert conversation is not None
+    assert conversation.message_count == 1
+    assert conversation.total_content_length == len("new")
+    assert conversation.system_prompt_id is None
+
+
+@pytest.mark.asyncio
+async def test_backfill_matches_seeded_messages(db_session: AsyncSession) -> None:
+    """Миграция заполнила счетчики для диалогов из seed-данных"""
+    key = ConversationKey(chat_id=1001, user_id=101)
+    result = await db_session.execute(
+        select(func.count(Message.id), func.sum(Message.content_length)).where(
+            Message.chat_id == key.chat_id,
+            Message.user_id == key.user_id,
+            Message.deleted_at.is_(None),
+        )
+    )
+    expected_count, expected_length = result.one()
+
+    conversation = await ConversationRepository(db_session).get_conversation(key)
+
+    assert expected_count > 0
+    assert conversation is not None
+    assert conversation.message_count == expected_count
+    assert conversation.total_content_length == expected_length
@@ -0,0 +1,157 @@
+"""Тесты для FairScheduler"""
+
+import asyncio
+
+import pytest
+
+from src.fair_scheduler import FairScheduler
+from src.llm_errors import LLMOverloadedError
+from tests.conftest import make_config
+
+
+async def fake_llm(scheduler: FairScheduler, user_id: int, order: list[int]) -> None:
+    """Фейковый запрос к LLM: занимает слот пользователя на короткое время"""
+    async with scheduler.slot(user_id, cost=100):
+        order.append(user_id)
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_light_user_not_starved_by_heavy_burst() -> None:
+    """Запрос легкого пользователя обслуживается раньше хвоста очереди тяжелого"""
+    scheduler = FairScheduler(
+        make_config(llm_max_concurrent_requests=1, llm_per_user_max_in_flight=8)
+    )
+    order: list[int] = []
+
+    heavy = [asyncio.create_task(fake_llm(scheduler, 1, order)) for _ in range(5)]
+    await asyncio.sleep(0)
+    light = asyncio.create_task(fake_llm(scheduler, 2, order))
+    await asyncio.gather(*heavy, light)
+
+    assert order.index(2) <= 2
+    assert scheduler.user_stats(2)["max_wait_ms"] < scheduler.user_stats(1)["max_wait_ms"]
+
+
+@pytest.mark.asyncio
+async def test_weight_gives_larger_share() -> None:
+    """Пользователь с большим весом получает больше слотов при конкуренции"""
+    scheduler = FairScheduler(
+        make_config(llm_max_concurrent_requests=1, llm_per_user_max_in_flight=8)
+    )
+    order: list[int] = []
+
+    async def request(user_id: int, weight: float) -> None:
+        async with scheduler.slot(user_id, cost=100, weight=weight):
+            order.append(user_id)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(request(1, 1.0) for _ in range(4)), *(request(2, 3.0) for _ in range(4)))
+
+    assert order[:4].count(2) == 3
+
+
+@pytest.mark.asyncio
+async def test_per_user_in_flight_cap() -> None:
+    """У пользователя не больше llm_per_user_max_in_flight запросов в работе"""
+    scheduler = FairScheduler(
+        make_config(llm_max_concurrent_requests=0, llm_per_user_max_in_flight=2)
+    )
+    max_seen = 0.0
+
+    async def request() -> None:
+        nonlocal max_seen
+        async with scheduler.slot(1, cost=10):
+            max_seen = max(max_seen, scheduler.user_stats(1)["in_flight"])
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(request() for _ in range(6)))
+
+    assert max_seen == 2
+    assert scheduler.stats()["in_flight"] == 0
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_capped_user_does_not_block_others() -> None:
+    """Пока тяжелый пользователь упирается в свой лимит, свободный слот получает другой"""
+    scheduler = FairScheduler(
+        make_config(llm_max_concurrent_requests=4, llm_per_user_max_in_flight=1)
+    )
+    release = asyncio.Event()
+
+    async def hold(user_id: int) -> None:
+        async with scheduler.slot(user_id, cost=10):
+            await release.wait()
+
+    heavy = [asyncio.create_task(hold(1)) for _ in range(3)]
+    await asyncio.sleep(0)
+    async with scheduler.slot(2, cost=10):
+        assert scheduler.stats()["in_flight"] == 2
+        assert scheduler.stats()["queue_depth"] == 2
+
+    release.set()
+    await asyncio.gather(*heavy)
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_rejects_and_frees_queue() -> None:
+    """Не дождавшийся очереди запрос получает LLMOverloadedError и покидает очередь"""
+    scheduler = FairScheduler(
+        make_config(llm_max_concurrent_requests=1, llm_queue_timeout_seconds=0.01)
+    )
+
+    async with scheduler.slot(1, cost=10):
+        with pytest.raises(LLMOverloadedError):
+            async with scheduler.slot(2, cost=10):
+                pass
+        assert scheduler.stats()["queue_depth"] == 0
+
+    async with scheduler.slot(2, cost=10):
+        assert scheduler.stats()["in_flight"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stats_report_per_user_wait() -> None:
+    """Метрики содержат время ожидания по каждому пользователю"""
+    scheduler = FairScheduler(make_config(llm_max_concurrent_requests=1))
+    order: list[int] = []
+
+    await asyncio.gather(fake_llm(scheduler, 1, order), fake_llm(scheduler, 2, order))
+
+    stats = scheduler.stats()
+    assert stats["tracked_users"] == 2
+    assert stats["max_wait_ms.1"] == pytest.approx(0.0, abs=5.0)
+    assert stats["max_wait_ms.2"] > 0
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_do_not_delay_user() -> None:
+    """Запросы, не дождавшиеся очереди, не отодвигают следующий запрос пользователя"""
+    scheduler = FairScheduler(
+        make_config(llm_max_concurrent_requests=1, llm_queue_timeout_seconds=0.05)
+    )
+    order: list[int] = []
+
+    async with scheduler.slot(1, cost=10):
+        for _ in range(3):
+            with pytest.raises(LLMOverloadedError):
+                async with scheduler.slot(2, cost=1000):
+                    pass
+        requests = [asyncio.create_task(fake_llm(scheduler, user_id, order)) for user_id in (2, 3)]
+        await asyncio.sleep(0)
+
+    await asyncio.gather(*requests)
+    assert order == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_idle_users_forgotten() -> None:
+    """Теги пользователей без запросов не копятся после опустевшей очереди"""
+    scheduler = FairScheduler(make_config(llm_max_concurrent_requests=1))
+    order: list[int] = []
+
+    await asyncio.gather(*(fake_llm(scheduler, user_id, order) for user_id in range(10)))
+
+    assert scheduler._last_finish == {}
+    assert scheduler.stats()["queue_depth"] == 0
@@ -0,0 +1,128 @@
+"""Тесты для фейкового LLM сервера (через настоящий LLMClient)"""
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from src.config import Config
+from src.fake_llm.app import create_app
+from src.fake_llm.behavior import FakeLLMBehavior
+from src.fake_llm.config import FakeLLMConfig
+from src.llm_client import LLMClient
+from src.models import ChatMessage, LLMUsage
+
+FAKE_BASE_URL = "http://fake-llm/v1"
+
+
+def make_fake_config(**overrides: object) -> FakeLLMConfig:
+    """Быстрая детерминированная конфигурация фейковой LLM"""
+    defaults: dict[str, object] = {
+        "latency_distribution": "fixed",
+        "latency_ms": 0.0,
+        "tokens_per_second": 0.0,
+        "seed": 1,
+    }
+    return FakeLLMConfig(**{**defaults, **overrides})  # type: ignore[arg-type]
+
+
+def make_client(fake_config: FakeLLMConfig, **overrides: object) -> LLMClient:
+    """LLMClient, направленный на фейковый сервер (ASGI transport, без сети)"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        openrouter_base_url=FAKE_BASE_URL,
+        llm_retry_base_delay_seconds=0.0,
+        **overrides,  # type: ignore[arg-type]
+    )
+    client = LLMClient(config)
+    client.client = AsyncOpenAI(
+        api_key="test",
+        base_url=FAKE_BASE_URL,
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(fake_config))),
+    )
+    client._clients[FAKE_BASE_URL] = client.client
+    return client
+
+
+@pytest.mark.asyncio
+async def test_echo_response_with_usage() -> None:
+    """Обычный запрос: эхо последнего сообщения пользователя и usage"""
+    client = make_client(make_fake_config())
+    usage: list[LLMUsage] = []
+
+    answer = await client.get_response(
+        [ChatMessage(role="system", content="sys"), ChatMessage(role="user", content="Привет")],
+        on_usage=usage.append,
+    )
+
+    assert answer == "Echo: Привет"
+    assert usage[0].prompt_tokens is not None and usage[0].prompt_tokens > 0
+    assert usage[0].completion_tokens is not None and usage[0].completion_tokens > 0
+
+
+@pytest.mark.asyncio
+async def test_streaming_canned_response() -> None:
+    """Потоковый запрос: ответ приходит по словам, usage - последним чанком"""
+    client = make_client(make_fake_config(response_mode="canned", canned_response="один два три"))
+    usage: list[LLMUsage] = []
+
+    deltas = [
+        d
+        async for d in client.stream_response(
+            [ChatMessage(role="user", content="hi")], on_usage=usage.append
+        )
+    ]
+
+    assert deltas == ["один ", "два ", "три"]
+    assert len(usage) == 1
+    assert usage[0].completion_tokens is not None and usage[0].completion_tokens > 0
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_are_retried() -> None:
+    """Внедренные 5xx/429 ошибки проходят через повторы LLMClient"""
+    client = make_client(make_fake_config(error_rate=1.0, error_statuses="503"), llm_max_retries=1)
+
+    with pytest.raises(Exception, match="503"):
+        await client.get_response([ChatMessage(role="user", content="hi")])
+
+    assert client.metrics.stats()[f"attempts.{client.routes[0].name}.server_error"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_error_has_retry_after() -> None:
+    """429 возвращается с заголовком Retry-After в формате OpenAI"""
+    app = create_app(make_fake_config(error_rate=1.0, error_statuses="429"))
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://fake-llm"
+    ) as http:
+        response = await http.post(
+            "/v1/chat/completions",
+            json={"model": "m", "messages": [{"role": "user", "content": "hi"}]},
+        )
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert response.json()["error"]["type"] == "rate_limit_exceeded"
+
+
+def test_latency_distributions() -> None:
+    """Задержка до первого токена соответствует выбранному распределению"""
+    fixed = FakeLLMBehavior(make_fake_config(latency_ms=200.0))
+    assert fixed.first_token_delay() == 0.2
+
+    uniform = FakeLLMBehavior(
+        make_fake_config(latency_distribution="uniform", latency_ms=200.0, latency_spread=0.5)
+    )
+    assert all(0.1 <= uniform.first_token_delay() <= 0.3 for _ in range(100))
+
+    lognormal = FakeLLMBehavior(
+        make_fake_config(latency_distribution="lognormal", latency_ms=200.0, latency_spread=0.5)
+    )
+    samples = sorted(lognormal.first_token_delay() for _ in range(1001))
+    assert 0.15 < samples[500] < 0.25
+    assert samples[-1] > 0.4
+
+    rate = FakeLLMBehavior(make_fake_config(tokens_per_second=50.0))
+    assert rate.generation_delay(100) == 2.0
@@ -0,0 +1,105 @@
+"""Тесты для HandlerConcurrencyLimiter"""
+
+import asyncio
+from typing import Any
+from unittest.mock import AsyncMock, Mock
+
+from aiogram.types import Message
+
+from src.config import Config
+from src.handler_limiter import BUSY_TEXT, HandlerConcurrencyLimiter
+
+
+def make_limiter(max_concurrent: int = 1, queue_size: int = 1) -> HandlerConcurrencyLimiter:
+    return HandlerConcurrencyLimiter(
+        Config(
+            telegram_token="test",
+            openrouter_api_key="test",
+            bot_max_concurrent_handlers=max_concurrent,
+            bot_handler_queue_size=queue_size,
+        )
+    )
+
+
+def make_message(text: str = "hello") -> Mock:
+    message = Mock(spec=Message)
+    message.text = text
+    message.chat = Mock()
+    message.chat.id = 1
+    message.answer = AsyncMock()
+    return message
+
+
+async def test_sheds_messages_beyond_in_flight_cap_and_queue() -> None:
+    """Сверх лимита обработки и очереди сообщение сразу получает BUSY_TEXT"""
+    limiter = make_limiter(max_concurrent=1, queue_size=1)
+    release = asyncio.Event()
+    handled: list[str] = []
+
+    async def handler(event: Any, data: dict[str, Any]) -> None:
+        await release.wait()
+        handled.append(event.text)
+
+    first = asyncio.create_task(limiter(handler, make_message("first"), {}))
+    second = asyncio.create_task(limiter(handler, make_message("second"), {}))
+    await asyncio.sleep(0)
+    assert limiter.stats()["in_flight"] == 1
+    assert limiter.stats()["queued"] == 1
+
+    shed = make_message("third")
+    await limiter(handler, shed, {})
+    shed.answer.assert_called_once_with(BUSY_TEXT)
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert handled == ["first", "second"]
+    assert limiter.stats() == {
+        "in_flight": 0,
+        "queued": 0,
+        "max_queued": 1,
+        "admitted": 2,
+        "shed": 1,
+    }
+
+
+async def test_clear_bypasses_full_limiter() -> None:
+    """/clear обрабатывается даже при перегрузке: он прерывает текущий ход"""
+    limiter = make_limiter(max_concurrent=1, queue_size=0)
+    release = asyncio.Event()
+
+    async def blocking(event: Any, data: dict[str, Any]) -> None:
+        await release.wait()
+
+    busy = asyncio.create_task(limiter(blocking, make_message(), {}))
+    await asyncio.sleep(0)
+
+    clear_handler = AsyncMock()
+    clear = make_message("/clear")
+    await limiter(clear_handler, clear, {})
+
+    clear_handler.assert_called_once()
+    clear.answer.assert_not_called()
+    release.set()
+    await busy
+
+
+async def test_busy_reply_goes_through_sender() -> None:
+    """С TelegramSender ответ "занято" ставится в очередь отправки"""
+    limiter = make_limiter(max_concurrent=1, queue_size=0)
+    release = asyncio.Event()
+
+    async def blocking(event: Any, data: dict[str, Any]) -> None:
+        await release.wait()
+
+    busy = asyncio.create_task(limiter(blocking, make_message(), {}))
+    await asyncio.sleep(0)
+
+    sender = Mock()
+    sender.send = AsyncMock()
+    shed = make_message()
+    await limiter(AsyncMock(), shed, {"telegram_sender": sender})
+
+    sender.send.assert_called_once_with(1, BUSY_TEXT)
+    shed.answer.assert_not_called()
+    release.set()
+    await busy
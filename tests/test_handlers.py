@@ -1,13 +1,16 @@
 """Тесты для обработчиков команд и сообщений"""
 
-from collections.abc import AsyncGenerator, Callable
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
 from unittest.mock import AsyncMock, Mock
 
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config import Config
 from src.conversation import ConversationManager
 from src.handlers import (
+    UNAVAILABLE_TEXT,
     cmd_clear,
     cmd_help,
     cmd_role,
@@ -16,7 +19,10 @@ from src.handlers import (
     handle_unsupported,
 )
 from src.llm_client import LLMClient
+from src.llm_errors import LLMOverloadedError
 from src.models import ChatMessage
+from src.turn_tracker import TurnTracker
+from src.user_repository import UserRepository
 
 
 @pytest.fixture
@@ -40,6 +46,7 @@ def mock_llm_client() -> Mock:
     """Mock LLMClient"""
     client = Mock(spec=LLMClient)
     client.get_response = AsyncMock(return_value="LLM response")
+    client.is_available = Mock(return_value=True)
     return client
 
 
@@ -125,15 +132,12 @@ async def test_handle_message_success(
     mock_message: Mock,
     mock_llm_client: Mock,
     conversation_manager: ConversationManager,
-    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
 ) -> None:
     """Тест успешной обработки текстового сообщения"""
     system_prompt = "You are a helpful assistant"
     mock_message.text = "Hello, bot!"
 
-    await handle_message(
-        mock_message, mock_llm_client, conversation_manager, session_factory, system_prompt
-    )
+    await handle_message(mock_message, mock_llm_client, conversation_manager, system_prompt)
 
     # Проверяем, что LLM был вызван
     mock_llm_client.get_response.assert_called_once()
@@ -157,20 +161,96 @@ async def test_handle_message_success(
     mock_message.answer.assert_called_once_with("LLM response")
 
 
+@pytest.mark.asyncio
+async def test_handle_message_enqueues_reply_to_sender(
+    mock_message: Mock,
+    mock_llm_client: Mock,
+    conversation_manager: ConversationManager,
+) -> None:
+    """С TelegramSender ответ ставится в очередь отправки, а не отправляется напрямую"""
+    sender = Mock()
+    sender.send = AsyncMock()
+
+    await handle_message(
+        mock_message, mock_llm_client, conversation_manager, "system", telegram_sender=sender
+    )
+
+    sender.send.assert_called_once_with(mock_message.chat.id, "LLM response")
+    mock_message.answer.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_message_splits_long_reply_without_sender(
+    mock_message: Mock,
+    mock_llm_client: Mock,
+    conversation_manager: ConversationManager,
+) -> None:
+    """Без TelegramSender ответ длиннее 4096 символов отправляется частями"""
+    mock_llm_client.get_response = AsyncMock(return_value="a" * 4096 + "\n\n" + "b" * 10)
+
+    await handle_message(mock_message, mock_llm_client, conversation_manager, "system")
+
+    assert [c.args[0] for c in mock_message.answer.call_args_list] == ["a" * 4096, "b" * 10]
+
+
+@pytest.mark.asyncio
+async def test_handle_message_saves_user(
+    mock_message: Mock,
+    mock_llm_client: Mock,
+    conversation_manager: ConversationManager,
+    db_session: AsyncSession,
+) -> None:
+    """Тест сохранения пользователя в рамках хода диалога"""
+    mock_message.from_user.id = 54321
+    await handle_message(mock_message, mock_llm_client, conversation_manager, "System prompt")
+
+    user = await UserRepository(db_session).get_user_by_id(54321)
+    assert user is not None
+    assert user.username == "testuser"
+    mock_message.answer.assert_called_once_with("LLM response")
+
+
+@pytest.mark.asyncio
+async def test_handle_message_streaming(
+    mock_message: Mock,
+    mock_llm_client: Mock,
+    conversation_manager: ConversationManager,
+) -> None:
+    """Потоковый режим: заглушка редактируется, в историю сохраняется итоговый текст"""
+
+    async def deltas() -> AsyncIterator[str]:
+        for delta in ["Stream", "ed ", "answer"]:
+            yield delta
+
+    placeholder = Mock()
+    placeholder.edit_text = AsyncMock()
+    mock_message.answer = AsyncMock(return_value=placeholder)
+    mock_llm_client.stream_response = Mock(return_value=deltas())
+    mock_message.from_user.id = 76543
+
+    await handle_message(
+        mock_message, mock_llm_client, conversation_manager, "System", stream_edit_interval=0.0
+    )
+
+    mock_llm_client.get_response.assert_not_called()
+    assert placeholder.edit_text.call_args_list[-1].args[0] == "Streamed answer"
+    key = conversation_manager.get_conversation_key(chat_id=mock_message.chat.id, user_id=76543)
+    history = await conversation_manager.get_history(key, "System")
+    assert history[-1].role == "assistant"
+    assert history[-1].content == "Streamed answer"
+
+
 @pytest.mark.asyncio
 async def test_handle_message_no_user(
     mock_message: Mock,
     mock_llm_client: Mock,
     conversation_manager: ConversationManager,
-    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
 ) -> None:
     """Тест обработки сообщения без from_user"""
     mock_message.from_user = None
     system_prompt = "System prompt"
 
-    await handle_message(
-        mock_message, mock_llm_client, conversation_manager, session_factory, system_prompt
-    )
+    await handle_message(mock_message, mock_llm_client, conversation_manager, system_prompt)
 
     mock_llm_client.get_response.assert_not_called()
     mock_message.answer.assert_not_called()
@@ -181,15 +261,12 @@ async def test_handle_message_no_text(
     mock_message: Mock,
     mock_llm_client: Mock,
     conversation_manager: ConversationManager,
-    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
 ) -> None:
     """Тест обработки сообщения без текста"""
     mock_message.text = None
     system_prompt = "System prompt"
 
-    await handle_message(
-        mock_message, mock_llm_client, conversation_manager, session_factory, system_prompt
-    )
+    await handle_message(mock_message, mock_llm_client, conversation_manager, system_prompt)
 
     mock_llm_client.get_response.assert_not_called()
     mock_message.answer.assert_not_called()
@@ -200,7 +277,6 @@ async def test_handle_message_llm_error(
     mock_message: Mock,
     mock_llm_client: Mock,
     conversation_manager: ConversationManager,
-    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
 ) -> None:
     """Тест обработки ошибки LLM API"""
     system_prompt = "System prompt"
@@ -209,9 +285,7 @@ async def test_handle_message_llm_error(
     # Симулируем ошибку LLM
     mock_llm_client.get_response.side_effect = Exception("API Error")
 
-    await handle_message(
-        mock_message, mock_llm_client, conversation_manager, session_factory, system_prompt
-    )
+    await handle_message(mock_message, mock_llm_client, conversation_manager, system_prompt)
 
     # Проверяем, что пользователю отправлено сообщение об ошибке
     mock_message.answer.assert_called_once()
@@ -220,27 +294,93 @@ async def test_handle_message_llm_error(
 
 
 @pytest.mark.asyncio
-async def test_handle_message_conversation_history(
+async def test_handle_message_fast_fails_when_llm_unavailable(mock_message: Mock) -> None:
+    """Цепи всех моделей разомкнуты: ответ сразу, без обращения к истории и LLM"""
+    llm_client = Mock(spec=LLMClient)
+    llm_client.is_available = Mock(return_value=False)
+    conversation_manager = Mock(spec=ConversationManager)
+
+    await handle_message(mock_message, llm_client, conversation_manager, "System prompt")
+
+    mock_message.answer.assert_called_once_with(UNAVAILABLE_TEXT)
+    conversation_manager.start_turn.assert_not_called()
+    llm_client.get_response.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_message_overload_reports_unavailable(
     mock_message: Mock,
     mock_llm_client: Mock,
     conversation_manager: ConversationManager,
+) -> None:
+    """Переполненная очередь LLM: пользователь получает сообщение о недоступности"""
+    mock_llm_client.get_response.side_effect = LLMOverloadedError("queue is full")
+
+    await handle_message(mock_message, mock_llm_client, conversation_manager, "System prompt")
+
+    mock_message.answer.assert_called_once_with(UNAVAILABLE_TEXT)
+
+
+@pytest.mark.asyncio
+async def test_clear_cancels_in_flight_turn(
+    mock_message: Mock,
     session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """/clear во время генерации: запрос к LLM отменяется, ответ не сохраняется и не отправляется"""
+    turn_tracker = TurnTracker(Config(telegram_token="test", openrouter_api_key="test"))
+    manager = ConversationManager(session_factory=session_factory, turn_tracker=turn_tracker)
+    llm_started = asyncio.Event()
+    llm_cancelled = False
+
+    async def slow_response(*args: object, **kwargs: object) -> str:
+        nonlocal llm_cancelled
+        llm_started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            llm_cancelled = True
+            raise
+        return "late answer"
+
+    llm_client = Mock(spec=LLMClient)
+    llm_client.is_available = Mock(return_value=True)
+    llm_client.get_response = AsyncMock(side_effect=slow_response)
+
+    turn = asyncio.create_task(
+        handle_message(mock_message, llm_client, manager, "System", turn_tracker=turn_tracker)
+    )
+    await llm_started.wait()
+    clear_message = Mock(from_user=mock_message.from_user, chat=mock_message.chat)
+    clear_message.answer = AsyncMock()
+    await cmd_clear(clear_message, manager)
+    await turn
+
+    assert llm_cancelled
+    mock_message.answer.assert_not_called()
+    assert turn_tracker.stats()["cancelled"] == 1
+    key = manager.get_conversation_key(
+        chat_id=mock_message.chat.id, user_id=mock_message.from_user.id
+    )
+    assert [m.role for m in await manager.get_history(key, "System")] == ["system"]
+
+
+@pytest.mark.asyncio
+async def test_handle_message_conversation_history(
+    mock_message: Mock,
+    mock_llm_client: Mock,
+    conversation_manager: ConversationManager,
 ) -> None:
     """Тест сохранения истории диалога"""
     system_prompt = "System prompt"
 
     # Первое сообщение
     mock_message.text = "First message"
-    await handle_message(
-        mock_message, mock_llm_client, conversation_manager, session_factory, system_prompt
-    )
+    await handle_message(mock_message, mock_llm_client, conversation_manager, system_prompt)
 
     # Второе сообщение
     mock_message.text = "Second message"
     mock_llm_client.get_response.return_value = "Second response"
-    await handle_message(
-        mock_message, mock_llm_client, conversation_manager, session_factory, system_prompt
-    )
+    await handle_message(mock_message, mock_llm_client, conversation_manager, system_prompt)
 
     # Проверяем историю
     key = conversation_manager.get_conversation_key(
@@ -0,0 +1,194 @@
+"""Тесты для HistoryCache"""
+
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conversation import ConversationManager
+from src.history_cache import HistoryCache, trim_history
+from src.models import ChatMessage, ConversationKey
+from tests.conftest import FakeClock
+
+
+def test_get_miss_and_hit() -> None:
+    """Промах для неизвестного ключа, попадание после put"""
+    cache = HistoryCache()
+    key = ConversationKey(chat_id=1, user_id=1)
+
+    assert cache.get(key) is None
+
+    cache.put(key, [ChatMessage(role="system", content="sys")])
+    cached = cache.get(key)
+
+    assert cached is not None
+    assert cached[0].content == "sys"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_get_returns_copy() -> None:
+    """Изменение возвращенного списка не портит кэш"""
+    cache = HistoryCache()
+    key = ConversationKey(chat_id=1, user_id=1)
+    cache.put(key, [ChatMessage(role="system", content="sys")])
+
+    cached = cache.get(key)
+    assert cached is not None
+    cached.append(ChatMessage(role="user", content="extra"))
+
+    assert len(cache.get(key) or []) == 1
+
+
+def test_append_trims_to_max_messages() -> None:
+    """append дописывает сообщение и обрезает окно, сохраняя system prompt"""
+    cache = HistoryCache()
+    key = ConversationKey(chat_id=1, user_id=1)
+    cache.put(key, [ChatMessage(role="system", content="sys")])
+
+    for i in range(5):
+        cache.append(key, ChatMessage(role="user", content=f"msg{i}"), max_messages=3)
+
+    cached = cache.get(key)
+    assert cached is not None
+    assert [m.content for m in cached] == ["sys", "msg2", "msg3", "msg4"]
+
+
+def test_trim_history_by_token_budget() -> None:
+    """Окно обрезается по бюджету токенов, последнее сообщение остается всегда"""
+    messages = [
+        ChatMessage(role="system", content="sys", token_count=100),
+        ChatMessage(role="user", content="old", token_count=30),
+        ChatMessage(role="assistant", content="mid", token_count=20),
+        ChatMessage(role="user", content="new", token_count=15),
+    ]
+
+    assert [m.content for m in trim_history(messages, 10, token_budget=40)] == [
+        "sys",
+        "mid",
+        "new",
+    ]
+    assert [m.content for m in trim_history(messages, 10, token_budget=5)] == ["sys", "new"]
+    assert len(trim_history(messages, 10)) == 4  # noqa: PLR2004
+
+
+def test_append_ignores_unknown_key() -> None:
+    """append не создает неполную запись для отсутствующего диалога"""
+    cache = HistoryCache()
+    key = ConversationKey(chat_id=1, user_id=1)
+
+    cache.append(key, ChatMessage(role="user", content="msg"), max_messages=3)
+
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_expiration() -> None:
+    """Запись перестает отдаваться после истечения TTL"""
+    clock = FakeClock()
+    cache = HistoryCache(ttl_seconds=10.0, clock=clock)
+    key = ConversationKey(chat_id=1, user_id=1)
+    cache.put(key, [ChatMessage(role="system", content="sys")])
+
+    clock.now = 9.0
+    assert cache.get(key) is not None
+
+    clock.now = 10.0
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_by_entries() -> None:
+    """При превышении max_entries вытесняется давно использованная запись"""
+    cache = HistoryCache(max_entries=2)
+    key1 = ConversationKey(chat_id=1, user_id=1)
+    key2 = ConversationKey(chat_id=2, user_id=2)
+    key3 = ConversationKey(chat_id=3, user_id=3)
+
+    cache.put(key1, [ChatMessage(role="system", content="1")])
+    cache.put(key2, [ChatMessage(role="system", content="2")])
+    cache.get(key1)  # key1 становится самым свежим
+    cache.put(key3, [ChatMessage(role="system", content="3")])
+
+    assert cache.get(key2) is None
+    assert cache.get(key1) is not None
+    assert cache.get(key3) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes() -> None:
+    """Суммарный размер контента не превышает max_bytes"""
+    cache = HistoryCache(max_bytes=10)
+    key1 = ConversationKey(chat_id=1, user_id=1)
+    key2 = ConversationKey(chat_id=2, user_id=2)
+
+    cache.put(key1, [ChatMessage(role="system", content="aaaaaa")])
+    cache.put(key2, [ChatMessage(role="system", content="bbbbbb")])
+
+    assert cache.get(key1) is None
+    assert cache.get(key2) is not None
+    assert cache.stats()["bytes"] == 6
+
+
+def test_oversized_history_not_cached() -> None:
+    """История больше max_bytes не попадает в кэш"""
+    cache = HistoryCache(max_bytes=4)
+    key = ConversationKey(chat_id=1, user_id=1)
+
+    cache.put(key, [ChatMessage(role="system", content="too long")])
+
+    assert cache.get(key) is None
+    assert cache.stats()["bytes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_warm_conversation_skips_db(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Теплый диалог читается из кэша без обращения к БД"""
+    sessions_opened = 0
+
+    async def counting_session_factory() -> AsyncGenerator[AsyncSession, None]:
+        nonlocal sessions_opened
+        sessions_opened += 1
+        async for session in session_factory():
+            yield session
+
+    manager = ConversationManager(
+        session_factory=counting_session_factory,
+        max_history_messages=3,
+        history_cache=HistoryCache(),
+    )
+    key = ConversationKey(chat_id=424242, user_id=424242)
+
+    await manager.add_message(key, ChatMessage(role="user", content="first"))
+    await manager.get_history(key, "system")  # холодное чтение: заполняет кэш
+    await manager.add_message(key, ChatMessage(role="assistant", content="answer"))
+
+    sessions_before = sessions_opened
+    history = await manager.get_history(key, "system")
+
+    assert sessions_opened == sessions_before
+    assert [m.content for m in history] == ["system", "first", "answer"]
+
+
+@pytest.mark.asyncio
+async def test_clear_history_invalidates_cache(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """clear_history сбрасывает закэшированную историю"""
+    manager = ConversationManager(
+        session_factory=session_factory,
+        max_history_messages=3,
+        history_cache=HistoryCache(),
+    )
+    key = ConversationKey(chat_id=434343, user_id=434343)
+
+    await manager.add_message(key, ChatMessage(role="user", content="before clear"))
+    await manager.get_history(key, "system")
+
+    await manager.clear_history(key)
+    history = await manager.get_history(key, "system")
+
+    assert len(history) == 1
+    assert history[0].role == "system"
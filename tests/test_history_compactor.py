@@ -0,0 +1,82 @@
+"""Тесты очистки истории через границу в conversations и HistoryCompactor"""
+
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conversation import ConversationManager
+from src.conversation_repository import ConversationRepository
+from src.db_models import Message
+from src.history_compactor import HistoryCompactor
+from src.models import ChatMessage, ConversationKey
+from src.repository import MessageRepository
+
+
+async def count_active_rows(db_session: AsyncSession, key: ConversationKey) -> int:
+    """Количество строк диалога без deleted_at"""
+    result = await db_session.execute(
+        select(func.count(Message.id)).where(
+            Message.chat_id == key.chat_id,
+            Message.user_id == key.user_id,
+            Message.deleted_at.is_(None),
+        )
+    )
+    return result.scalar() or 0
+
+
+@pytest.mark.asyncio
+async def test_clear_history_does_not_touch_messages(
+    conversation_manager: ConversationManager, db_session: AsyncSession
+) -> None:
+    """clear_history скрывает сообщения без UPDATE строк messages"""
+    key = ConversationKey(chat_id=515151, user_id=515151)
+    await conversation_manager.add_message(key, ChatMessage(role="user", content="old 1"))
+    await conversation_manager.add_message(key, ChatMessage(role="user", content="old 2"))
+
+    await conversation_manager.clear_history(key)
+    await conversation_manager.add_message(key, ChatMessage(role="user", content="new"))
+
+    history = await conversation_manager.get_history(key, "system")
+    repo = MessageRepository(db_session)
+
+    assert [m.content for m in history] == ["system", "new"]
+    assert await repo.get_history_count(key) == 1
+    # Старые строки физически не тронуты до компактации
+    assert await count_active_rows(db_session, key) == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_mark_cleared_empty_conversation(db_session: AsyncSession) -> None:
+    """Очистка пустого диалога не создает границу"""
+    repo = ConversationRepository(db_session)
+
+    cleared = await repo.mark_cleared(ConversationKey(chat_id=525252, user_id=525252))
+
+    assert cleared is False
+
+
+@pytest.mark.asyncio
+async def test_compactor_marks_cleared_messages_in_batches(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+    db_session: AsyncSession,
+) -> None:
+    """Компактор помечает удаленными только сообщения до границы очистки"""
+    manager = ConversationManager(session_factory=session_factory)
+    key = ConversationKey(chat_id=535353, user_id=535353)
+    for i in range(5):
+        await manager.add_message(key, ChatMessage(role="user", content=f"old {i}"))
+    await manager.clear_history(key)
+    await manager.add_message(key, ChatMessage(role="user", content="new"))
+
+    compactor = HistoryCompactor(session_factory=session_factory, batch_size=2)
+    compacted = await compactor.run_once()
+
+    # БД общая для тестов: компактируются и другие очищенные диалоги
+    assert compacted >= 5  # noqa: PLR2004
+    assert await count_active_rows(db_session, key) == 1
+    assert await compactor.run_once() == 0
+
+    history = await manager.get_history(key, "system")
+    assert [m.content for m in history] == ["system", "new"]
@@ -54,8 +54,8 @@ async def test_history_limit_saves_all_but_returns_limited(
     result = await db_session.execute(query)
     total_in_db = result.scalar()
 
-    # В БД: system + 10 user сообщений = 11
-    expected_in_db = 1 + messages_count
+    # В БД: 10 user сообщений (system prompt хранится в system_prompts)
+    expected_in_db = messages_count
     assert total_in_db == expected_in_db, (
         f"В БД должно быть {expected_in_db} сообщений, найдено {total_in_db}"
     )
@@ -108,3 +108,22 @@ async def test_history_limit_query_optimization(
 
     print(f"✅ В БД: {total_in_db} сообщений, запрошено: {len(history)}")
     print("✅ SQL LIMIT работает эффективно!")
+
+
+@pytest.mark.asyncio
+async def test_history_window_skips_legacy_system_rows(db_session) -> None:
+    """
+    Проверяет, что SQL-окно истории не возвращает system-строки из messages
+    (system prompt хранится в system_prompts) и заполняет created_at
+    """
+    key = ConversationKey(chat_id=999999, user_id=999999)
+    repo = MessageRepository(db_session)
+
+    await repo.add_message(key, ChatMessage(role="system", content="System"))
+    for i in range(30):
+        await repo.add_message(key, ChatMessage(role="user", content=f"Msg {i}"))
+
+    history = await repo.get_history(key, limit=5)
+
+    assert [m.content for m in history] == [f"Msg {i}" for i in range(25, 30)]
+    assert all(m.created_at is not None for m in history)
@@ -0,0 +1,126 @@
+"""Тесты для HistorySummarizer"""
+
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import Config
+from src.conversation import ConversationManager
+from src.history_summarizer import SUMMARY_PREFIX, HistorySummarizer
+from src.models import ChatMessage, ConversationKey
+
+
+@pytest.fixture
+def summary_config() -> Config:
+    """Config с низким порогом сворачивания"""
+    return Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        history_summary_trigger_tokens=10,
+        history_summary_keep_messages=2,
+    )
+
+
+def make_llm_client(response: str = "Пользователь спрашивал про погоду") -> MagicMock:
+    """Mock LLMClient с фиксированным ответом"""
+    llm_client = MagicMock()
+    llm_client.get_response = AsyncMock(return_value=response)
+    return llm_client
+
+
+def test_maybe_schedule_below_threshold(summary_config: Config) -> None:
+    """Короткая история не запускает сворачивание"""
+    summarizer = HistorySummarizer(MagicMock(), make_llm_client(), summary_config)
+    history = [ChatMessage(role="user", content="hi", token_count=1) for _ in range(5)]
+
+    summarizer.maybe_schedule(ConversationKey(chat_id=1, user_id=1), history)
+
+    summarizer.session_factory.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_summary_replaces_old_messages(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+    summary_config: Config,
+) -> None:
+    """После сворачивания история: system prompt + резюме + последние сообщения"""
+    llm_client = make_llm_client()
+    summarizer = HistorySummarizer(session_factory, llm_client, summary_config)
+    manager = ConversationManager(
+        session_factory=session_factory, max_history_messages=10, history_summarizer=summarizer
+    )
+    key = ConversationKey(chat_id=818181, user_id=818181)
+    for i in range(4):
+        await manager.add_message(key, ChatMessage(role="user", content=f"question {i} " * 5))
+
+    turn = await manager.start_turn(key, ChatMessage(role="user", content="last question"), "sys")
+    await manager.finish_turn(turn, ChatMessage(role="assistant", content="last answer"))
+    # Сворачивание запущено в фоне после ответа; дожидаемся его
+    assert await asyncio.gather(*summarizer._tasks.values()) == [True]
+
+    history = await manager.get_history(key, "sys")
+
+    assert history[0].content == "sys"
+    assert history[1].content == SUMMARY_PREFIX + "Пользователь спрашивал про погоду"
+    assert [m.content for m in history[2:]] == ["last question", "last answer"]
+    folded_request = llm_client.get_response.call_args.args[0][1].content
+    assert "question 0" in folded_request
+    assert "last answer" not in folded_request
+
+
+@pytest.mark.asyncio
+async def test_summary_discarded_after_clear(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+    summary_config: Config,
+) -> None:
+    """Резюме не сохраняется, если диалог очистили во время запроса к LLM"""
+    manager = ConversationManager(session_factory=session_factory)
+    key = ConversationKey(chat_id=828282, user_id=828282)
+    for i in range(4):
+        await manager.add_message(key, ChatMessage(role="user", content=f"message {i}"))
+
+    async def clear_during_llm_call(messages: list[ChatMessage], user_id: int | None = None) -> str:
+        await manager.clear_history(key)
+        return "stale summary"
+
+    llm_client = MagicMock()
+    llm_client.get_response = AsyncMock(side_effect=clear_during_llm_call)
+    summarizer = HistorySummarizer(session_factory, llm_client, summary_config)
+
+    assert await summarizer.summarize(key) is False
+    history = await manager.get_history(key, "sys")
+    assert [m.content for m in history] == ["sys"]
+
+
+@pytest.mark.asyncio
+async def test_summary_folds_backlog_in_order(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Длинная история сворачивается по порядку от границы, без пропусков"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        history_summary_keep_messages=2,
+        history_summary_max_input_messages=2,
+    )
+    manager = ConversationManager(session_factory=session_factory)
+    key = ConversationKey(chat_id=838383, user_id=838383)
+    for i in range(6):
+        await manager.add_message(key, ChatMessage(role="user", content=f"message {i}"))
+
+    llm_client = make_llm_client()
+    summarizer = HistorySummarizer(session_factory, llm_client, config)
+
+    assert await summarizer.summarize(key) is True
+    assert await summarizer.summarize(key) is True
+    assert await summarizer.summarize(key) is False
+
+    requests = [call.args[0][1].content for call in llm_client.get_response.call_args_list]
+    assert "message 0" in requests[0] and "message 1" in requests[0]
+    assert "message 2" not in requests[0]
+    assert "message 2" in requests[1] and "message 3" in requests[1]
+    history = await manager.get_history(key, "sys")
+    assert [m.content for m in history[2:]] == ["message 4", "message 5"]
@@ -1,12 +1,20 @@
 """Тесты для LLMClient"""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
+from openai import APIStatusError, BadRequestError, InternalServerError, RateLimitError
+from openai.types import CompletionUsage
 
 from src.config import Config
 from src.llm_client import LLMClient
-from src.models import ChatMessage
+from src.llm_errors import CircuitOpenError, LLMOverloadedError
+from src.llm_metrics import LLMMetrics
+from src.llm_response_cache import LLMResponseCache
+from src.llm_route import LLMRoute, llm_routes
+from src.models import ChatMessage, LLMUsage
 
 
 @pytest.fixture
@@ -14,9 +22,24 @@ def mock_config() -> Config:
     return Config(
         telegram_token="test",
         openrouter_api_key="test",
+        llm_retry_base_delay_seconds=0.0,
     )
 
 
+def make_response(content: str | None) -> MagicMock:
+    """Mock ответа chat.completions.create"""
+    response = MagicMock()
+    response.choices[0].message.content = content
+    return response
+
+
+def make_status_error(error_class: type[APIStatusError], status_code: int) -> APIStatusError:
+    """Ошибка OpenAI SDK с HTTP статусом"""
+    request = httpx.Request("POST", "https://llm.test/chat/completions")
+    response = httpx.Response(status_code, request=request)
+    return error_class("upstream error", response=response, body=None)
+
+
 @pytest.mark.asyncio
 async def test_get_response_success(mock_config: Config) -> None:
     """Успешный запрос к LLM API"""
@@ -66,3 +89,524 @@ async def test_get_response_api_error(mock_config: Config) -> None:
             await client.get_response(messages)
 
         assert "API Error" in str(exc_info.value)
+
+
+class FakeStream:
+    """Поток чанков OpenAI (async with + async for)"""
+
+    def __init__(self, deltas: list[str | None], usage: CompletionUsage | None = None) -> None:
+        self.chunks = []
+        for delta in deltas:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = delta
+            chunk.usage = None
+            self.chunks.append(chunk)
+        if usage is not None:
+            # Последний чанк с include_usage: пустой choices и usage
+            chunk = MagicMock()
+            chunk.choices = []
+            chunk.usage = usage
+            self.chunks.append(chunk)
+
+    async def __aenter__(self) -> "FakeStream":
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        return None
+
+    def __aiter__(self) -> "FakeStream":
+        self._iter = iter(self.chunks)
+        return self
+
+    async def __anext__(self) -> MagicMock:
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+@pytest.mark.asyncio
+async def test_stream_response_yields_deltas(mock_config: Config) -> None:
+    """Потоковый ответ отдает непустые фрагменты по мере прихода"""
+    client = LLMClient(mock_config)
+    create = AsyncMock(return_value=FakeStream(["Hel", None, "lo", ""]))
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        deltas = [d async for d in client.stream_response([ChatMessage(role="user", content="hi")])]
+
+    assert deltas == ["Hel", "lo"]
+    assert create.call_args.kwargs["stream"] is True
+
+
+@pytest.mark.asyncio
+async def test_stream_response_empty(mock_config: Config) -> None:
+    """Поток без текста считается пустым ответом"""
+    client = LLMClient(mock_config)
+
+    with patch.object(
+        client.client.chat.completions, "create", new=AsyncMock(return_value=FakeStream([None]))
+    ):
+        with pytest.raises(ValueError, match="LLM returned empty response"):
+            async for _ in client.stream_response([ChatMessage(role="user", content="hi")]):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_rate_limiter_slot(mock_config: Config) -> None:
+    """Слот LLMRateLimiter занят, пока поток читают, и освобождается при закрытии"""
+    client = LLMClient(mock_config)
+    create = AsyncMock(side_effect=lambda **_: FakeStream(["Hel", "lo"]))
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        stream = client.stream_response([ChatMessage(role="user", content="hi")])
+        assert await anext(stream) == "Hel"
+        assert client.rate_limiter.stats()["in_flight"] == 1
+        assert [d async for d in stream] == ["lo"]
+        assert client.rate_limiter.stats()["in_flight"] == 0
+
+        stream = client.stream_response([ChatMessage(role="user", content="hi")])
+        assert await anext(stream) == "Hel"
+        await stream.aclose()
+        assert client.rate_limiter.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_get_response_retries_rate_limit(mock_config: Config) -> None:
+    """429 повторяется с той же моделью, попытки учитываются в метриках"""
+    client = LLMClient(mock_config)
+    create = AsyncMock(
+        side_effect=[make_status_error(RateLimitError, 429), make_response("after retry")]
+    )
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        response = await client.get_response([ChatMessage(role="user", content="test")])
+
+    assert response == "after retry"
+    assert create.call_count == 2
+    route = client.routes[0].name
+    assert client.metrics.stats()[f"attempts.{route}.rate_limited"] == 1
+    assert client.metrics.stats()[f"attempts.{route}.success"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_response_falls_back_to_next_model() -> None:
+    """После исчерпания повторов запрос уходит запасной модели"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        model_name="primary",
+        llm_fallback_models="backup",
+        llm_max_retries=1,
+        llm_retry_base_delay_seconds=0.0,
+    )
+    client = LLMClient(config)
+
+    async def create(**kwargs: object) -> MagicMock:
+        if kwargs["model"] == "primary":
+            raise make_status_error(InternalServerError, 503)
+        return make_response("from backup")
+
+    mock_create = AsyncMock(side_effect=create)
+    with patch.object(client.client.chat.completions, "create", new=mock_create):
+        response = await client.get_response([ChatMessage(role="user", content="test")])
+
+    assert response == "from backup"
+    assert [c.kwargs["model"] for c in mock_create.call_args_list] == [
+        "primary",
+        "primary",
+        "backup",
+    ]
+    assert client.metrics.stats()[f"attempts.{client.routes[0].name}.server_error"] == 2
+
+
+@pytest.mark.asyncio
+async def test_get_response_does_not_retry_client_error(mock_config: Config) -> None:
+    """Ошибка запроса (4xx кроме 429) не повторяется"""
+    client = LLMClient(mock_config)
+    create = AsyncMock(side_effect=make_status_error(BadRequestError, 400))
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        with pytest.raises(BadRequestError):
+            await client.get_response([ChatMessage(role="user", content="test")])
+
+    assert create.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_response_respects_deadline() -> None:
+    """Цепочка повторов ограничена общим дедлайном"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        llm_deadline_seconds=0.05,
+        llm_retry_base_delay_seconds=0.0,
+    )
+    client = LLMClient(config)
+
+    async def slow_create(**kwargs: object) -> MagicMock:
+        await asyncio.sleep(1)
+        return make_response("too late")
+
+    with patch.object(client.client.chat.completions, "create", new=slow_create):
+        with pytest.raises(TimeoutError):
+            await client.get_response([ChatMessage(role="user", content="test")])
+
+
+def test_llm_routes_from_config() -> None:
+    """Запасные модели разбираются из LLM_FALLBACK_MODELS"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        model_name="primary",
+        openrouter_base_url="https://main.test/v1",
+        llm_fallback_models="backup, other@https://other.test/v1,",
+    )
+
+    assert llm_routes(config) == [
+        LLMRoute(model="primary", base_url="https://main.test/v1"),
+        LLMRoute(model="backup", base_url="https://main.test/v1"),
+        LLMRoute(model="other", base_url="https://other.test/v1"),
+    ]
+
+
+def make_hedging_config() -> Config:
+    """Config с хеджированием на запасную модель через 50 мс"""
+    return Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        model_name="primary",
+        llm_fallback_models="backup",
+        llm_hedging_enabled=True,
+        llm_hedge_initial_delay_seconds=0.05,
+    )
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_takes_faster_route() -> None:
+    """Медленный основной запрос дублируется, побеждает быстрый, проигравший отменяется"""
+    client = LLMClient(make_hedging_config())
+    primary_cancelled = False
+
+    async def create(**kwargs: object) -> MagicMock:
+        nonlocal primary_cancelled
+        if kwargs["model"] == "primary":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                primary_cancelled = True
+                raise
+        return make_response(f"from {kwargs['model']}")
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        response = await client.get_response([ChatMessage(role="user", content="test")])
+
+    assert response == "from backup"
+    assert primary_cancelled
+    stats = client.metrics.stats()
+    assert stats["hedge.fired"] == 1
+    assert stats["hedge.wins"] == 1
+    assert stats["hedge.rate"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_hedging_skipped_without_fallback_route() -> None:
+    """Без запасного маршрута медленный запрос не дублируется тому же upstream"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        model_name="primary",
+        llm_hedging_enabled=True,
+        llm_hedge_initial_delay_seconds=0.01,
+    )
+    client = LLMClient(config)
+
+    async def create(**kwargs: object) -> MagicMock:
+        await asyncio.sleep(0.1)
+        return make_response("slow")
+
+    mock_create = AsyncMock(side_effect=create)
+    with patch.object(client.client.chat.completions, "create", new=mock_create):
+        response = await client.get_response([ChatMessage(role="user", content="test")])
+
+    assert response == "slow"
+    assert mock_create.call_count == 1
+    assert client.metrics.stats().get("hedge.fired", 0) == 0
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_fast_primary_not_duplicated() -> None:
+    """Быстрый основной ответ не порождает дубль"""
+    client = LLMClient(make_hedging_config())
+    create = AsyncMock(return_value=make_response("fast"))
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        response = await client.get_response([ChatMessage(role="user", content="test")])
+
+    assert response == "fast"
+    assert create.call_count == 1
+    assert client.metrics.stats()["hedge.rate"] == 0.0
+
+
+def test_latency_percentile_rolling_window() -> None:
+    """Перцентиль считается по последним window_size успешным попыткам"""
+    metrics = LLMMetrics(window_size=10)
+    for i in range(1, 21):
+        metrics.record_attempt("model", "success", float(i))
+    metrics.record_attempt("model", "timeout", 100.0)
+
+    assert metrics.latency_percentile("model", 0.9, min_samples=5) == 19.0
+    assert metrics.latency_percentile("model", 0.9, min_samples=11) is None
+    assert metrics.latency_percentile("other", 0.9, min_samples=1) is None
+
+
+@pytest.mark.asyncio
+async def test_overload_is_not_retried() -> None:
+    """Переполненная очередь не порождает повторы и запросы к запасным моделям"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        llm_fallback_models="backup",
+        llm_max_concurrent_requests=1,
+        llm_queue_timeout_seconds=0.01,
+    )
+    client = LLMClient(config)
+    create = AsyncMock(return_value=make_response("ok"))
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        async with client.rate_limiter.slot("busy", tokens=1, max_wait=1.0):
+            with pytest.raises(LLMOverloadedError):
+                await client.get_response([ChatMessage(role="user", content="test")])
+
+    create.assert_not_called()
+    assert client.rate_limiter.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fair_scheduling_applies_per_user() -> None:
+    """С llm_fair_scheduling_enabled запрос с user_id занимает слот пользователя"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        llm_fair_scheduling_enabled=True,
+        llm_per_user_max_in_flight=1,
+        llm_queue_timeout_seconds=0.01,
+    )
+    client = LLMClient(config)
+    assert client.scheduler is not None
+    create = AsyncMock(return_value=make_response("ok"))
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        async with client.scheduler.slot(42, cost=1):
+            with pytest.raises(LLMOverloadedError):
+                await client.get_response([ChatMessage(role="user", content="test")], user_id=42)
+            # Другой пользователь и запросы без user_id очередь не ждут
+            assert await client.get_response([ChatMessage(role="user", content="a")], 7) == "ok"
+            assert await client.get_response([ChatMessage(role="user", content="b")]) == "ok"
+
+    assert create.call_count == 2
+    assert client.scheduler.user_stats(7)["requests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_response_cache_only_for_opted_in_calls(mock_config: Config) -> None:
+    """Повтор запроса с cache=True не идет в LLM, обычные вызовы кэш не используют"""
+    client = LLMClient(mock_config, response_cache=LLMResponseCache(mock_config))
+    create = AsyncMock(return_value=make_response("SELECT 1"))
+    messages = [ChatMessage(role="user", content="Сколько всего пользователей?")]
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        assert await client.get_response(messages, cache=True) == "SELECT 1"
+        assert await client.get_response(messages, cache=True) == "SELECT 1"
+        assert create.call_count == 1
+
+        await client.get_response(messages)
+        assert create.call_count == 2
+
+        await client.forget_cached_response(messages)
+        await client.get_response(messages, cache=True)
+        assert create.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_fallback_response_is_not_cached() -> None:
+    """Ответ запасной модели не кэшируется под ключом основной"""
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        model_name="primary",
+        llm_fallback_models="backup",
+        llm_max_retries=0,
+    )
+    client = LLMClient(config, response_cache=LLMResponseCache(config))
+    primary_down = True
+
+    async def create(**kwargs: object) -> MagicMock:
+        if kwargs["model"] == "primary" and primary_down:
+            raise make_status_error(InternalServerError, 503)
+        return make_response(f"from {kwargs['model']}")
+
+    messages = [ChatMessage(role="user", content="Сколько всего пользователей?")]
+    with patch.object(client.client.chat.completions, "create", new=AsyncMock(side_effect=create)):
+        assert await client.get_response(messages, cache=True) == "from backup"
+        primary_down = False
+        assert await client.get_response(messages, cache=True) == "from primary"
+        assert await client.get_response(messages, cache=True) == "from primary"
+
+    assert client.response_cache is not None
+    assert client.response_cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_response_reports_usage(mock_config: Config) -> None:
+    """on_usage получает модель, токены из response.usage и задержку"""
+    client = LLMClient(mock_config)
+    response = make_response("ok")
+    response.usage = CompletionUsage(prompt_tokens=12, completion_tokens=3, total_tokens=15)
+    usage: list[LLMUsage] = []
+
+    with patch.object(
+        client.client.chat.completions, "create", new=AsyncMock(return_value=response)
+    ):
+        await client.get_response([ChatMessage(role="user", content="test")], on_usage=usage.append)
+
+    assert len(usage) == 1
+    assert usage[0].model == mock_config.model_name
+    assert (usage[0].prompt_tokens, usage[0].completion_tokens) == (12, 3)
+    assert usage[0].latency_ms >= 0
+
+
+@pytest.mark.asyncio
+async def test_stream_response_reports_usage(mock_config: Config) -> None:
+    """Потоковый ответ запрашивает usage и передает его после последнего фрагмента"""
+    client = LLMClient(mock_config)
+    stream = FakeStream(
+        ["Hel", "lo"], CompletionUsage(prompt_tokens=7, completion_tokens=2, total_tokens=9)
+    )
+    create = AsyncMock(return_value=stream)
+    usage: list[LLMUsage] = []
+
+    with patch.object(client.client.chat.completions, "create", new=create):
+        deltas = [
+            d
+            async for d in client.stream_response(
+                [ChatMessage(role="user", content="hi")], on_usage=usage.append
+            )
+        ]
+
+    assert deltas == ["Hel", "lo"]
+    assert create.call_args.kwargs["stream_options"] == {"include_usage": True}
+    assert [(u.prompt_tokens, u.completion_tokens) for u in usage] == [(7, 2)]
+
+
+def make_breaker_config() -> Config:
+    """Config с маленьким окном circuit breaker и запасной моделью"""
+    return Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        model_name="primary",
+        llm_fallback_models="backup",
+        llm_max_retries=0,
+        llm_retry_base_delay_seconds=0.0,
+        llm_breaker_window_size=2,
+        llm_breaker_min_requests=2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skips_model_without_request() -> None:
+    """Модель с разомкнутой цепью пропускается сразу, запрос уходит запасной"""
+    client = LLMClient(make_breaker_config())
+
+    async def create(**kwargs: object) -> MagicMock:
+        if kwargs["model"] == "primary":
+            raise make_status_error(InternalServerError, 503)
+        return make_response("from backup")
+
+    mock_create = AsyncMock(side_effect=create)
+    with patch.object(client.client.chat.completions, "create", new=mock_create):
+        for _ in range(3):
+            assert await client.get_response([ChatMessage(role="user", content="hi")]) == (
+                "from backup"
+            )
+
+    assert [c.kwargs["model"] for c in mock_create.call_args_list] == [
+        "primary",
+        "backup",
+        "primary",
+        "backup",
+        "backup",
+    ]
+    assert client.breaker is not None
+    assert client.breaker.states() == {
+        client.routes[1].name: "closed",
+        client.routes[0].name: "open",
+    }
+    assert client.is_available()
+
+
+@pytest.mark.asyncio
+async def test_circuit_per_provider_for_same_model() -> None:
+    """Одна модель у двух провайдеров: отказы первого не размыкают цепь второго"""
+    config = make_breaker_config().model_copy(
+        update={
+            "model_name": "shared",
+            "openrouter_base_url": "https://a.test/v1",
+            "llm_fallback_models": "shared@https://b.test/v1",
+        }
+    )
+    client = LLMClient(config)
+    calls: list[str] = []
+
+    def client_for(route: LLMRoute) -> MagicMock:
+        async def create(**kwargs: object) -> MagicMock:
+            calls.append(route.base_url)
+            if route.base_url == "https://a.test/v1":
+                raise make_status_error(InternalServerError, 503)
+            return make_response("from b")
+
+        provider = MagicMock()
+        provider.chat.completions.create = create
+        return provider
+
+    with patch.object(client, "_client_for", side_effect=client_for):
+        for _ in range(3):
+            assert await client.get_response([ChatMessage(role="user", content="hi")]) == "from b"
+
+    assert calls == ["https://a.test/v1", "https://b.test/v1"] * 2 + ["https://b.test/v1"]
+    assert client.breaker is not None
+    assert client.breaker.states() == {
+        "shared@https://a.test/v1": "open",
+        "shared@https://b.test/v1": "closed",
+    }
+
+
+@pytest.mark.asyncio
+async def test_all_circuits_open_fast_fail() -> None:
+    """Цепи всех моделей разомкнуты: CircuitOpenError без обращения к LLM"""
+    client = LLMClient(make_breaker_config())
+    failing = AsyncMock(side_effect=make_status_error(InternalServerError, 503))
+
+    with patch.object(client.client.chat.completions, "create", new=failing):
+        for _ in range(2):
+            with pytest.raises(InternalServerError):
+                await client.get_response([ChatMessage(role="user", content="hi")])
+        assert failing.call_count == 4
+
+        assert not client.is_available()
+        with pytest.raises(CircuitOpenError):
+            await client.get_response([ChatMessage(role="user", content="hi")])
+        with pytest.raises(CircuitOpenError):
+            async for _ in client.stream_response([ChatMessage(role="user", content="hi")]):
+                pass
+
+    assert failing.call_count == 4
+
+
+def test_circuit_breaker_can_be_disabled() -> None:
+    """С llm_circuit_breaker_enabled=False breaker не создается, LLM всегда доступна"""
+    client = LLMClient(
+        Config(telegram_token="test", openrouter_api_key="test", llm_circuit_breaker_enabled=False)
+    )
+
+    assert client.breaker is None
+    assert client.is_available()
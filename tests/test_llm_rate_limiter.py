@@ -0,0 +1,98 @@
+"""Тесты для LLMRateLimiter"""
+
+import asyncio
+
+import pytest
+
+from src.llm_errors import LLMOverloadedError
+from src.llm_rate_limiter import LLMRateLimiter
+from tests.conftest import make_config
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_queues_callers() -> None:
+    """Сверх лимита одновременных запросов вызовы ждут освобождения слота"""
+    limiter = LLMRateLimiter(make_config(llm_max_concurrent_requests=1))
+    order: list[str] = []
+
+    async def request(name: str) -> None:
+        async with limiter.slot("model", tokens=10, max_wait=1.0):
+            order.append(f"start {name}")
+            await asyncio.sleep(0.02)
+            order.append(f"end {name}")
+
+    await asyncio.gather(request("a"), request("b"))
+
+    assert order == ["start a", "end a", "start b", "end b"]
+    stats = limiter.stats()
+    assert stats["admitted"] == 2
+    assert stats["max_queue_depth"] == 2
+    assert stats["max_wait_ms"] > 0
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_queue_timeout_rejects() -> None:
+    """Ожидание слота ограничено llm_queue_timeout_seconds"""
+    limiter = LLMRateLimiter(
+        make_config(llm_max_concurrent_requests=1, llm_queue_timeout_seconds=0.02)
+    )
+
+    async with limiter.slot("model", tokens=10, max_wait=1.0):
+        with pytest.raises(LLMOverloadedError):
+            async with limiter.slot("model", tokens=10, max_wait=1.0):
+                pass
+
+    assert limiter.stats()["rejected"] == 1
+    # Слот освобожден: следующий запрос проходит сразу
+    async with limiter.slot("model", tokens=10, max_wait=1.0):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_requests_per_minute_per_model() -> None:
+    """Лимит запросов в минуту считается отдельно для каждой модели"""
+    limiter = LLMRateLimiter(make_config(llm_requests_per_minute=1))
+
+    async with limiter.slot("a", tokens=1, max_wait=1.0):
+        pass
+    async with limiter.slot("b", tokens=1, max_wait=1.0):
+        pass
+    with pytest.raises(LLMOverloadedError):
+        async with limiter.slot("a", tokens=1, max_wait=1.0):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_tokens_per_minute_limit() -> None:
+    """Промпт, не укладывающийся в бюджет токенов, ждет или отклоняется"""
+    limiter = LLMRateLimiter(make_config(llm_tokens_per_minute=600))
+
+    async with limiter.slot("model", tokens=600, max_wait=1.0):
+        pass
+    # 1 токен восполняется за 0.1 с, ожидание укладывается в max_wait
+    async with limiter.slot("model", tokens=1, max_wait=1.0):
+        pass
+    with pytest.raises(LLMOverloadedError):
+        async with limiter.slot("model", tokens=600, max_wait=1.0):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_cancelled_wait_refunds_reservation() -> None:
+    """Отмененный во время ожидания запрос возвращает зарезервированные токены"""
+    limiter = LLMRateLimiter(make_config(llm_tokens_per_minute=600))
+
+    async with limiter.slot("model", tokens=600, max_wait=1.0):
+        pass
+
+    async def request() -> None:
+        async with limiter.slot("model", tokens=5, max_wait=1.0):
+            pass
+
+    # 5 токенов восполняются за 0.5 с: запрос отменяется, не дождавшись их
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(request(), 0.05)
+    async with limiter.slot("model", tokens=5, max_wait=0.55):
+        pass
+    assert limiter.stats()["rejected"] == 0
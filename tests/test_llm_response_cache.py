@@ -0,0 +1,130 @@
+"""Тесты для LLMResponseCache"""
+
+import uuid
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db_models import LLMResponse
+from src.llm_response_cache import LLMResponseCache, response_cache_key
+from src.models import ChatMessage
+from tests.conftest import FakeClock, make_config
+
+
+def test_cache_key_depends_on_model_temperature_and_messages() -> None:
+    """Ключ детерминирован и меняется при изменении любой части запроса"""
+    messages = [ChatMessage(role="system", content="sql"), ChatMessage(role="user", content="q")]
+    key = response_cache_key("model", 0.0, messages)
+
+    assert key == response_cache_key("model", 0.0, list(messages))
+    assert key != response_cache_key("other", 0.0, messages)
+    assert key != response_cache_key("model", 0.7, messages)
+    assert key != response_cache_key("model", 0.0, messages[:1])
+    assert key != response_cache_key(
+        "model", 0.0, [ChatMessage(role="user", content="sql"), messages[1]]
+    )
+
+
+@pytest.mark.asyncio
+async def test_memory_hit_and_ttl_expiry() -> None:
+    """Ответ отдается из памяти до истечения TTL"""
+    clock = FakeClock()
+    cache = LLMResponseCache(make_config(llm_response_cache_ttl_seconds=10), clock=clock)
+
+    assert await cache.get("k") is None
+    await cache.put("k", "SELECT 1")
+    assert await cache.get("k") == "SELECT 1"
+
+    clock.now = 11.0
+    assert await cache.get("k") is None
+    assert cache.stats() == {
+        "hits": 1,
+        "persistent_hits": 0,
+        "misses": 2,
+        "evictions": 0,
+        "expired_deleted": 0,
+        "entries": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction() -> None:
+    """При переполнении вытесняется давно не использованный ответ"""
+    cache = LLMResponseCache(make_config(llm_response_cache_max_entries=2))
+    await cache.put("a", "1")
+    await cache.put("b", "2")
+    await cache.get("a")
+    await cache.put("c", "3")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "1"
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_persistent_tier_shared_between_instances(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Ответ из БД доступен новому процессу (пустой памяти) и удаляется invalidate"""
+    key = uuid.uuid4().hex
+    writer = LLMResponseCache(make_config(), session_factory=session_factory)
+    await writer.put(key, "SELECT count(*) FROM users")
+
+    reader = LLMResponseCache(make_config(), session_factory=session_factory)
+    assert await reader.get(key) == "SELECT count(*) FROM users"
+    assert await reader.get(key) == "SELECT count(*) FROM users"
+    assert reader.stats()["persistent_hits"] == 1
+    assert reader.stats()["hits"] == 1
+
+    await writer.invalidate(key)
+    fresh = LLMResponseCache(make_config(), session_factory=session_factory)
+    assert await fresh.get(key) is None
+
+
+@pytest.mark.asyncio
+async def test_persistent_tier_ignores_expired_rows(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Истекшая запись в БД считается промахом"""
+    key = uuid.uuid4().hex
+    writer = LLMResponseCache(
+        make_config(llm_response_cache_ttl_seconds=-1), session_factory=session_factory
+    )
+    await writer.put(key, "SELECT 1")
+
+    reader = LLMResponseCache(make_config(), session_factory=session_factory)
+    assert await reader.get(key) is None
+
+
+@pytest.mark.asyncio
+async def test_expired_rows_deleted_periodically(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Истекшие записи удаляются из БД не на каждой записи, а раз в интервал"""
+    clock = FakeClock()
+    cache = LLMResponseCache(
+        make_config(llm_response_cache_ttl_seconds=-1), session_factory=session_factory, clock=clock
+    )
+    keys = [uuid.uuid4().hex for _ in range(3)]
+
+    async def stored() -> set[str]:
+        session_gen = session_factory()
+        session = await session_gen.__anext__()
+        try:
+            result = await session.execute(
+                select(LLMResponse.key_hash).where(LLMResponse.key_hash.in_(keys))
+            )
+            return set(result.scalars())
+        finally:
+            await session_gen.aclose()
+
+    await cache.put(keys[0], "SELECT 1")
+    await cache.put(keys[1], "SELECT 2")
+    assert await stored() == {keys[0], keys[1]}
+
+    clock.now = 61.0
+    await cache.put(keys[2], "SELECT 3")
+    assert await stored() == {keys[2]}
+    assert cache.stats()["expired_deleted"] >= 2
@@ -0,0 +1,67 @@
+"""Тесты для разбиения длинных ответов на сообщения Telegram"""
+
+from src.message_chunker import TELEGRAM_MESSAGE_LIMIT, split_message
+
+
+def test_short_text_is_not_split() -> None:
+    """Текст в пределах лимита отправляется одним сообщением без изменений"""
+    text = "x" * TELEGRAM_MESSAGE_LIMIT
+
+    assert split_message(text) == [text]
+
+
+def test_splits_on_paragraph_boundaries() -> None:
+    """Части собираются из целых абзацев"""
+    text = "first paragraph\n\nsecond paragraph\n\nthird"
+
+    assert split_message(text, limit=35) == ["first paragraph\n\nsecond paragraph", "third"]
+
+
+def test_long_paragraph_splits_on_lines_and_words() -> None:
+    """Абзац длиннее лимита делится по строкам, длинная строка - по пробелам"""
+    text = "line one\nline two is a bit longer than limit"
+
+    chunks = split_message(text, limit=16)
+
+    assert all(len(chunk) <= 16 for chunk in chunks)  # noqa: PLR2004
+    assert chunks[0] == "line one"
+    assert " ".join(chunks[1:]) == "line two is a bit longer than limit"
+
+
+def test_code_block_is_kept_whole_when_it_fits() -> None:
+    """Блок кода с пустыми строками внутри не разрывается"""
+    code = "```python\ndef f():\n\n    return 1\n```"
+    text = "intro\n\n" + code
+
+    assert split_message(text, limit=len(code) + 5) == ["intro", code]
+
+
+def test_long_code_block_is_reopened_in_each_chunk() -> None:
+    """Длинный блок кода делится по строкам, каждая часть - валидный блок"""
+    lines = [f"print({i})" for i in range(20)]
+    text = "```python\n" + "\n".join(lines) + "\n```"
+
+    chunks = split_message(text, limit=60)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 60  # noqa: PLR2004
+        assert chunk.startswith("```python\n")
+        assert chunk.endswith("\n```")
+    body = [line for chunk in chunks for line in chunk.split("\n")[1:-1]]
+    assert body == lines
+
+
+def test_long_code_block_opener_is_clamped() -> None:
+    """Открывающая строка длиннее лимита заменяется на ```, части не превышают лимит"""
+    lines = [f"print({i})" for i in range(20)]
+    text = "```" + "x" * 100 + "\n" + "\n".join(lines) + "\n```"
+
+    chunks = split_message(text, limit=60)
+
+    for chunk in chunks:
+        assert len(chunk) <= 60  # noqa: PLR2004
+        assert chunk.startswith("```\n")
+        assert chunk.endswith("\n```")
+    body = [line for chunk in chunks for line in chunk.split("\n")[1:-1]]
+    assert body == lines
@@ -0,0 +1,126 @@
+"""Тесты для MessageWriteQueue"""
+
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import Config
+from src.conversation import ConversationManager
+from src.conversation_repository import ConversationRepository
+from src.message_write_queue import MessageWriteQueue
+from src.models import ChatMessage, ConversationKey
+from src.repository import MessageRepository
+
+
+def make_config(max_batch_size: int = 100, max_pending: int = 1000) -> Config:
+    """Config очереди записи с заданными лимитами"""
+    return Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        message_write_queue_max_batch_size=max_batch_size,
+        message_write_queue_flush_interval_ms=20.0,
+        message_write_queue_max_pending=max_pending,
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_messages_written_in_one_batch(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+    db_session: AsyncSession,
+) -> None:
+    """Сообщения разных диалогов пишутся одной пачкой, счетчики агрегируются"""
+    queue = MessageWriteQueue(session_factory, make_config())
+    key1 = ConversationKey(chat_id=919191, user_id=919191)
+    key2 = ConversationKey(chat_id=929292, user_id=929292)
+
+    saved = await asyncio.gather(
+        queue.add(key1, ChatMessage(role="user", content="a")),
+        queue.add(key2, ChatMessage(role="user", content="bb")),
+        queue.add(key1, ChatMessage(role="assistant", content="ccc")),
+    )
+    await queue.stop()
+
+    assert all(m.id is not None and m.created_at is not None for m in saved)
+    assert [m.content for m in saved] == ["a", "bb", "ccc"]
+    assert queue.stats()["batches"] == 1
+    assert queue.stats()["max_batch_size"] == 3
+
+    conversation = await ConversationRepository(db_session).get_conversation(key1)
+    assert conversation is not None
+    assert conversation.message_count == 2
+    assert conversation.total_content_length == len("a") + len("ccc")
+    history = await MessageRepository(db_session).get_history(key1)
+    assert [m.content for m in history] == ["a", "ccc"]
+
+
+@pytest.mark.asyncio
+async def test_batch_split_by_max_batch_size(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Пачка не превышает max_batch_size"""
+    queue = MessageWriteQueue(session_factory, make_config(max_batch_size=2))
+    key = ConversationKey(chat_id=939393, user_id=939393)
+
+    await asyncio.gather(
+        *(queue.add(key, ChatMessage(role="user", content=f"m{i}")) for i in range(5))
+    )
+    await queue.stop()
+
+    assert queue.stats()["messages"] == 5
+    assert queue.stats()["max_batch_size"] == 2
+    assert queue.stats()["batches"] == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_propagates_to_callers() -> None:
+    """Ошибка записи пачки возвращается всем ожидающим вызовам"""
+
+    async def failing_session_factory() -> AsyncGenerator[AsyncSession, None]:
+        raise RuntimeError("db is down")
+        yield MagicMock()  # pragma: no cover
+
+    queue = MessageWriteQueue(failing_session_factory, make_config())
+    key = ConversationKey(chat_id=1, user_id=1)
+
+    with pytest.raises(RuntimeError, match="db is down"):
+        await queue.add(key, ChatMessage(role="user", content="lost"))
+    await queue.stop()
+
+    assert queue.stats()["failed_batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_rejects_new_messages(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """После остановки очередь не принимает новые сообщения"""
+    queue = MessageWriteQueue(session_factory, make_config())
+    await queue.stop()
+
+    with pytest.raises(RuntimeError):
+        await queue.add(
+            ConversationKey(chat_id=1, user_id=1), ChatMessage(role="user", content="x")
+        )
+
+
+@pytest.mark.asyncio
+async def test_conversation_turn_through_queue(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Ход диалога через очередь видит сообщение пользователя в истории"""
+    queue = MessageWriteQueue(session_factory, make_config())
+    manager = ConversationManager(
+        session_factory=session_factory, max_history_messages=10, message_write_queue=queue
+    )
+    key = ConversationKey(chat_id=949494, user_id=949494)
+
+    turn = await manager.start_turn(key, ChatMessage(role="user", content="question"), "sys")
+    await manager.finish_turn(turn, ChatMessage(role="assistant", content="answer"))
+    await queue.stop()
+
+    assert [m.content for m in turn.history] == ["sys", "question"]
+    history = await manager.get_history(key, "sys")
+    assert [m.content for m in history] == ["sys", "question", "answer"]
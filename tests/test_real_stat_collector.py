@@ -385,3 +385,60 @@ async def test_real_stat_collector_with_timezone_aware_datetime(
     assert stats.total_users == 1
     assert stats.active_users == 1
     assert stats.total_messages == 1  # Только сообщение за последние 7 дней
+
+
+@pytest.mark.asyncio
+async def test_real_stat_collector_llm_usage_by_date(clean_db_session: AsyncSession) -> None:
+    """Тест RealStatCollector агрегатов токенов и задержек LLM по датам."""
+    day = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0) - timedelta(days=2)
+
+    def reply(latency_ms: int, created_at: datetime, **fields: object) -> Message:
+        return Message(
+            chat_id=8001,
+            user_id=8001,
+            role="assistant",
+            content="Answer",
+            content_length=6,
+            model="test/model",
+            prompt_tokens=100,
+            completion_tokens=20,
+            latency_ms=latency_ms,
+            created_at=created_at,
+            **fields,
+        )
+
+    clean_db_session.add_all(
+        [
+            reply(100, day),
+            reply(200, day),
+            reply(300, day),
+            reply(1000, day),
+            # Удаленный из истории ответ все равно стоил токенов
+            reply(400, day + timedelta(days=1), deleted_at=datetime.now()),
+            Message(
+                chat_id=8001,
+                user_id=8001,
+                role="user",
+                content="Question",
+                content_length=8,
+                created_at=day,
+            ),
+        ]
+    )
+    await clean_db_session.commit()
+
+    async def session_factory():
+        yield clean_db_session
+
+    collector = RealStatCollector(session_factory=session_factory, active_users_days=30)
+    stats = await collector.get_statistics()
+
+    assert stats.total_prompt_tokens == 500
+    assert stats.total_completion_tokens == 100
+    assert len(stats.llm_usage_by_date) == 2
+    first_day = stats.llm_usage_by_date[0]
+    assert first_day.replies == 4
+    assert first_day.prompt_tokens == 400
+    assert first_day.p50_latency_ms == pytest.approx(250.0)
+    assert first_day.p95_latency_ms == pytest.approx(895.0)
+    assert stats.llm_usage_by_date[1].p95_latency_ms == pytest.approx(400.0)
@@ -4,7 +4,7 @@ from typing import TYPE_CHECKING
 
 import pytest
 
-from src.models import ChatMessage, ConversationKey
+from src.models import ChatMessage, ConversationKey, LLMUsage
 from src.repository import MessageRepository
 
 if TYPE_CHECKING:
@@ -67,3 +67,27 @@ async def test_repository_add_message_with_length(
 
     assert len(history) == 1
     assert len(message_content) == len(history[0].content)
+
+
+@pytest.mark.asyncio
+async def test_repository_add_message_with_llm_usage(db_session) -> None:
+    """Расход LLM ответа ассистента сохраняется в колонках messages"""
+    key = ConversationKey(chat_id=9004, user_id=9004)
+    usage = LLMUsage(model="test/model", prompt_tokens=120, completion_tokens=30, latency_ms=850)
+
+    repo = MessageRepository(db_session)
+    reply, question = await repo.add_messages(
+        [
+            (key, ChatMessage(role="assistant", content="answer", usage=usage)),
+            (key, ChatMessage(role="user", content="question")),
+        ]
+    )
+
+    assert (reply.model, reply.prompt_tokens, reply.completion_tokens, reply.latency_ms) == (
+        "test/model",
+        120,
+        30,
+        850,
+    )
+    assert question.model is None
+    assert question.latency_ms is None
@@ -0,0 +1,75 @@
+"""Тесты для StreamingReply"""
+
+from collections.abc import AsyncIterator
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.streaming_reply import PLACEHOLDER_TEXT, TELEGRAM_MESSAGE_LIMIT, StreamingReply
+from tests.conftest import FakeClock
+
+
+def make_message() -> Mock:
+    """Mock aiogram Message: answer возвращает отправленное сообщение-заглушку"""
+    message = Mock()
+    message.placeholder = Mock()
+    message.placeholder.edit_text = AsyncMock()
+    message.answer = AsyncMock(return_value=message.placeholder)
+    return message
+
+
+async def timed_deltas(clock: FakeClock, items: list[tuple[float, str]]) -> AsyncIterator[str]:
+    """Фрагменты ответа, приходящие в заданные моменты времени"""
+    for at, delta in items:
+        clock.now = at
+        yield delta
+
+
+@pytest.mark.asyncio
+async def test_deliver_throttles_edits() -> None:
+    """Первый фрагмент показывается сразу, следующие правки не чаще интервала"""
+    clock = FakeClock()
+    message = make_message()
+    reply = StreamingReply(message, edit_interval_seconds=1.0, clock=clock)
+
+    text = await reply.deliver(
+        timed_deltas(clock, [(0.1, "a"), (0.5, "b"), (1.2, "c"), (1.3, "d")])
+    )
+
+    assert text == "abcd"
+    message.answer.assert_called_once_with(PLACEHOLDER_TEXT)
+    edits = [c.args[0] for c in message.placeholder.edit_text.call_args_list]
+    assert edits == ["a", "abc", "abcd"]
+
+
+@pytest.mark.asyncio
+async def test_deliver_splits_long_text() -> None:
+    """Текст длиннее лимита Telegram досылается отдельными сообщениями"""
+    clock = FakeClock()
+    message = make_message()
+    reply = StreamingReply(message, edit_interval_seconds=1.0, clock=clock)
+    long_text = "x" * TELEGRAM_MESSAGE_LIMIT + "tail"
+
+    await reply.deliver(timed_deltas(clock, [(0.0, long_text)]))
+
+    assert message.placeholder.edit_text.call_args_list[-1].args[0] == "x" * TELEGRAM_MESSAGE_LIMIT
+    assert message.answer.call_args_list[-1].args[0] == "tail"
+
+
+@pytest.mark.asyncio
+async def test_fail_replaces_placeholder() -> None:
+    """Ошибка посреди потока заменяет текст заглушки"""
+    clock = FakeClock()
+    message = make_message()
+    reply = StreamingReply(message, clock=clock)
+
+    async def broken() -> AsyncIterator[str]:
+        yield "partial"
+        raise RuntimeError("stream broken")
+
+    with pytest.raises(RuntimeError):
+        await reply.deliver(broken())
+    await reply.fail("error")
+
+    assert message.placeholder.edit_text.call_args_list[-1].args[0] == "error"
+    message.answer.assert_called_once_with(PLACEHOLDER_TEXT)
@@ -0,0 +1,98 @@
+"""Тесты для SystemPromptRegistry и версий system prompt"""
+
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conversation import ConversationManager
+from src.db_models import Message, SystemPrompt
+from src.models import ChatMessage, ConversationKey
+from src.system_prompt_registry import SystemPromptRegistry
+from src.system_prompt_repository import SystemPromptRepository
+
+
+@pytest.mark.asyncio
+async def test_same_prompt_stored_once(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+    db_session: AsyncSession,
+) -> None:
+    """Одинаковый текст дает одну версию, даже из разных процессов (реестров)"""
+    first = await SystemPromptRegistry(session_factory).resolve_id("Dedup prompt")
+    second = await SystemPromptRegistry(session_factory).resolve_id("Dedup prompt")
+
+    result = await db_session.execute(
+        select(func.count(SystemPrompt.id)).where(SystemPrompt.content == "Dedup prompt")
+    )
+
+    assert first == second
+    assert result.scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_new_prompt_text_gets_next_version(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+    db_session: AsyncSession,
+) -> None:
+    """Измененный текст prompt регистрируется следующей версией"""
+    registry = SystemPromptRegistry(session_factory)
+    old_id = await registry.resolve_id("Prompt v1")
+    new_id = await registry.resolve_id("Prompt v2")
+
+    old_prompt = await db_session.get(SystemPrompt, old_id)
+    new_prompt = await db_session.get(SystemPrompt, new_id)
+
+    assert old_prompt is not None
+    assert new_prompt is not None
+    assert new_prompt.version > old_prompt.version
+
+
+@pytest.mark.asyncio
+async def test_conversation_keeps_pinned_prompt_until_clear(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+    db_session: AsyncSession,
+) -> None:
+    """Диалог продолжает с исходной версией prompt; после /clear берет текущую"""
+    manager = ConversationManager(session_factory=session_factory)
+    key = ConversationKey(chat_id=717171, user_id=717171)
+
+    await manager.start_turn(key, ChatMessage(role="user", content="hi"), "Old prompt")
+    history = await manager.get_history(key, "New prompt")
+    assert history[0].content == "Old prompt"
+
+    await manager.clear_history(key)
+    history = await manager.get_history(key, "New prompt")
+    assert history[0].content == "New prompt"
+
+    # Текст prompt не копируется в messages
+    result = await db_session.execute(
+        select(func.count(Message.id)).where(
+            Message.chat_id == key.chat_id, Message.role == "system"
+        )
+    )
+    assert result.scalar() == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_registrations_get_distinct_versions(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+) -> None:
+    """Параллельная регистрация разных текстов не выдает один номер версии дважды"""
+
+    async def register(content: str) -> int:
+        session_gen = session_factory()
+        session = await session_gen.__anext__()
+        try:
+            prompt = await SystemPromptRepository(session).get_or_create(content)
+            # Пауза внутри транзакции: без lock обе вставки увидели бы один max(version)
+            await asyncio.sleep(0.05)
+            await session.commit()
+            return prompt.version
+        finally:
+            await session_gen.aclose()
+
+    versions = await asyncio.gather(*(register(f"Concurrent prompt {i}") for i in range(3)))
+
+    assert len(set(versions)) == len(versions)
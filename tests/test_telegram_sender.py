@@ -0,0 +1,107 @@
+"""Тесты для очереди исходящих сообщений Telegram"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from src.config import Config
+from src.telegram_sender import TelegramSender
+
+
+def make_sender(bot: Mock, **overrides: float) -> TelegramSender:
+    config = Config(telegram_token="test", openrouter_api_key="test", **overrides)  # type: ignore[arg-type]
+    return TelegramSender(bot, config)
+
+
+def sent_texts(bot: Mock) -> list[tuple[int, str]]:
+    return [(c.kwargs["chat_id"], c.kwargs["text"]) for c in bot.send_message.call_args_list]
+
+
+async def test_send_returns_before_delivery() -> None:
+    """send только ставит ответ в очередь; stop дожидается отправки"""
+    release = asyncio.Event()
+
+    async def slow_send(**kwargs: object) -> None:
+        await release.wait()
+
+    bot = Mock()
+    bot.send_message = AsyncMock(side_effect=slow_send)
+    sender = make_sender(bot)
+
+    await asyncio.wait_for(sender.send(1, "hello"), timeout=1)
+    assert sender.stats()["pending"] == 1
+
+    release.set()
+    await sender.stop()
+    assert sender.stats()["sent"] == 1
+
+
+async def test_long_reply_is_sent_in_chunks_in_order() -> None:
+    """Длинный ответ уходит несколькими сообщениями, ответы чата - по порядку"""
+    bot = Mock()
+    bot.send_message = AsyncMock()
+    sender = make_sender(bot, telegram_chat_burst=10)
+
+    await sender.send(1, "a" * 4096 + "\n\n" + "b" * 10)
+    await sender.send(1, "second")
+    await sender.stop()
+
+    assert sent_texts(bot) == [(1, "a" * 4096), (1, "b" * 10), (1, "second")]
+
+
+async def test_retries_after_flood_control() -> None:
+    """RetryAfter: отправка повторяется после паузы"""
+    bot = Mock()
+    flood = TelegramRetryAfter(SendMessage(chat_id=1, text="x"), "Too Many Requests", 0)
+    bot.send_message = AsyncMock(side_effect=[flood, None])
+    sender = make_sender(bot)
+
+    await sender.send(1, "hello")
+    await sender.stop()
+
+    assert bot.send_message.call_count == 2  # noqa: PLR2004
+    assert sender.stats()["sent"] == 1
+    assert sender.stats()["retried"] == 1
+
+
+async def test_failed_send_does_not_block_chat() -> None:
+    """Ошибка отправки учитывается, следующие ответы чата отправляются"""
+    bot = Mock()
+    blocked = TelegramForbiddenError(SendMessage(chat_id=1, text="x"), "bot was blocked")
+    bot.send_message = AsyncMock(side_effect=[blocked, None])
+    sender = make_sender(bot)
+
+    await sender.send(1, "first")
+    await sender.send(1, "second")
+    await sender.stop()
+
+    assert sender.stats()["failed"] == 1
+    assert sender.stats()["sent"] == 1
+
+
+def test_global_rate_is_shared_between_workers() -> None:
+    """Общий лимит задан на весь бот: каждый процесс-обработчик получает свою долю"""
+    sender = make_sender(Mock(), telegram_global_messages_per_second=24, bot_workers=4)
+
+    assert sender.global_rate == 6
+
+
+async def test_per_chat_rate_limit() -> None:
+    """Сообщения одного чата ограничены корзиной чата, другие чаты не ждут"""
+    bot = Mock()
+    bot.send_message = AsyncMock()
+    sender = make_sender(bot, telegram_chat_messages_per_second=10, telegram_chat_burst=1)
+
+    started = time.perf_counter()
+    for i in range(3):
+        await sender.send(1, f"chat 1 #{i}")
+    await sender.send(2, "chat 2")
+    await asyncio.sleep(0.05)
+    assert (2, "chat 2") in sent_texts(bot)
+    await sender.stop()
+
+    assert time.perf_counter() - started >= 0.19  # noqa: PLR2004
+    assert sender.stats()["throttle_seconds"] > 0
@@ -175,3 +175,22 @@ async def test_execute_sql_invalid_query() -> None:
 
     with pytest.raises(ValueError):
         await handler.execute_sql("DELETE FROM users")
+
+
+@pytest.mark.asyncio
+async def test_process_query_uses_cache_and_forgets_invalid_sql() -> None:
+    """SQL запрашивается с кэшем; непригодный ответ удаляется из кэша"""
+    llm_client = AsyncMock()
+    llm_client.get_response.return_value = "DELETE FROM users"
+    handler = Text2SQLHandler(
+        llm_client=llm_client,
+        session_factory=AsyncMock(),
+        text2sql_prompt="Test prompt",
+    )
+
+    with pytest.raises(ValueError):
+        await handler.process_query("Удали всех")
+
+    history = llm_client.get_response.call_args.args[0]
+    assert llm_client.get_response.call_args.kwargs == {"cache": True}
+    llm_client.forget_cached_response.assert_awaited_once_with(history)
@@ -0,0 +1,56 @@
+"""Тесты для TokenBucket"""
+
+import pytest
+
+from src.token_bucket import TokenBucket
+from tests.conftest import FakeClock
+
+
+def test_burst_up_to_capacity() -> None:
+    """Запас capacity доступен сразу, дальше - по скорости пополнения"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=2.0, capacity=3.0, clock=clock)
+
+    for _ in range(3):
+        assert bucket.wait_time() == 0.0
+        bucket.consume()
+
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.now = 0.5
+    assert bucket.wait_time() == 0.0
+
+
+def test_reservation_queues_callers() -> None:
+    """Резервирование в долг увеличивает ожидание следующих вызовов"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=1.0, capacity=1.0, clock=clock)
+
+    bucket.consume()
+    assert bucket.wait_time() == pytest.approx(1.0)
+    bucket.consume()
+    assert bucket.wait_time() == pytest.approx(2.0)
+
+
+def test_amount_above_capacity_is_clamped() -> None:
+    """Запрос больше capacity не ждет бесконечно"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=10.0, capacity=100.0, clock=clock)
+
+    assert bucket.wait_time(1000) == 0.0
+    bucket.consume(1000)
+    assert bucket.wait_time(1000) == pytest.approx(10.0)
+
+
+def test_refund_returns_reservation() -> None:
+    """Возвращенный резерв снова доступен, но запас не превышает capacity"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=1.0, capacity=2.0, clock=clock)
+
+    bucket.consume(2)
+    bucket.consume()
+    bucket.refund()
+    assert bucket.wait_time(2) == pytest.approx(2.0)
+    bucket.refund(10)
+    assert bucket.wait_time(2) == 0.0
+    bucket.consume(2)
+    assert bucket.wait_time() == pytest.approx(1.0)
@@ -0,0 +1,37 @@
+"""Тесты для оценки токенов"""
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db_models import Message
+from src.token_estimator import estimate_tokens
+
+
+def test_estimate_tokens_by_utf8_bytes() -> None:
+    """Оценка считается по байтам UTF-8: кириллица "дороже" латиницы"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2  # noqa: PLR2004
+    assert estimate_tokens("привет") == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_estimate_matches_sql_backfill(db_session: AsyncSession) -> None:
+    """Формула в Python совпадает с формулой миграции token_count"""
+    content = "Смешанный text с эмодзи 🙂"
+    result = await db_session.execute(
+        text("SELECT CEIL(OCTET_LENGTH(:content) / 4.0)::int"), {"content": content}
+    )
+
+    assert result.scalar() == estimate_tokens(content)
+
+
+@pytest.mark.asyncio
+async def test_migration_backfilled_seeded_messages(db_session: AsyncSession) -> None:
+    """Миграция заполнила token_count для существующих сообщений"""
+    result = await db_session.execute(
+        select(func.count(Message.id)).where(Message.chat_id == 1001, Message.token_count == 0)
+    )
+
+    assert result.scalar() == 0
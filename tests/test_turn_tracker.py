@@ -0,0 +1,106 @@
+"""Тесты для TurnTracker"""
+
+import asyncio
+
+import pytest
+
+from src.config import Config
+from src.models import ConversationKey
+from src.turn_errors import TurnCancelledError
+from src.turn_tracker import TurnTracker
+
+KEY = ConversationKey(chat_id=1, user_id=1)
+
+
+def make_tracker(deadline: float = 0.0) -> TurnTracker:
+    """TurnTracker с заданным дедлайном хода (0 - без дедлайна)"""
+    return TurnTracker(
+        Config(telegram_token="test", openrouter_api_key="test", turn_deadline_seconds=deadline)
+    )
+
+
+async def run_turn(tracker: TurnTracker, key: ConversationKey, started: asyncio.Event) -> None:
+    """Ход, который ждет ответа LLM дольше любого теста"""
+    async with tracker.track(key):
+        started.set()
+        await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_completed_turn() -> None:
+    """Завершенный ход учитывается и снимается с учета"""
+    tracker = make_tracker()
+
+    async with tracker.track(KEY):
+        assert tracker.stats()["active"] == 1
+
+    assert tracker.stats() == {
+        "active": 0,
+        "completed": 1,
+        "cancelled": 0,
+        "deadline_exceeded": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_deadline_interrupts_turn() -> None:
+    """Ход дольше turn_deadline_seconds прерывается TimeoutError"""
+    tracker = make_tracker(deadline=0.01)
+
+    with pytest.raises(TimeoutError):
+        async with tracker.track(KEY):
+            await asyncio.sleep(1)
+
+    assert tracker.stats()["deadline_exceeded"] == 1
+    assert tracker.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_inner_timeout_is_not_deadline() -> None:
+    """TimeoutError изнутри хода (дедлайн LLMClient) не считается дедлайном хода"""
+    tracker = make_tracker(deadline=10.0)
+
+    with pytest.raises(TimeoutError):
+        async with tracker.track(KEY):
+            raise TimeoutError("LLM request deadline exceeded")
+
+    assert tracker.stats()["deadline_exceeded"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_by_key() -> None:
+    """cancel(key) прерывает только ходы этого диалога, ход видит TurnCancelledError"""
+    tracker = make_tracker()
+    started, other_started = asyncio.Event(), asyncio.Event()
+    turn = asyncio.create_task(run_turn(tracker, KEY, started))
+    other = asyncio.create_task(
+        run_turn(tracker, ConversationKey(chat_id=2, user_id=2), other_started)
+    )
+    await started.wait()
+    await other_started.wait()
+
+    assert tracker.cancel(KEY) == 1
+    with pytest.raises(TurnCancelledError):
+        await turn
+
+    assert not other.done()
+    assert tracker.stats()["active"] == 1
+    assert tracker.stats()["cancelled"] == 1
+    other.cancel()
+    await asyncio.gather(other, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_external_cancellation_propagates() -> None:
+    """Внешняя отмена задачи (клиент отключился) учитывается и не подменяется"""
+    tracker = make_tracker()
+    started = asyncio.Event()
+    turn = asyncio.create_task(run_turn(tracker, KEY, started))
+    await started.wait()
+
+    turn.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await turn
+
+    assert tracker.stats()["cancelled"] == 1
+    assert tracker.stats()["active"] == 0
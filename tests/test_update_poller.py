@@ -0,0 +1,56 @@
+"""Тесты для long polling сырых обновлений (BotSupervisor)"""
+
+import asyncio
+from typing import Any
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src import update_poller
+from src.config import Config
+from src.update_poller import poll_updates
+
+
+@pytest.mark.asyncio
+async def test_poll_updates_passes_updates_in_order_and_advances_offset(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Обновления передаются по порядку, offset сдвигается, ошибка API повторяется"""
+    monkeypatch.setattr(update_poller, "RETRY_DELAY_SECONDS", 0)
+    offsets: list[str | None] = []
+    responses: list[dict[str, Any]] = [
+        {"ok": True, "result": [{"update_id": 1}, {"update_id": 2}]},
+        {"ok": False, "description": "Too Many Requests"},
+        {"ok": True, "result": [{"update_id": 3}]},
+    ]
+
+    async def get_updates(request: web.Request) -> web.Response:
+        offsets.append(request.query.get("offset"))
+        if not responses:
+            await asyncio.sleep(10)
+        return web.json_response(responses.pop(0))
+
+    app = web.Application()
+    app.router.add_get("/bottest/getUpdates", get_updates)
+    received: list[int] = []
+    done = asyncio.Event()
+
+    async def sink(update: dict[str, Any]) -> None:
+        received.append(update["update_id"])
+        if len(received) == 3:
+            done.set()
+
+    config = Config(telegram_token="test", openrouter_api_key="test")
+    async with TestServer(app) as server:
+        task = asyncio.create_task(
+            poll_updates(config, sink, api_url=str(server.make_url("")).rstrip("/"))
+        )
+        await asyncio.wait_for(done.wait(), timeout=5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert received == [1, 2, 3]
+    assert offsets[:3] == [None, "3", "3"]
+    assert offsets[3] == "4"
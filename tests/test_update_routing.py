@@ -0,0 +1,48 @@
+"""Тесты для маршрутизации обновлений Telegram"""
+
+from src.update_routing import is_priority_update, update_chat_id, update_shard
+
+
+def message_update(update_id: int, chat_id: int, text: str = "hi") -> dict[str, object]:
+    """Сырое обновление с текстовым сообщением"""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": 7, "is_bot": False, "first_name": "Test"},
+            "text": text,
+        },
+    }
+
+
+def test_update_chat_id() -> None:
+    """chat_id из сообщения, callback_query или id пользователя для обновлений без чата"""
+    assert update_chat_id(message_update(1, -100500)) == -100500
+    assert (
+        update_chat_id(
+            {"update_id": 2, "callback_query": {"from": {"id": 7}, "message": {"chat": {"id": 42}}}}
+        )
+        == 42
+    )
+    assert update_chat_id({"update_id": 3, "inline_query": {"from": {"id": 7}}}) == 7
+    assert update_chat_id({"update_id": 4}) is None
+
+
+def test_update_shard_keeps_chat_in_one_worker() -> None:
+    """Все обновления чата попадают в один процесс, чаты распределяются по процессам"""
+    shards = {update_shard(message_update(i, chat_id=12345), workers=4) for i in range(20)}
+    assert len(shards) == 1
+
+    spread = {update_shard(message_update(1, chat_id=chat_id), workers=4) for chat_id in range(8)}
+    assert spread == {0, 1, 2, 3}
+    assert 0 <= update_shard(message_update(1, chat_id=-100500), workers=4) < 4
+
+
+def test_priority_update() -> None:
+    """/clear (в том числе /clear@bot) обрабатывается вне очереди чата"""
+    assert is_priority_update(message_update(1, 1, "/clear"))
+    assert is_priority_update(message_update(1, 1, "/clear@aidd_bot"))
+    assert not is_priority_update(message_update(1, 1, "/help"))
+    assert not is_priority_update(message_update(1, 1, "clear"))
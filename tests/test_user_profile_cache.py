@@ -0,0 +1,90 @@
+"""Тесты для UserProfileCache"""
+
+from collections.abc import AsyncGenerator, Callable
+from typing import Any
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conversation import ConversationManager
+from src.db_models import User
+from src.models import ChatMessage, ConversationKey, UserData
+from src.user_profile_cache import UserProfileCache
+from src.user_repository import UserRepository
+from tests.conftest import FakeClock
+
+
+def make_user(user_id: int = 1, username: str | None = "user") -> UserData:
+    return UserData(user_id=user_id, username=username, first_name="First", last_name=None)
+
+
+def test_unchanged_profile_is_saved_until_ttl() -> None:
+    """Тот же профиль считается сохраненным до истечения TTL"""
+    clock = FakeClock()
+    cache = UserProfileCache(ttl_seconds=10.0, clock=clock)
+    assert not cache.is_saved(make_user())
+
+    cache.remember(make_user())
+    clock.now = 9.0
+    assert cache.is_saved(make_user())
+
+    clock.now = 10.0
+    assert not cache.is_saved(make_user())
+    assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 0, "entries": 0}
+
+
+def test_changed_profile_is_not_saved() -> None:
+    """Изменение username требует повторного сохранения"""
+    cache = UserProfileCache()
+    cache.remember(make_user(username="old"))
+
+    assert not cache.is_saved(make_user(username="new"))
+
+
+def test_lru_eviction() -> None:
+    """При переполнении вытесняется давно использованный профиль"""
+    cache = UserProfileCache(max_entries=2)
+    cache.remember(make_user(1))
+    cache.remember(make_user(2))
+    assert cache.is_saved(make_user(1))
+
+    cache.remember(make_user(3))
+
+    assert cache.is_saved(make_user(1))
+    assert not cache.is_saved(make_user(2))
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_start_turn_upserts_user_only_on_change(
+    session_factory: Callable[[], AsyncGenerator[AsyncSession, None]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """UPSERT пользователя выполняется для нового и измененного профиля, но не для прежнего"""
+    upserts = 0
+    original_upsert = UserRepository.upsert_user
+
+    async def counting_upsert(self: UserRepository, **kwargs: Any) -> User:
+        nonlocal upserts
+        upserts += 1
+        return await original_upsert(self, **kwargs)
+
+    monkeypatch.setattr(UserRepository, "upsert_user", counting_upsert)
+    manager = ConversationManager(
+        session_factory=session_factory, user_profile_cache=UserProfileCache()
+    )
+    key = ConversationKey(chat_id=515151, user_id=515151)
+
+    for username in ["before", "before", "after"]:
+        await manager.start_turn(
+            key,
+            ChatMessage(role="user", content="hello"),
+            "system",
+            user_data=make_user(515151, username),
+        )
+
+    assert upserts == 2
+    async for session in session_factory():
+        user = await UserRepository(session).get_user_by_id(515151)
+        assert user is not None
+        assert user.username == "after"
@@ -1,10 +1,9 @@
 """Тесты для UserRepository"""
 
-from datetime import datetime
-
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db_models import Message
+from src.models import ChatMessage, ConversationKey
+from src.repository import MessageRepository
 from src.user_repository import UserRepository
 
 
@@ -114,17 +113,13 @@ class TestUserRepositoryMessageCount:
         # Создаем пользователя
         await repo.upsert_user(user_id=777888, username="testuser")  # noqa: PLR2004
 
-        # Добавляем сообщения
+        # Добавляем сообщения (через MessageRepository: он ведет счетчики диалога)
+        message_repo = MessageRepository(db_session)
+        key = ConversationKey(chat_id=12345, user_id=777888)  # noqa: PLR2004
         for i in range(5):  # noqa: PLR2004
-            message = Message(
-                chat_id=12345,  # noqa: PLR2004
-                user_id=777888,  # noqa: PLR2004
-                role="user",
-                content=f"Test message {i}",
-                content_length=10,  # noqa: PLR2004
+            await message_repo.add_message(
+                key, ChatMessage(role="user", content=f"Test message {i}")
             )
-            db_session.add(message)
-        await db_session.commit()
 
         # Проверяем количество
         count = await repo.get_user_message_count(777888)  # noqa: PLR2004
@@ -147,28 +142,19 @@ class TestUserRepositoryMessageCount:
         await repo.upsert_user(user_id=888999, username="testuser")  # noqa: PLR2004
 
         # Добавляем активные сообщения
+        message_repo = MessageRepository(db_session)
+        active_key = ConversationKey(chat_id=12345, user_id=888999)  # noqa: PLR2004
         for i in range(3):  # noqa: PLR2004
-            message = Message(
-                chat_id=12345,  # noqa: PLR2004
-                user_id=888999,  # noqa: PLR2004
-                role="user",
-                content=f"Active message {i}",
-                content_length=10,  # noqa: PLR2004
+            await message_repo.add_message(
+                active_key, ChatMessage(role="user", content=f"Active message {i}")
             )
-            db_session.add(message)
-
-        # Добавляем удаленное сообщение
-        deleted_message = Message(
-            chat_id=12345,  # noqa: PLR2004
-            user_id=888999,  # noqa: PLR2004
-            role="user",
-            content="Deleted message",
-            content_length=10,  # noqa: PLR2004
-        )
-        deleted_message.deleted_at = datetime.now()
-        db_session.add(deleted_message)
 
-        await db_session.commit()
+        # Добавляем удаленное сообщение в другом диалоге пользователя
+        deleted_key = ConversationKey(chat_id=54321, user_id=888999)  # noqa: PLR2004
+        await message_repo.add_message(
+            deleted_key, ChatMessage(role="user", content="Deleted message")
+        )
+        await message_repo.soft_delete_history(deleted_key)
 
         # Проверяем что считаются только активные
         count = await repo.get_user_message_count(888999)  # noqa: PLR2004
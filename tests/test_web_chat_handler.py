@@ -1,10 +1,15 @@
-from unittest.mock import AsyncMock
+import asyncio
+from collections.abc import AsyncGenerator
+from unittest.mock import ANY, AsyncMock, Mock
 
 import pytest
 
 from src.api.chat_handler import WebChatHandler, user_id_to_int
 from src.api.models import ChatHistoryResponse
-from src.models import ChatMessage
+from src.config import Config
+from src.models import ChatMessage, ConversationKey, ConversationTurn
+from src.turn_errors import TurnCancelledError
+from src.turn_tracker import TurnTracker
 
 
 @pytest.mark.asyncio
@@ -30,15 +35,19 @@ async def test_send_message_success() -> None:
     """Test successful message sending and receiving response."""
     # Mock dependencies
     mock_llm_client = AsyncMock()
+    mock_llm_client.check_available = Mock()
     mock_conversation_manager = AsyncMock()
 
     # Setup mock responses
     mock_llm_client.get_response.return_value = "Hello, user!"
-    mock_conversation_manager.add_message.return_value = None
-    mock_conversation_manager.get_history.return_value = [
+    history = [
         ChatMessage(role="system", content="You are helpful"),
         ChatMessage(role="user", content="Hi"),
     ]
+    mock_conversation_manager.start_turn.return_value = ConversationTurn(
+        key=ConversationKey(chat_id=1, user_id=1), history=history
+    )
+    mock_conversation_manager.finish_turn.return_value = None
 
     handler = WebChatHandler(
         llm_client=mock_llm_client,
@@ -52,21 +61,23 @@ async def test_send_message_success() -> None:
     # Assertions
     assert response == "Hello, user!"
     assert isinstance(message_id, int)
-    mock_conversation_manager.add_message.assert_called()
-    mock_conversation_manager.get_history.assert_called()
-    mock_llm_client.get_response.assert_called_once()
+    mock_conversation_manager.start_turn.assert_called_once()
+    mock_conversation_manager.finish_turn.assert_called_once()
+    mock_llm_client.get_response.assert_called_once_with(history, user_id=1, on_usage=ANY)
 
 
 @pytest.mark.asyncio
 async def test_send_message_error_handling() -> None:
     """Test error handling in send_message."""
     mock_llm_client = AsyncMock()
+    mock_llm_client.check_available = Mock()
     mock_conversation_manager = AsyncMock()
 
     # Setup mock to raise error
     mock_llm_client.get_response.side_effect = Exception("LLM API error")
-    mock_conversation_manager.add_message.return_value = None
-    mock_conversation_manager.get_history.return_value = []
+    mock_conversation_manager.start_turn.return_value = ConversationTurn(
+        key=ConversationKey(chat_id=1, user_id=1), history=[]
+    )
 
     handler = WebChatHandler(
         llm_client=mock_llm_client,
@@ -78,6 +89,132 @@ async def test_send_message_error_handling() -> None:
     with pytest.raises(Exception, match="LLM API error"):
         await handler.send_message(user_id="web-user-1", message="Hi")
 
+    # Ответ не сохраняется, если LLM не ответила
+    mock_conversation_manager.finish_turn.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stream_message_persists_full_reply() -> None:
+    """Ответ отдается фрагментами и сохраняется один раз после окончания потока"""
+
+    async def deltas() -> AsyncGenerator[str, None]:
+        for delta in ["Hel", "lo"]:
+            yield delta
+
+    mock_llm_client = Mock()
+    mock_llm_client.stream_response = Mock(return_value=deltas())
+    mock_conversation_manager = AsyncMock()
+    turn = ConversationTurn(key=ConversationKey(chat_id=1, user_id=1), history=[])
+    mock_conversation_manager.start_turn.return_value = turn
+
+    handler = WebChatHandler(
+        llm_client=mock_llm_client,
+        conversation_manager=mock_conversation_manager,
+        system_prompt="You are helpful",
+    )
+
+    received = [d async for d in handler.stream_message(user_id="web-user-1", message="Hi")]
+
+    assert received == ["Hel", "lo"]
+    mock_conversation_manager.finish_turn.assert_called_once_with(
+        turn, ChatMessage(role="assistant", content="Hello")
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_message_closed_early_closes_upstream() -> None:
+    """Закрытие потока клиентом закрывает запрос к LLM и не сохраняет частичный ответ"""
+    upstream_closed = False
+
+    async def deltas() -> AsyncGenerator[str, None]:
+        nonlocal upstream_closed
+        try:
+            for delta in ["one", "two", "three"]:
+                yield delta
+        finally:
+            upstream_closed = True
+
+    mock_llm_client = Mock()
+    mock_llm_client.stream_response = Mock(return_value=deltas())
+    mock_conversation_manager = AsyncMock()
+    mock_conversation_manager.start_turn.return_value = ConversationTurn(
+        key=ConversationKey(chat_id=1, user_id=1), history=[]
+    )
+
+    handler = WebChatHandler(
+        llm_client=mock_llm_client,
+        conversation_manager=mock_conversation_manager,
+        system_prompt="You are helpful",
+    )
+
+    stream = handler.stream_message(user_id="web-user-1", message="Hi")
+    assert await anext(stream) == "one"
+    await stream.aclose()
+
+    assert upstream_closed
+    mock_conversation_manager.finish_turn.assert_not_called()
+
+
+def make_slow_stream_handler(turn_deadline_seconds: float) -> tuple[WebChatHandler, AsyncMock]:
+    """Обработчик с TurnTracker и потоком LLM, который зависает после первого фрагмента"""
+
+    async def deltas() -> AsyncGenerator[str, None]:
+        yield "partial"
+        await asyncio.sleep(10)
+        yield "late"
+
+    mock_llm_client = Mock()
+    mock_llm_client.stream_response = Mock(return_value=deltas())
+    key = ConversationKey(chat_id=1, user_id=1)
+    mock_conversation_manager = AsyncMock()
+    mock_conversation_manager.get_conversation_key = Mock(return_value=key)
+    mock_conversation_manager.start_turn.return_value = ConversationTurn(key=key, history=[])
+    config = Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        turn_deadline_seconds=turn_deadline_seconds,
+    )
+    handler = WebChatHandler(
+        llm_client=mock_llm_client,
+        conversation_manager=mock_conversation_manager,
+        system_prompt="You are helpful",
+        turn_tracker=TurnTracker(config),
+    )
+    return handler, mock_conversation_manager
+
+
+@pytest.mark.asyncio
+async def test_stream_message_deadline_with_slow_consumer() -> None:
+    """Дедлайн, пока потребитель медлит: поток завершается TimeoutError, ответ не сохраняется"""
+    handler, mock_conversation_manager = make_slow_stream_handler(turn_deadline_seconds=0.1)
+
+    stream = handler.stream_message(user_id="web-user-1", message="Hi")
+    assert await anext(stream) == "partial"
+    await asyncio.sleep(0.3)
+
+    with pytest.raises(TimeoutError):
+        await anext(stream)
+    mock_conversation_manager.finish_turn.assert_not_called()
+    assert handler.turn_tracker is not None
+    assert handler.turn_tracker.stats()["deadline_exceeded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_message_cancelled_with_slow_consumer() -> None:
+    """Отмена хода, пока потребитель медлит: TurnCancelledError, ответ не сохраняется"""
+    handler, mock_conversation_manager = make_slow_stream_handler(turn_deadline_seconds=10)
+
+    stream = handler.stream_message(user_id="web-user-1", message="Hi")
+    assert await anext(stream) == "partial"
+    assert handler.turn_tracker is not None
+    assert handler.turn_tracker.cancel(ConversationKey(chat_id=1, user_id=1)) == 1
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(TurnCancelledError):
+        await anext(stream)
+    mock_conversation_manager.finish_turn.assert_not_called()
+    assert asyncio.current_task().cancelling() == 0  # type: ignore[union-attr]
+
 
 @pytest.mark.asyncio
 async def test_get_history_success() -> None:
@@ -162,6 +299,7 @@ async def test_clear_history_success() -> None:
 async def test_clear_history_error() -> None:
     """Test error handling in clear_history."""
     mock_llm_client = AsyncMock()
+    mock_llm_client.check_available = Mock()
     mock_conversation_manager = AsyncMock()
 
     # Setup mock to raise error
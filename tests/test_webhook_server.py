@@ -0,0 +1,76 @@
+"""Тесты для webhook сервера"""
+
+from typing import Any
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.config import Config
+from src.webhook_server import SECRET_TOKEN_HEADER, create_webhook_app
+
+WEBHOOK_PATH = "/telegram/webhook"
+SECRET = "s3cret-token"
+
+
+def make_config() -> Config:
+    return Config(
+        telegram_token="test",
+        openrouter_api_key="test",
+        telegram_delivery_mode="webhook",
+        telegram_webhook_url="https://bot.example.com",
+        telegram_webhook_secret=SECRET,
+    )
+
+
+@pytest.mark.asyncio
+async def test_webhook_validates_secret_and_routes_updates() -> None:
+    """Обновление с верным секретом ставится в очередь, без секрета - 403"""
+    routed: list[dict[str, Any]] = []
+    accept = True
+
+    def route(update: dict[str, Any]) -> bool:
+        if accept:
+            routed.append(update)
+        return accept
+
+    update = {"update_id": 1, "message": {"chat": {"id": 1}, "text": "hi"}}
+    async with TestClient(TestServer(create_webhook_app(make_config(), route))) as client:
+        response = await client.post(WEBHOOK_PATH, json=update)
+        assert response.status == 403
+        response = await client.post(
+            WEBHOOK_PATH, json=update, headers={SECRET_TOKEN_HEADER: "wrong"}
+        )
+        assert response.status == 403
+        assert routed == []
+
+        response = await client.post(
+            WEBHOOK_PATH, json=update, headers={SECRET_TOKEN_HEADER: SECRET}
+        )
+        assert response.status == 200
+        assert routed == [update]
+
+        response = await client.post(
+            WEBHOOK_PATH, data="not json", headers={SECRET_TOKEN_HEADER: SECRET}
+        )
+        assert response.status == 400
+
+        # Очередь переполнена: Telegram повторит доставку
+        accept = False
+        response = await client.post(
+            WEBHOOK_PATH, json=update, headers={SECRET_TOKEN_HEADER: SECRET}
+        )
+        assert response.status == 503
+
+
+async def test_webhook_metrics_endpoint() -> None:
+    """GET /metrics отдает метрики процесса, если они переданы"""
+    metrics = {"handlers": {"in_flight": 0, "shed": 3}}
+    app = create_webhook_app(make_config(), lambda update: True, lambda: metrics)
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/metrics")
+        assert response.status == 200
+        assert await response.json() == metrics
+
+    async with TestClient(TestServer(create_webhook_app(make_config(), lambda u: True))) as client:
+        response = await client.get("/metrics")
+        assert response.status == 404
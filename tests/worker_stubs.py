@@ -0,0 +1,35 @@
+"""
+Процессы-обработчики для тестов BotSupervisor.
+
+Вынесены из тестового модуля: процесс, запущенный через spawn, импортирует
+модуль своей функции, и этот модуль не должен тянуть aiogram и БД.
+"""
+
+import os
+import time
+from multiprocessing.queues import Queue
+from typing import Any
+
+
+def failing_worker(
+    index: int, updates: "Queue[dict[str, Any] | None]", ready: "Queue[tuple[int, bool]]"
+) -> None:
+    """Процесс, который не смог запуститься (например, БД недоступна)"""
+    ready.put((index, False))
+
+
+def crashing_worker(
+    index: int, updates: "Queue[dict[str, Any] | None]", ready: "Queue[tuple[int, bool]]"
+) -> None:
+    """Процесс, который падает на первом обновлении"""
+    ready.put((index, True))
+    if updates.get() is not None:
+        os._exit(1)
+
+
+def stuck_worker(
+    index: int, updates: "Queue[dict[str, Any] | None]", ready: "Queue[tuple[int, bool]]"
+) -> None:
+    """Процесс, который запустился, но не разбирает очередь"""
+    ready.put((index, True))
+    time.sleep(60)